@@ -128,27 +128,53 @@ class BaseAgent(abc.ABC):
         """Backward-compatible message processor. Delegates to run_cycle()."""
         return None
 
-    async def send_message(self, message: ASOCMessage) -> None:
+    @staticmethod
+    def _bus_payload(message: ASOCMessage) -> Dict[str, Any]:
+        return {
+            "message_id": message.message_id,
+            "message_type": getattr(message.message_type, "value", message.message_type),
+            "source_agent": message.source_agent,
+            "target_agent": message.target_agent,
+            "payload": message.payload,
+            "correlation_id": message.correlation_id,
+            "priority": getattr(message.priority, "value", message.priority),
+        }
+
+    async def send_message(self, message: ASOCMessage) -> bool:
         from src.asoc.core.message_bus import get_message_bus
 
         self.logger.info("sending_message", message_id=message.message_id, target=message.target_agent)
         try:
             bus = await get_message_bus()
             topic = message.target_agent or "broadcast"
-            await bus.publish(
-                topic,
-                {
-                    "message_id": message.message_id,
-                    "message_type": message.message_type.value,
-                    "source_agent": message.source_agent,
-                    "target_agent": message.target_agent,
-                    "payload": message.payload,
-                    "correlation_id": message.correlation_id,
-                    "priority": message.priority.value if hasattr(message.priority, "value") else message.priority,
-                },
-            )
+            await bus.publish(topic, self._bus_payload(message))
         except Exception as e:
             self.logger.error("send_message_failed", error=str(e), message_id=message.message_id)
+            return False
+        return True
+
+    async def send_messages(self, messages: List[ASOCMessage]) -> bool:
+        """Publish messages with one pipelined round trip per target topic.
+
+        Returns False if any topic failed to publish, so that callers only
+        commit a cursor or offset past messages that were delivered.
+        """
+        if not messages:
+            return True
+        from src.asoc.core.message_bus import get_message_bus
+
+        by_topic: Dict[str, List[Dict[str, Any]]] = {}
+        for message in messages:
+            by_topic.setdefault(message.target_agent or "broadcast", []).append(self._bus_payload(message))
+        self.logger.info("sending_messages", count=len(messages), topics=list(by_topic))
+        try:
+            bus = await get_message_bus()
+            for topic, payloads in by_topic.items():
+                await bus.publish_batch(topic, payloads)
+        except Exception as e:
+            self.logger.error("send_messages_failed", error=str(e), count=len(messages))
+            return False
+        return True
 
     async def log_event(self, event_type: str, details: Dict[str, Any]) -> None:
         self.logger.info("audit_event", event_type=event_type, details=details)
@@ -160,6 +186,21 @@ class BaseAgent(abc.ABC):
         except Exception as e:
             self.logger.error("event_persist_failed", error=str(e), event_type=event_type)
 
+    async def log_events(self, event_type: str, details: List[Dict[str, Any]]) -> bool:
+        """Persist several audit events of one type in a single bulk write; False if the write failed."""
+        if not details:
+            return True
+        self.logger.info("audit_events", event_type=event_type, count=len(details))
+        try:
+            from src.asoc.core.event_store import PostgresEventStore
+
+            store = PostgresEventStore()
+            await store.append_events(event_type, details, self.name)
+        except Exception as e:
+            self.logger.error("event_persist_failed", error=str(e), event_type=event_type, count=len(details))
+            return False
+        return True
+
     def __repr__(self) -> str:
         tools = self.tool_registry.list_tool_names()
         return f"Agent(name={self.name}, type={self.__class__.__name__}, tools={tools})"
@@ -0,0 +1,322 @@
+"""Streaming behavioural baselines per principal and resource.
+
+Every event updates the baseline of the principal that made the call and of
+the resource it touched. A baseline is an exponentially weighted mean and
+variance of four features:
+
+- `rate`: log of the entity's event count in the current window
+  (`rate_window_seconds`), against the EWMA of its past windows, so a burst
+  of calls stands out against its usual pace;
+- `region`, `source_ip`, `api`: the surprise (-log frequency) of the value
+  seen, against EWMA frequencies over a hashed vocabulary, so a first call
+  from a new region, address or API stands out.
+
+The z-score of each feature is taken before the event is folded in, and
+only once the entity has `min_observations` events behind it. State lives
+in NumPy arrays with one row per entity; a batch is applied in rounds of at
+most one event per entity, so each round is a handful of vectorised
+operations whatever the batch size. At `max_entities` a new entity takes
+over the row of the least recently seen one. `snapshot` writes the arrays to an
+`.npz` file that a new store loads on start.
+"""
+
+import os
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from src.asoc.core.logging import get_logger
+from src.asoc.core.metrics import get_metrics
+from src.asoc.core.watermarks import event_timestamp
+
+logger = get_logger("asoc.agents.baseline")
+
+FEATURES = ("rate", "region", "source_ip", "api")
+BUCKETS = 64
+# Floor on the frequency of an unseen value, and on the variance a z-score
+# divides by, so a perfectly regular entity does not produce infinite scores.
+MIN_FREQUENCY = 1e-3
+MIN_VARIANCE = 0.1
+# Closed rate windows an entity needs before its rate is scored.
+MIN_RATE_WINDOWS = 3
+_CATEGORIES = len(FEATURES) - 1
+_STATE = ("mean", "var", "freq", "count", "window", "window_count", "windows")
+_INITIAL_CAPACITY = 64
+
+
+@dataclass
+class BaselineScore:
+    entity: Optional[str] = None
+    zscore: float = 0.0
+    features: Dict[str, float] = field(default_factory=dict)
+    observations: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "entity": self.entity,
+            "zscore": self.zscore,
+            "features": self.features,
+            "observations": self.observations,
+        }
+
+
+def principal_id(event: Dict[str, Any]) -> Optional[str]:
+    """The identity that made the call: IAM ARN or user name, or Kubernetes username."""
+    identity = event.get("userIdentity") or event.get("UserIdentity") or event.get("user") or {}
+    if not isinstance(identity, dict):
+        return None
+    return identity.get("arn") or identity.get("userName") or identity.get("principalId") or identity.get("username")
+
+
+def entity_keys(event: Dict[str, Any]) -> List[str]:
+    """The principal and resource an event is attributed to, as store keys."""
+    keys = []
+    principal = principal_id(event)
+    if principal:
+        keys.append(f"principal:{principal}")
+    resources = event.get("resources") or event.get("Resources") or []
+    if isinstance(resources, list) and resources and isinstance(resources[0], dict):
+        resource = resources[0].get("ARN") or resources[0].get("arn") or resources[0].get("ResourceName")
+        if resource:
+            keys.append(f"resource:{resource}")
+    return keys
+
+
+def _bucket(value: Any) -> int:
+    return zlib.crc32(str(value or "").encode()) % BUCKETS
+
+
+def _categories(event: Dict[str, Any]) -> Tuple[int, int, int]:
+    return (
+        _bucket(event.get("awsRegion") or event.get("region")),
+        _bucket(event.get("sourceIPAddress") or event.get("source_ip")),
+        _bucket(event.get("eventName") or event.get("EventName") or event.get("event_name")),
+    )
+
+
+class BaselineStore:
+    def __init__(
+        self,
+        alpha: float = 0.05,
+        rate_window_seconds: float = 300.0,
+        min_observations: int = 20,
+        max_entities: int = 100_000,
+        path: Optional[str] = None,
+        snapshot_seconds: float = 300.0,
+    ):
+        self.alpha = alpha
+        self.rate_window_seconds = rate_window_seconds
+        self.min_observations = min_observations
+        self.max_entities = max_entities
+        self.path = path
+        self.snapshot_seconds = snapshot_seconds
+        self._last_snapshot = time.monotonic()
+        # Key to row, least recently seen first.
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._keys: List[str] = []
+        self._evicting = False
+        self._allocate(_INITIAL_CAPACITY)
+        if path and Path(path).exists():
+            self.load(path)
+
+    @classmethod
+    def from_settings(cls, config=None) -> "BaselineStore":
+        from src.asoc.core.config import settings
+
+        config = config or settings
+        return cls(
+            alpha=config.DETECTION_BASELINE_ALPHA,
+            rate_window_seconds=config.DETECTION_BASELINE_RATE_WINDOW_SECONDS,
+            min_observations=config.DETECTION_BASELINE_MIN_OBSERVATIONS,
+            max_entities=config.DETECTION_BASELINE_MAX_ENTITIES,
+            path=config.DETECTION_BASELINE_PATH or None,
+            snapshot_seconds=config.DETECTION_BASELINE_SNAPSHOT_SECONDS,
+        )
+
+    def _allocate(self, capacity: int) -> None:
+        self._mean = np.zeros((capacity, len(FEATURES)))
+        self._var = np.zeros((capacity, len(FEATURES)))
+        self._freq = np.zeros((capacity, _CATEGORIES, BUCKETS), dtype=np.float32)
+        self._count = np.zeros(capacity, dtype=np.int64)
+        self._window = np.zeros(capacity, dtype=np.int64)
+        self._window_count = np.zeros(capacity)
+        self._windows = np.zeros(capacity, dtype=np.int64)
+
+    def _grow(self, needed: int) -> None:
+        capacity = len(self._count)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2)
+        for name in _STATE:
+            old = getattr(self, f"_{name}")
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[: len(old)] = old
+            setattr(self, f"_{name}", new)
+
+    def _row(self, key: str, touched: Set[str]) -> int:
+        """The row for `key`; at `max_entities`, the least recently seen entity's row, reset."""
+        row = self._index.get(key)
+        if row is not None:
+            self._index.move_to_end(key)
+        elif len(self._keys) < self.max_entities:
+            row = self._index[key] = len(self._keys)
+            self._keys.append(key)
+        else:
+            oldest = next(iter(self._index), None)
+            if oldest is None or oldest in touched:
+                # Every tracked entity is already in this batch.
+                get_metrics().inc_counter("detection_baseline_rejected_total")
+                return -1
+            if not self._evicting:
+                self._evicting = True
+                logger.warning("baseline_entity_cap_reached", max_entities=self.max_entities)
+            row = self._index.pop(oldest)
+            for name in _STATE:
+                getattr(self, f"_{name}")[row] = 0
+            self._index[key] = row
+            self._keys[row] = key
+            get_metrics().inc_counter("detection_baseline_evictions_total")
+        touched.add(key)
+        return row
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def observe(self, events: List[Dict[str, Any]]) -> List[BaselineScore]:
+        """Score each event against its entities' baselines, then update them."""
+        now = time.time()
+        pair_event, pair_row, pair_key, pair_cats, pair_ts = [], [], [], [], []
+        touched: Set[str] = set()
+        for i, event in enumerate(events):
+            cats, ts = _categories(event), event_timestamp(event, now)
+            for key in entity_keys(event):
+                row = self._row(key, touched)
+                if row < 0:
+                    continue
+                pair_event.append(i)
+                pair_row.append(row)
+                pair_key.append(key)
+                pair_cats.append(cats)
+                pair_ts.append(ts)
+        scores = [BaselineScore() for _ in events]
+        if not pair_row:
+            return scores
+        self._grow(len(self._keys))
+
+        rows = np.asarray(pair_row)
+        cats = np.asarray(pair_cats, dtype=np.int64)
+        ts = np.asarray(pair_ts)
+        # Rank each pair among the pairs for the same entity: round r applies
+        # every entity's r-th event, so no row is written twice in a round.
+        order = np.argsort(rows, kind="stable")
+        sorted_rows = rows[order]
+        starts = np.r_[0, np.flatnonzero(np.diff(sorted_rows)) + 1]
+        rank = np.empty(len(rows), dtype=np.int64)
+        rank[order] = np.arange(len(rows)) - np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+        z = np.zeros((len(rows), len(FEATURES)))
+        counts = np.zeros(len(rows), dtype=np.int64)
+        for r in range(int(rank.max()) + 1):
+            sel = np.flatnonzero(rank == r)
+            counts[sel] = self._count[rows[sel]]
+            z[sel] = self._update(rows[sel], cats[sel], ts[sel])
+
+        peak = z.max(axis=1)
+        for p in range(len(rows)):
+            score = scores[pair_event[p]]
+            if score.entity is None or peak[p] > score.zscore:
+                score.entity = pair_key[p]
+                score.zscore = round(max(0.0, float(peak[p])), 3)
+                score.features = {name: round(float(v), 3) for name, v in zip(FEATURES, z[p])}
+                score.observations = int(counts[p])
+        return scores
+
+    def _update(self, rows: np.ndarray, cats: np.ndarray, ts: np.ndarray) -> np.ndarray:
+        alpha = self.alpha
+        count = self._count[rows]
+        first = count == 0
+        mean, var = self._mean[rows], self._var[rows]
+
+        # Rate: events per window. When an event opens a new window, the
+        # entity's last window is folded into the rate baseline and any empty
+        # windows since decay it towards zero.
+        window = np.floor(ts / self.rate_window_seconds).astype(np.int64)
+        rolled = ~first & (window > self._window[rows])
+        seeded = rolled & (self._windows[rows] == 0)
+        closed = np.log1p(self._window_count[rows])
+        diff = closed - mean[:, 0]
+        mean[:, 0] = np.where(seeded, closed, np.where(rolled, mean[:, 0] + alpha * diff, mean[:, 0]))
+        var[:, 0] = np.where(rolled & ~seeded, (1 - alpha) * (var[:, 0] + alpha * diff * diff), var[:, 0])
+        empty = np.where(rolled, window - self._window[rows] - 1, 0)
+        decay = (1 - alpha) ** empty
+        var[:, 0] = decay * var[:, 0] + decay * (1 - decay) * mean[:, 0] ** 2
+        mean[:, 0] *= decay
+        self._windows[rows] += np.where(rolled, empty + 1, 0)
+        window_count = np.where(first | rolled, 1.0, self._window_count[rows] + 1.0)
+        self._window[rows] = np.where(first | rolled, window, self._window[rows])
+        self._window_count[rows] = window_count
+
+        dims = np.arange(_CATEGORIES)
+        x = np.empty((len(rows), len(FEATURES)))
+        x[:, 0] = np.log1p(window_count)
+        x[:, 1:] = -np.log(np.maximum(self._freq[rows[:, None], dims, cats], MIN_FREQUENCY))
+        x[first, 1:] = 0.0
+
+        z = (x - mean) / np.sqrt(var + MIN_VARIANCE)
+        z[count < self.min_observations] = 0.0
+        z[self._windows[rows] < MIN_RATE_WINDOWS, 0] = 0.0
+
+        # The rate baseline only moves when a window closes (above); the
+        # value features move with every event.
+        diff = x[:, 1:] - mean[:, 1:]
+        incr = alpha * diff
+        mean[:, 1:] = np.where(first[:, None], x[:, 1:], mean[:, 1:] + incr)
+        var[:, 1:] = np.where(first[:, None], 0.0, (1 - alpha) * (var[:, 1:] + diff * incr))
+        self._mean[rows] = mean
+        self._var[rows] = var
+        # An entity's first value starts at full frequency rather than alpha,
+        # so warm-up does not inflate the variance of the surprise features.
+        self._freq[rows] *= np.where(first, 0.0, 1 - alpha)[:, None, None]
+        self._freq[rows[:, None], dims, cats] += np.where(first, 1.0, alpha)[:, None]
+        self._count[rows] = count + 1
+        return z
+
+    def snapshot(self, path: Optional[str] = None) -> None:
+        path = path or self.path
+        if not path:
+            return
+        n = len(self._keys)
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix(target.suffix + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                keys=np.array(self._keys, dtype=str),
+                **{name: getattr(self, f"_{name}")[:n] for name in _STATE},
+            )
+        os.replace(tmp, target)
+        self._last_snapshot = time.monotonic()
+
+    def maybe_snapshot(self) -> None:
+        """Snapshot if `snapshot_seconds` have passed since the last one."""
+        if self.path and time.monotonic() - self._last_snapshot >= self.snapshot_seconds:
+            self.snapshot()
+
+    def load(self, path: str) -> None:
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                keys = [str(k) for k in data["keys"]]
+                self._allocate(max(_INITIAL_CAPACITY, len(keys)))
+                for name in _STATE:
+                    getattr(self, f"_{name}")[: len(keys)] = data[name]
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning("baseline_snapshot_unreadable", path=path, error=str(e))
+            self._allocate(_INITIAL_CAPACITY)
+            keys = []
+        self._keys = keys
+        self._index = OrderedDict((key, row) for row, key in enumerate(keys))
@@ -1,15 +1,29 @@
-from typing import Any, Dict, List, Optional
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Set
 
 from langsmith import traceable
 
 from src.asoc.agents.base import BaseAgent, HIGH_RISK_TOOLS
+from src.asoc.agents.baseline import BaselineStore
 from src.asoc.agents.message import ASOCMessage, MessageType, Priority
 from src.asoc.agents.observation import AgentObservation, ObservationNextState
+from src.asoc.agents.prefilter import ALLOW_RISK, ESCALATE_RISK, DetectionTier, EntityReputation, triage_event
+from src.asoc.agents.sequences import SequenceEngine, SequenceMatch
 from src.asoc.agents.state import AgentState
+from src.asoc.agents.tools import PlanStep, Ref
+from src.asoc.agents.triage_model import TriageModel
+from src.asoc.core.config import settings
+from src.asoc.core.metrics import get_metrics
+from src.asoc.guardrails.scorer import RiskScorer
 from src.asoc.llm.providers import LLMProvider, LLMResult, MockProvider, create_llm_provider
+from src.asoc.llm.scheduler import llm_priority
 from src.asoc.mitre.mapper import MitreTechnique, mitre_mapper
+from src.asoc.rules import RuleEngine
 from src.asoc.middleware.prompt_injection import validate_agent_input
 
+# What a chain's alert keeps of each per-event alert it absorbs.
+_CHILD_FIELDS = ("risk_score", "threat_detected", "reasoning", "attack_technique", "triage", "rules")
+
 
 class DetectionAgent(BaseAgent):
     def __init__(self, provider: Optional[LLMProvider] = None):
@@ -17,8 +31,33 @@ class DetectionAgent(BaseAgent):
             name="DetectionAgent", description="Anomaly detection + LLM reasoning + MITRE ATT&CK over security logs"
         )
         self._provider = provider or create_llm_provider()
+        self._reputation = EntityReputation.from_settings()
+        self.prefilter_enabled = settings.DETECTION_PREFILTER_ENABLED
+        self._baselines = BaselineStore.from_settings() if settings.DETECTION_BASELINE_ENABLED else None
+        self.baseline_zscore = settings.DETECTION_BASELINE_ZSCORE
+        self._rules = RuleEngine.from_settings() if settings.DETECTION_RULES_ENABLED else None
+        self._sequences = (
+            SequenceEngine(max_states=settings.DETECTION_SEQUENCE_MAX_STATES) if settings.DETECTION_SEQUENCES_ENABLED else None
+        )
+        self._triage_model = (
+            TriageModel.latest(settings.DETECTION_TRIAGE_MODEL_DIR) if settings.DETECTION_TRIAGE_MODEL_ENABLED else None
+        )
+        self.model_allow_below = settings.DETECTION_TRIAGE_MODEL_ALLOW_BELOW
+        self.model_escalate_above = settings.DETECTION_TRIAGE_MODEL_ESCALATE_ABOVE
+        self.early_escalation_risk = settings.DETECTION_EARLY_ESCALATION_RISK
+        self.need_reasoning = settings.LLM_STREAM_REASONING
+        self._early_sends: Set[asyncio.Task] = set()
+        self._pending: List[ASOCMessage] = []
+        self._flush_task: Optional[asyncio.Task] = None
 
     def _register_default_tools(self) -> None:
+        self.tool_registry.register(
+            name="triage_event",
+            func=self._tool_triage_event,
+            description="Deterministic prefilter: allow, escalate or send the event to LLM analysis",
+            input_schema={"event_data": {"type": "object"}, "baseline": {"type": "object"}, "triage": {"type": "object"}},
+            output_schema={"tier": {"type": "string"}, "risk_score": {"type": "number"}},
+        )
         self.tool_registry.register(
             name="analyze_threat_llm",
             func=self._tool_analyze_threat,
@@ -44,7 +83,13 @@ class DetectionAgent(BaseAgent):
             name="calculate_risk_score",
             func=self._tool_calculate_risk,
             description="Combine LLM analysis with rule-based scoring to produce final risk score",
-            input_schema={"llm_result": {"type": "object"}, "mitre": {"type": "object"}, "event_data": {"type": "object"}},
+            input_schema={
+                "llm_result": {"type": "object"},
+                "mitre": {"type": "object"},
+                "event_data": {"type": "object"},
+                "baseline": {"type": "object"},
+                "rule_hits": {"type": "array"},
+            },
             output_schema={"final_risk_score": {"type": "number"}, "confidence": {"type": "number"}},
         )
 
@@ -56,25 +101,214 @@ class DetectionAgent(BaseAgent):
             return mitre_mapper.map_by_event_name(llm_technique)
         return None
 
+    def _triage(self, event_data: dict, baseline: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return self._triage_many([event_data], [baseline])[0]
+
+    def _triage_many(self, events: List[dict], baselines: List[Optional[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Prefilter each event, then score what it leaves undecided with the triage model in one batch."""
+        if not self.prefilter_enabled:
+            return [
+                {"tier": DetectionTier.NEEDS_LLM.value, "risk_score": None, "reasons": ["prefilter disabled"]}
+                for _ in events
+            ]
+        metrics = get_metrics()
+        triages = []
+        for event_data in events:
+            decision = triage_event(event_data, self._reputation)
+            result = decision.to_dict()
+            if decision.tier != DetectionTier.NEEDS_LLM:
+                result["verdict"] = decision.as_llm_result()
+                result["decided_by"] = "prefilter"
+            triages.append(result)
+
+        undecided = [i for i, triage in enumerate(triages) if "verdict" not in triage]
+        if self._triage_model is not None and undecided:
+            model = self._triage_model
+            scores = model.predict([events[i] for i in undecided], [baselines[i] for i in undecided])
+            for i, score in zip(undecided, scores.tolist()):
+                triage = triages[i]
+                triage["model_score"] = round(score, 4)
+                if score <= self.model_allow_below:
+                    tier, risk, threat = DetectionTier.ALLOW, ALLOW_RISK, False
+                elif score >= self.model_escalate_above:
+                    tier, risk, threat = DetectionTier.ESCALATE, ESCALATE_RISK, True
+                else:
+                    metrics.inc_counter("detection_triage_model_total", decision="llm")
+                    continue
+                metrics.inc_counter("detection_triage_model_total", decision=tier.value)
+                reason = f"triage model v{model.version} scored {score:.3f}"
+                triage.update(tier=tier.value, risk_score=risk, reasons=triage["reasons"] + [reason], decided_by="model")
+                triage["verdict"] = {
+                    "threat_detected": threat,
+                    "risk_score": risk,
+                    "reasoning": f"Triage model {tier.value}: {reason}",
+                    "attack_technique": triage["attack_technique"],
+                }
+        for triage in triages:
+            metrics.inc_counter("detection_tier_total", tier=triage["tier"])
+        return triages
+
+    def _match_rules(self, events: List[dict]) -> List[List[Dict[str, Any]]]:
+        """The detection rules each event matches, in one pass per event."""
+        if self._rules is None:
+            return [[] for _ in events]
+        self._rules.maybe_reload()
+        metrics = get_metrics()
+        matched = []
+        for event in events:
+            hits = self._rules.evaluate(event)
+            for hit in hits:
+                metrics.inc_counter("detection_rule_hits_total", rule=hit.rule_id)
+            matched.append([hit.to_dict() for hit in hits])
+        return matched
+
+    def _baseline(self, events: List[dict]) -> List[Optional[Dict[str, Any]]]:
+        """Score events against, and fold them into, the behaviour baselines."""
+        if self._baselines is None:
+            return [None] * len(events)
+        scores = self._baselines.observe(events)
+        metrics = get_metrics()
+        for score in scores:
+            if score.zscore >= self.baseline_zscore:
+                metrics.inc_counter("detection_baseline_anomalies_total")
+        metrics.set_gauge("detection_baseline_entities", len(self._baselines))
+        self._baselines.maybe_snapshot()
+        return [score.to_dict() if score.entity else None for score in scores]
+
+    def correlate(self, events: List[dict]) -> List[ASOCMessage]:
+        """Feed events to the sequence engine; one alert per completed chain."""
+        if self._sequences is None:
+            return []
+        matches = self._sequences.observe_many(events)
+        metrics = get_metrics()
+        for match in matches:
+            metrics.inc_counter("detection_sequence_matches_total", rule=match.rule.name)
+        metrics.set_gauge("detection_sequence_states", len(self._sequences))
+        return [self._sequence_alert(match) for match in matches]
+
+    def _sequence_alert(self, match: SequenceMatch) -> ASOCMessage:
+        rule = match.rule
+        reasoning = (
+            f"Sequence {rule.name} by {match.entity}: {' -> '.join(match.to_dict()['steps'])} "
+            f"within {int(match.ended - match.started)}s. {rule.description}"
+        ).strip()
+        return ASOCMessage(
+            message_type=MessageType.ALERT,
+            source_agent=self.name,
+            payload={
+                "risk_score": rule.risk_score,
+                "reasoning": reasoning,
+                "attack_technique": rule.technique,
+                "mitre": {},
+                "threat_detected": True,
+                "triage": {"tier": DetectionTier.ESCALATE.value, "reasons": [f"sequence {rule.name}"], "decided_by": "sequence"},
+                "baseline": None,
+                "rules": [],
+                "correlation": match.to_dict(),
+                "original_event": match.events[-1],
+            },
+            priority=Priority.CRITICAL if rule.risk_score >= 0.9 else Priority.HIGH,
+        )
+
+    @staticmethod
+    def _attach_to_sequences(results: List[ASOCMessage], correlated: List[ASOCMessage]) -> List[ASOCMessage]:
+        """Fold the alerts for a completed chain's events into the chain's alert.
+
+        Alerts in this batch whose event is one of a chain's steps (matched on
+        `eventID`) become `payload.children` of the correlated alert instead
+        of being published on their own.
+        """
+        if not correlated:
+            return results
+        owners: Dict[str, ASOCMessage] = {}
+        for alert in correlated:
+            for event_id in alert.payload["correlation"]["event_ids"]:
+                if event_id:
+                    owners.setdefault(event_id, alert)
+        remaining = []
+        for result in results:
+            event = result.payload.get("original_event") or {}
+            event_id = event.get("eventID") or event.get("EventId")
+            owner = owners.get(event_id)
+            if owner is None:
+                remaining.append(result)
+                continue
+            owner.payload["risk_score"] = max(owner.payload["risk_score"], result.payload["risk_score"])
+            owner.payload.setdefault("children", []).append(
+                {"event_id": event_id, **{key: result.payload.get(key) for key in _CHILD_FIELDS}}
+            )
+        return remaining + correlated
+
+    async def _tool_triage_event(
+        self, event_data: dict, baseline: Optional[Dict[str, Any]] = None, triage: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Triage `event_data`, or return `triage` when the event has already been triaged."""
+        return triage if triage is not None else self._triage(event_data, baseline)
+
+    def _early_verdict(self, event_data: dict) -> Callable[[Dict[str, Any]], None]:
+        """A callback for the streamed verdict: escalate a likely threat before the analysis completes."""
+
+        def on_verdict(verdict: Dict[str, Any]) -> None:
+            risk = verdict.get("risk_score") or 0.0
+            if not verdict.get("threat_detected") or risk < self.early_escalation_risk:
+                return
+            get_metrics().inc_counter("detection_early_escalations_total")
+            message = ASOCMessage(
+                message_type=MessageType.ALERT,
+                source_agent=self.name,
+                target_agent="SupervisorAgent",
+                payload={
+                    "risk_score": risk,
+                    "threat_detected": True,
+                    "reasoning": "Early LLM verdict; full analysis in progress",
+                    "early_verdict": verdict,
+                    "original_event": event_data,
+                },
+                correlation_id=event_data.get("eventID") or event_data.get("EventId"),
+                priority=Priority.CRITICAL,
+            )
+            task = asyncio.ensure_future(self.send_messages([message]))
+            self._early_sends.add(task)
+            task.add_done_callback(self._early_sends.discard)
+
+        return on_verdict
+
     async def _tool_analyze_threat(self, event_data: dict) -> Dict[str, Any]:
         try:
-            result = await self._provider.analyze(event_data)
-            return {
-                "threat_detected": result.threat_detected,
-                "risk_score": result.risk_score,
-                "reasoning": result.reasoning,
-                "attack_technique": result.attack_technique,
-            }
+            result = await self._provider.analyze(
+                event_data, on_verdict=self._early_verdict(event_data), need_reasoning=self.need_reasoning
+            )
         except Exception as e:
             self.logger.error("llm_analysis_failed", error=str(e))
+            return self._llm_dict(await MockProvider().analyze(event_data), "fallback")
+        return self._llm_dict(result, self._llm_source)
+
+    @property
+    def _llm_source(self) -> str:
+        # Mock verdicts are heuristics, not LLM labels: the triage model must
+        # not be trained on them.
+        return "mock" if isinstance(self._provider, MockProvider) else "llm"
+
+    @staticmethod
+    def _llm_dict(result: LLMResult, decided_by: str = "llm") -> Dict[str, Any]:
+        return {
+            "threat_detected": result.threat_detected,
+            "risk_score": result.risk_score,
+            "reasoning": result.reasoning,
+            "attack_technique": result.attack_technique,
+            "decided_by": decided_by,
+        }
+
+    async def _analyze_batch_llm(self, events: List[dict]) -> List[Dict[str, Any]]:
+        if len(events) == 1:
+            return [await self.tool_registry.execute("analyze_threat_llm", event_data=events[0])]
+        try:
+            results = await self._provider.analyze_batch(events)
+        except Exception as e:
+            self.logger.error("llm_batch_analysis_failed", error=str(e), count=len(events))
             fallback = MockProvider()
-            result = await fallback.analyze(event_data)
-            return {
-                "threat_detected": result.threat_detected,
-                "risk_score": result.risk_score,
-                "reasoning": result.reasoning,
-                "attack_technique": result.attack_technique,
-            }
+            return [self._llm_dict(await fallback.analyze(event), "fallback") for event in events]
+        return [self._llm_dict(result, self._llm_source) for result in results]
 
     async def _tool_map_mitre(self, event_data: dict, llm_technique: Optional[str] = None) -> Optional[Dict[str, Any]]:
         mitre = self._enrich_mitre(event_data, llm_technique)
@@ -91,13 +325,23 @@ class DetectionAgent(BaseAgent):
             "event_type": event_type,
         }
 
-    async def _tool_calculate_risk(self, llm_result: dict, mitre: Optional[dict], event_data: dict) -> Dict[str, Any]:
+    async def _tool_calculate_risk(
+        self,
+        llm_result: dict,
+        mitre: Optional[dict],
+        event_data: dict,
+        baseline: Optional[dict] = None,
+        rule_hits: Optional[List[dict]] = None,
+    ) -> Dict[str, Any]:
         base_score = llm_result.get("risk_score", 0.5)
         mitre_boost = 0.1 if mitre else 0.0
-        event_name = event_data.get("eventName", event_data.get("event_name", ""))
-        high_risk_events = {"ConsoleLogin", "CreateUser", "DeleteBucket", "TerminateInstance", "AuthorizeSecurityGroupIngress"}
-        event_boost = 0.15 if event_name in high_risk_events else 0.0
-        final_score = min(1.0, base_score + mitre_boost + event_boost)
+        if rule_hits is None:
+            # The event's hits were not passed in. Evaluating `count` rules
+            # again would count the event twice, so only stateless rules apply.
+            rule_hits = [hit.to_dict() for hit in self._rules.evaluate(event_data, stateful=False)] if self._rules else []
+        event_boost = max((hit["risk_boost"] for hit in rule_hits), default=0.0)
+        anomaly_boost = RiskScorer.anomaly_boost(baseline["zscore"], self.baseline_zscore) if baseline else 0.0
+        final_score = min(1.0, base_score + mitre_boost + event_boost + anomaly_boost)
         confidence = 0.8 if mitre else 0.6
         if base_score > 0.9:
             confidence = 0.95
@@ -106,12 +350,57 @@ class DetectionAgent(BaseAgent):
     async def analyze_threat(self, event_data: dict) -> ASOCMessage:
         validate_agent_input("DetectionAgent", event_data=str(event_data))
 
-        tool_calls = [
-            {"tool": "analyze_threat_llm", "args": {"event_data": event_data}},
-        ]
-        llm_result = await self.tool_registry.execute("analyze_threat_llm", event_data=event_data)
-        mitre = await self.tool_registry.execute("map_mitre_technique", event_data=event_data, llm_technique=llm_result.get("attack_technique"))
-        risk = await self.tool_registry.execute("calculate_risk_score", llm_result=llm_result, mitre=mitre, event_data=event_data)
+        baseline = self._baseline([event_data])[0]
+        rule_hits = self._match_rules([event_data])[0]
+        triage = await self.tool_registry.execute("triage_event", event_data=event_data, baseline=baseline)
+        return await self._alert_for(event_data, triage, triage.get("verdict"), baseline, rule_hits)
+
+    async def analyze_threats(self, events: List[dict]) -> List[ASOCMessage]:
+        """Analyse several events, sending every undecided one to the LLM in one batch."""
+        for event_data in events:
+            validate_agent_input("DetectionAgent", event_data=str(event_data))
+
+        baselines = self._baseline(events)
+        rule_hits = self._match_rules(events)
+        triages = self._triage_many(events, baselines)
+        undecided = [i for i, triage in enumerate(triages) if "verdict" not in triage]
+        llm_results = [triage.get("verdict") for triage in triages]
+        if undecided:
+            batch = await self._analyze_batch_llm([events[i] for i in undecided])
+            for i, result in zip(undecided, batch):
+                llm_results[i] = result
+        return list(await asyncio.gather(*(
+            self._alert_for(*args) for args in zip(events, triages, llm_results, baselines, rule_hits)
+        )))
+
+    async def _alert_for(
+        self,
+        event_data: dict,
+        triage: Dict[str, Any],
+        llm_result: Optional[Dict[str, Any]],
+        baseline: Optional[Dict[str, Any]] = None,
+        rule_hits: Optional[List[Dict[str, Any]]] = None,
+    ) -> ASOCMessage:
+        # The event's own MITRE mapping does not wait for the LLM; the LLM's
+        # technique is only a fallback when the event maps to nothing.
+        plan = {"mitre": PlanStep("map_mitre_technique", {"event_data": event_data})}
+        if llm_result is None:
+            plan["llm"] = PlanStep("analyze_threat_llm", {"event_data": event_data})
+        results = await self.tool_registry.execute_plan(plan)
+        llm_result = results.get("llm", llm_result)
+        mitre = results["mitre"]
+        if mitre is None and llm_result.get("attack_technique"):
+            mitre = await self.tool_registry.execute(
+                "map_mitre_technique", event_data=event_data, llm_technique=llm_result["attack_technique"]
+            )
+        risk = await self.tool_registry.execute(
+            "calculate_risk_score",
+            llm_result=llm_result,
+            mitre=mitre,
+            event_data=event_data,
+            baseline=baseline,
+            rule_hits=rule_hits,
+        )
 
         return ASOCMessage(
             message_type=MessageType.ALERT,
@@ -119,8 +408,19 @@ class DetectionAgent(BaseAgent):
             payload={
                 "risk_score": risk["final_risk_score"],
                 "reasoning": llm_result["reasoning"],
-                "attack_technique": llm_result.get("attack_technique") or (mitre["technique_id"] if mitre else None),
+                "attack_technique": llm_result.get("attack_technique")
+                or (mitre["technique_id"] if mitre else None)
+                or next((hit["technique"] for hit in rule_hits or [] if hit["technique"]), None),
                 "mitre": mitre or {},
+                "threat_detected": bool(llm_result.get("threat_detected")),
+                "triage": {
+                    "tier": triage["tier"],
+                    "reasons": triage["reasons"],
+                    "decided_by": triage.get("decided_by") or llm_result.get("decided_by", "llm"),
+                    "model_score": triage.get("model_score"),
+                },
+                "baseline": baseline,
+                "rules": rule_hits or [],
                 "original_event": event_data,
             },
             priority=Priority.HIGH if risk["final_risk_score"] > 0.7 else Priority.MEDIUM,
@@ -132,52 +432,83 @@ class DetectionAgent(BaseAgent):
         event_data = {}
         if latest_msg:
             event_data = latest_msg.payload.get("event", latest_msg.payload)
-        return {"event_data": event_data, "message_count": len(state.get("messages", []))}
+        baseline = self._baseline([event_data])[0] if event_data else None
+        return {
+            "event_data": event_data,
+            "message_count": len(state.get("messages", [])),
+            "triage": self._triage(event_data, baseline),
+            "baseline": baseline,
+            "rule_hits": self._match_rules([event_data])[0] if event_data else [],
+        }
 
     @traceable(name="detection_reason", run_type="chain")
     async def reason(self, state: AgentState, perceived: Dict[str, Any]) -> List[Dict[str, Any]]:
         event_data = perceived.get("event_data", {})
-        calls = [
-            {"tool": "analyze_threat_llm", "args": {"event_data": event_data}},
-            {"tool": "map_mitre_technique", "args": {"event_data": event_data}},
-        ]
+        triage = perceived.get("triage") or {}
+        calls = []
+        if "verdict" in triage:
+            # Decided in perceive: its verdict stands in for the LLM's. The
+            # triage is passed through rather than run (and counted) again.
+            calls.append({
+                "tool": "triage_event",
+                "args": {"event_data": event_data, "baseline": perceived.get("baseline"), "triage": triage},
+            })
+        else:
+            calls.append({"tool": "analyze_threat_llm", "args": {"event_data": event_data}})
+        calls.append({"tool": "map_mitre_technique", "args": {"event_data": event_data}})
         event_name = event_data.get("eventName", event_data.get("event_name", ""))
         if event_name:
             calls.append({"tool": "query_risk_rules", "args": {"event_type": event_name}})
         calls.append({
             "tool": "calculate_risk_score",
-            "args": {"llm_result": {}, "mitre": None, "event_data": event_data},
+            "args": {
+                "llm_result": {},
+                "mitre": None,
+                "event_data": event_data,
+                "baseline": perceived.get("baseline"),
+                "rule_hits": perceived.get("rule_hits", []),
+            },
         })
         return calls
 
     @traceable(name="detection_act", run_type="chain")
     async def act(self, tool_calls: List[Dict[str, Any]], state: AgentState) -> List[Any]:
-        results = []
-        llm_result = None
-        mitre = None
-        for call in tool_calls:
-            tool_name = call["tool"]
-            args = call.get("args", {})
-            if tool_name == "calculate_risk_score":
-                args["llm_result"] = llm_result or {}
-                args["mitre"] = mitre
-            result = await self.tool_registry.execute(tool_name, **args)
-            if tool_name == "analyze_threat_llm":
-                llm_result = result
-            elif tool_name == "map_mitre_technique":
-                mitre = result
-            results.append(result)
-        return results
+        # Only the risk score depends on other calls; everything else runs concurrently.
+        plan: Dict[str, PlanStep] = {}
+        llm_ref = mitre_ref = None
+        for i, call in enumerate(tool_calls):
+            node = f"{i}:{call['tool']}"
+            args = dict(call.get("args", {}))
+            if call["tool"] == "calculate_risk_score":
+                args["llm_result"] = llm_ref or {}
+                args["mitre"] = mitre_ref
+            plan[node] = PlanStep(call["tool"], args)
+            if call["tool"] == "triage_event":
+                llm_ref = Ref(node, lambda r: r.get("verdict") or {})
+            elif call["tool"] == "analyze_threat_llm":
+                llm_ref = Ref(node, lambda r: r or {})
+            elif call["tool"] == "map_mitre_technique":
+                mitre_ref = Ref(node)
+        results = await self.tool_registry.execute_plan(plan)
+        return list(results.values())
 
     @traceable(name="detection_observe", run_type="chain")
     async def observe(self, state: AgentState, tool_results: List[Any], tool_calls: List[Dict[str, Any]]) -> AgentObservation:
         llm_result = tool_results[0] if tool_results else {}
         risk_score = 0.5
         confidence = 0.5
+        triage = None
         for r in tool_results:
             if isinstance(r, dict) and "final_risk_score" in r:
                 risk_score = r["final_risk_score"]
                 confidence = r.get("confidence", 0.5)
+            elif isinstance(r, dict) and "tier" in r:
+                triage = r
+        if triage is not None and "verdict" in triage:
+            llm_result = triage["verdict"]
+            if triage["tier"] == DetectionTier.ALLOW.value:
+                # A deterministic allow is as certain as the rules behind it.
+                confidence = max(confidence, 0.9)
 
         if confidence < 0.7:
             next_state = ObservationNextState.ESCALATE
@@ -193,21 +524,66 @@ class DetectionAgent(BaseAgent):
             tools_used=[c["tool"] for c in tool_calls],
             next_state=next_state,
             risk_score=risk_score,
-            metadata={"llm_reasoning": llm_result.get("reasoning", "") if isinstance(llm_result, dict) else ""},
+            metadata={
+                "llm_reasoning": llm_result.get("reasoning", "") if isinstance(llm_result, dict) else "",
+                "triage_tier": triage["tier"] if triage else DetectionTier.NEEDS_LLM.value,
+                "triage_reasons": triage["reasons"] if triage else [],
+            },
         )
 
     async def process_message(self, message: ASOCMessage) -> Optional[ASOCMessage]:
-        if message.message_type == MessageType.ALERT and message.source_agent == "TelemetryAgent":
-            event = message.payload.get("event") or message.payload
-            analysis_result = await self.analyze_threat(event)
-            if analysis_result:
-                await self.send_message(analysis_result)
-                await self.log_event(
-                    "threat_detected",
-                    {
-                        "risk_score": analysis_result.payload["risk_score"],
-                        "reasoning": analysis_result.payload["reasoning"],
-                    },
-                )
-                return analysis_result
-        return None
+        results = await self.process_messages([message])
+        return results[0] if results else None
+
+    async def process_messages(self, messages: List[ASOCMessage]) -> List[ASOCMessage]:
+        """Analyse a batch of telemetry alerts and publish the results together."""
+        alerts = [m for m in messages if m.message_type == MessageType.ALERT and m.source_agent == "TelemetryAgent"]
+        if not alerts:
+            return []
+        events = [message.payload.get("event") or message.payload for message in alerts]
+        # The batch's LLM calls queue at the priority of its most urgent alert.
+        correlated = self.correlate(events)
+        with llm_priority(max(int(message.priority) for message in alerts)):
+            results = await self.analyze_threats(events)
+        published = self._attach_to_sequences(results, correlated)
+        await self.send_messages(published)
+        await self.log_events(
+            "threat_detected",
+            [
+                {
+                    "risk_score": r.payload["risk_score"],
+                    "reasoning": r.payload["reasoning"],
+                    # Event, verdict and who made it: training data for the triage model.
+                    "event": r.payload.get("original_event"),
+                    "threat_detected": r.payload.get("threat_detected"),
+                    "decided_by": r.payload.get("triage", {}).get("decided_by"),
+                    "baseline": r.payload.get("baseline"),
+                }
+                for r in results + correlated
+            ],
+        )
+        return published
+
+    async def submit(self, message: ASOCMessage) -> None:
+        """Queue an alert for micro-batched analysis.
+
+        The batch is flushed when it reaches `LLM_BATCH_MAX_EVENTS` or
+        `DETECTION_BATCH_MS` after its first alert, whichever comes first.
+        """
+        self._pending.append(message)
+        if len(self._pending) >= settings.LLM_BATCH_MAX_EVENTS:
+            await self.flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(settings.DETECTION_BATCH_MS / 1000)
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self) -> List[ASOCMessage]:
+        task, self._flush_task = self._flush_task, None
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+        batch, self._pending = self._pending, []
+        return await self.process_messages(batch) if batch else []
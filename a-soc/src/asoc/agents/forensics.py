@@ -9,6 +9,7 @@ from src.asoc.agents.base import BaseAgent
 from src.asoc.agents.message import ASOCMessage, MessageType, Priority
 from src.asoc.agents.observation import AgentObservation, ObservationNextState
 from src.asoc.agents.state import AgentState
+from src.asoc.agents.tools import PlanStep
 from src.asoc.vector.pinecone_provider import VectorRecord, vector_provider
 from src.asoc.middleware.prompt_injection import validate_agent_input
 
@@ -137,14 +138,16 @@ class ForensicsAgent(BaseAgent):
         validate_agent_input("ForensicsAgent", incident_data=str(incident_data))
 
         query_text = json.dumps(incident_data.get("data", incident_data))
-        similar = await self._tool_search_similar(query_text, top_k=3)
-
         events = incident_data.get("data", {}).get("events", [])
         if not events:
             events = [incident_data.get("data", incident_data)]
 
-        blast_radius = await self._tool_build_blast_radius(incident_data, events)
-        timeline = await self._tool_reconstruct_timeline(events)
+        results = await self.tool_registry.execute_plan({
+            "similar": PlanStep("search_similar_incidents", {"query_text": query_text, "top_k": 3}),
+            "blast_radius": PlanStep("build_blast_radius_graph", {"incident_data": incident_data, "events": events}),
+            "timeline": PlanStep("reconstruct_timeline", {"events": events}),
+        })
+        similar, blast_radius, timeline = results["similar"], results["blast_radius"], results["timeline"]
 
         reconstruction = {
             "root_cause": "Credential compromise detected via anomaly analysis",
@@ -181,11 +184,10 @@ class ForensicsAgent(BaseAgent):
 
     @traceable(name="forensics_act", run_type="chain")
     async def act(self, tool_calls: List[Dict[str, Any]], state: AgentState) -> List[Any]:
-        results = []
-        for call in tool_calls:
-            result = await self.tool_registry.execute(call["tool"], **call.get("args", {}))
-            results.append(result)
-        return results
+        # The forensics tools are independent of each other.
+        plan = {f"{i}:{call['tool']}": PlanStep(call["tool"], call.get("args", {})) for i, call in enumerate(tool_calls)}
+        results = await self.tool_registry.execute_plan(plan)
+        return list(results.values())
 
     @traceable(name="forensics_observe", run_type="chain")
     async def observe(self, state: AgentState, tool_results: List[Any], tool_calls: List[Dict[str, Any]]) -> AgentObservation:
@@ -0,0 +1,218 @@
+"""Kubernetes API-server audit log tailing.
+
+`K8sAuditLogProvider` follows the JSON-lines audit log written by
+`--audit-log-path`, plus the rotated files the API server leaves next to it
+(`audit-2026-03-01T12-00-00.000.log`). Read positions are kept per inode,
+not per file name, so when the active file is renamed away mid-read the
+tailer finishes it under its new name and then starts the replacement from
+the beginning. Offsets live in an `OffsetStore` and are committed only after
+the events have been published, like CloudTrail watermarks, so a restart
+neither re-reads nor skips lines.
+
+New bytes are read in blocks of up to `batch_bytes`. Only complete lines
+are consumed; a partially written last line is left for the next poll.
+Each block is decoded with a single `json.loads` call rather than one per
+line, and only `ResponseComplete`/`Panic` stages become events, so each
+request is reported once. Compressed rotations (`.gz`) are not read.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from src.asoc.agents.telemetry import BaseCloudProvider, CloudEvent
+from src.asoc.core.watermarks import OffsetStore
+
+logger = logging.getLogger("asoc.cloud_providers")
+
+DEFAULT_STAGES = ("ResponseComplete", "Panic")
+
+
+def parse_audit_lines(block: bytes) -> List[Dict[str, Any]]:
+    """Decode a block of complete JSON lines, skipping blank and malformed ones."""
+    lines = [line for line in block.split(b"\n") if line.strip()]
+    if not lines:
+        return []
+    try:
+        records = json.loads(b"[" + b",".join(lines) + b"]")
+    except ValueError:
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logger.warning("K8s audit: skipped malformed line")
+    return [r for r in records if isinstance(r, dict)]
+
+
+def to_audit_event(record: Dict[str, Any]) -> CloudEvent:
+    ref = record.get("objectRef") or {}
+    resource = ref.get("resource", "")
+    if ref.get("subresource"):
+        resource += "/" + ref["subresource"]
+    user = record.get("user") or {}
+    source_ips = record.get("sourceIPs") or []
+    name = "/".join(part for part in (ref.get("namespace"), ref.get("name")) if part)
+    return CloudEvent(
+        event_id=record.get("auditID", ""),
+        event_name=f"{record.get('verb', 'unknown')}:{resource or record.get('requestURI', '')}",
+        event_time=record.get("requestReceivedTimestamp") or record.get("stageTimestamp", ""),
+        source_ip=source_ips[0] if source_ips else None,
+        user_identity={
+            "type": "KubernetesUser",
+            "userName": user.get("username", ""),
+            "groups": user.get("groups", []),
+        },
+        resources=[
+            {
+                "type": f"k8s:{resource}" if resource else "k8s:nonResource",
+                "name": name,
+                "apiGroup": ref.get("apiGroup", ""),
+                "responseCode": (record.get("responseStatus") or {}).get("code"),
+            }
+        ],
+        raw=record,
+    )
+
+
+class K8sAuditLogProvider(BaseCloudProvider):
+    """Tails a K8s audit log file, or every `*.log` in a directory, across rotation.
+
+    On the first run for a path the existing content is skipped unless
+    `from_beginning` is set; after that every new inode is read from its
+    first byte.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        offsets: Optional[OffsetStore] = None,
+        batch_bytes: int = 1 << 20,
+        stages: Iterable[str] = DEFAULT_STAGES,
+        from_beginning: bool = False,
+    ):
+        self.path = Path(path)
+        self.offsets = offsets
+        self.batch_bytes = batch_bytes
+        self.stages = frozenset(stages)
+        self.from_beginning = from_beginning
+        self.lines_read = 0
+        self._committed: Optional[Dict[int, int]] = None
+        self._staged: Optional[Dict[int, int]] = None
+
+    @property
+    def cursor_key(self) -> str:
+        return f"k8s_audit:{self.path.resolve()}"
+
+    def files(self) -> List[Tuple[int, str]]:
+        """(inode, path) of the active and rotated files, oldest first."""
+        if self.path.is_dir():
+            candidates = [p for p in self.path.glob("*.log") if p.is_file()]
+        else:
+            candidates = [p for p in self.path.parent.glob(f"{self.path.stem}-*{self.path.suffix}") if p.is_file()]
+            if self.path.is_file():
+                candidates.append(self.path)
+        found = []
+        for p in candidates:
+            try:
+                st = p.stat()
+            except OSError:
+                continue  # rotated away or deleted between glob and stat
+            found.append((st.st_mtime, p != self.path, str(p), st.st_ino))
+        # The active file is written last, so it sorts after rotations that
+        # share its mtime.
+        found.sort(key=lambda f: (f[0], not f[1], f[2]))
+        return [(inode, path) for _, _, path, inode in found]
+
+    def _load_offsets(self, files: List[Tuple[int, str]]) -> Dict[int, int]:
+        if self._committed is None:
+            stored = self.offsets.get(self.cursor_key) if self.offsets is not None else None
+            if stored is None:
+                stored = {} if self.from_beginning else {inode: os.path.getsize(path) for inode, path in files}
+                if self.offsets is not None:
+                    self.offsets.set(self.cursor_key, stored)
+            self._committed = stored
+        return dict(self._committed)
+
+    def _read_block(self, path: str, offset: int) -> Tuple[bytes, int]:
+        """Return the complete lines after `offset` (at most about `batch_bytes`) and the new offset."""
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < offset:
+                logger.warning(f"K8s audit: {path} was truncated, reading from the start")
+                offset = 0
+            f.seek(offset)
+            data = f.read(self.batch_bytes)
+            end = data.rfind(b"\n")
+            if end == -1 and len(data) == self.batch_bytes:
+                # A single line longer than the block: read through its end.
+                data += f.readline()
+                end = data.rfind(b"\n")
+        if end == -1:
+            return b"", offset
+        return data[: end + 1], offset + end + 1
+
+    def _events_from(self, block: bytes) -> List[CloudEvent]:
+        records = parse_audit_lines(block)
+        self.lines_read += len(records)
+        return [to_audit_event(r) for r in records if r.get("stage") in self.stages]
+
+    async def stream_events(
+        self, max_results: Optional[int] = None, incremental: bool = False, **kwargs
+    ) -> AsyncIterator[List[CloudEvent]]:
+        """Yield one page per block read from the committed offsets.
+
+        An incremental stream reads everything new and, once the last page
+        has been consumed, stages the advanced offsets for `commit_cursor()`.
+        """
+        # Offsets staged by an earlier poll that was never published must not
+        # be committed after this one.
+        self._staged = None
+        files = await asyncio.to_thread(self.files)
+        positions = await asyncio.to_thread(self._load_offsets, files)
+        live = {inode for inode, _ in files}
+        positions = {inode: off for inode, off in positions.items() if inode in live}
+        limit = None if incremental else max_results
+        fetched = 0
+        for inode, path in files:
+            while True:
+                try:
+                    block, offset = await asyncio.to_thread(self._read_block, path, positions.get(inode, 0))
+                except OSError as e:
+                    logger.error(f"K8s audit: failed to read {path}: {e}")
+                    break
+                if not block:
+                    break
+                positions[inode] = offset
+                page = self._events_from(block)
+                if limit is not None:
+                    page = page[: limit - fetched]
+                fetched += len(page)
+                if page:
+                    yield page
+                if limit is not None and fetched >= limit:
+                    return
+        if incremental:
+            self._staged = positions
+
+    async def fetch_events(self, max_results: int = 10, incremental: bool = False, **kwargs) -> List[CloudEvent]:
+        """Read new audit events.
+
+        With `incremental=True` every complete line since the committed
+        offsets is read (ignoring `max_results`) and the offsets are staged;
+        otherwise at most `max_results` events are peeked without moving them.
+        """
+        return [e async for page in self.stream_events(max_results=max_results, incremental=incremental) for e in page]
+
+    async def commit_cursor(self) -> None:
+        if self._staged is None:
+            return
+        staged, self._staged = self._staged, None
+        self._committed = staged
+        if self.offsets is not None:
+            await asyncio.to_thread(self.offsets.set, self.cursor_key, staged)
+
+    async def health_check(self) -> bool:
+        return self.path.exists()
@@ -0,0 +1,182 @@
+"""Deterministic first tier of threat detection.
+
+`triage_event` looks only at things that are cheap and certain: the risk
+catalogue category of the operation, its MITRE mapping, whether it is a
+read known to be benign and whether the caller's IP or principal has a known
+reputation. It returns one of three tiers:
+
+- `allow`: a benign read (or a trusted caller doing something not in the
+  catalogue). Scored low without an LLM call.
+- `escalate`: defense evasion or a known-bad caller. Scored high without an
+  LLM call; the supervisor decides what happens next.
+- `needs_llm`: everything else, analysed by the provider as before.
+"""
+
+import ipaddress
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from src.asoc.agents import risk_catalogue
+from src.asoc.mitre.mapper import mitre_mapper
+
+ALLOW_RISK = 0.1
+ESCALATE_RISK = 0.9
+
+# Reads known to be benign, by name. A verb prefix is not enough: Get* and
+# get: also cover calls that issue tokens (GetSessionToken,
+# GetFederationToken) or read secrets, parameters and passwords
+# (BatchGetSecretValue, GetParameter, GetPasswordData, get:secrets), and
+# those must not be cleared without a look.
+_BENIGN_READS = frozenset({
+    # AWS
+    "DescribeAvailabilityZones", "DescribeImages", "DescribeInstanceStatus", "DescribeInstances",
+    "DescribeLoadBalancers", "DescribeNetworkInterfaces", "DescribeRegions", "DescribeRouteTables",
+    "DescribeSecurityGroups", "DescribeSnapshots", "DescribeStacks", "DescribeSubnets", "DescribeTags",
+    "DescribeVolumes", "DescribeVpcs", "DescribeDBInstances", "DescribeAlarms", "DescribeLogGroups",
+    "DescribeTable", "DescribeTrails", "GetBucketLocation", "GetBucketVersioning", "GetCallerIdentity", "GetMetricData", "GetMetricStatistics", "GetTrailStatus",
+    "HeadBucket", "ListBuckets", "ListClusters", "ListFunctions", "ListHostedZones", "ListMetrics",
+    "ListQueues", "ListStacks", "ListTables", "ListTagsForResource", "ListTopics", "LookupEvents",
+    # GCP
+    "compute.instances.get", "compute.instances.list", "compute.zones.list", "storage.buckets.get",
+    "storage.buckets.list",
+    # Azure
+    "Microsoft.Compute/virtualMachines/read", "Microsoft.Network/networkSecurityGroups/read",
+    "Microsoft.Resources/subscriptions/resourceGroups/read", "Microsoft.Storage/storageAccounts/read",
+})
+# Kubernetes resources whose get, list and watch are benign. Secrets,
+# service account tokens and anything with a subresource are not listed.
+_BENIGN_K8S_RESOURCES = frozenset({
+    "configmaps", "daemonsets", "deployments", "endpoints", "events", "ingresses", "jobs", "leases",
+    "namespaces", "nodes", "pods", "replicasets", "services", "statefulsets",
+})
+_K8S_READ_VERBS = frozenset({"get", "list", "watch"})
+# Reads that are themselves an attack step: credential and data access.
+_SENSITIVE_TACTICS = frozenset({"Credential Access", "Exfiltration"})
+_ALWAYS_ESCALATE = frozenset({"defense_evasion"})
+
+
+class DetectionTier(str, Enum):
+    ALLOW = "allow"
+    ESCALATE = "escalate"
+    NEEDS_LLM = "needs_llm"
+
+
+@dataclass
+class TriageDecision:
+    tier: DetectionTier
+    risk_score: float
+    reasons: List[str] = field(default_factory=list)
+    attack_technique: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "tier": self.tier.value,
+            "risk_score": self.risk_score,
+            "reasons": self.reasons,
+            "attack_technique": self.attack_technique,
+        }
+
+    def as_llm_result(self) -> Dict[str, Any]:
+        """The verdict in the shape `analyze_threat_llm` returns, for decided tiers."""
+        return {
+            "threat_detected": self.tier == DetectionTier.ESCALATE,
+            "risk_score": self.risk_score,
+            "reasoning": f"Prefilter {self.tier.value}: " + "; ".join(self.reasons),
+            "attack_technique": self.attack_technique,
+        }
+
+
+class EntityReputation:
+    """Known-bad and trusted IPs, CIDR ranges and principal names."""
+
+    def __init__(self, bad: Iterable[str] = (), trusted: Iterable[str] = ()):
+        self._bad_names, self._bad_nets = self._split(bad)
+        self._trusted_names, self._trusted_nets = self._split(trusted)
+
+    @staticmethod
+    def _split(entries: Iterable[str]) -> Tuple[FrozenSet[str], Tuple[Any, ...]]:
+        names, nets = set(), []
+        for entry in entries:
+            entry = entry.strip()
+            if not entry:
+                continue
+            try:
+                nets.append(ipaddress.ip_network(entry, strict=False))
+            except ValueError:
+                names.add(entry)
+        return frozenset(names), tuple(nets)
+
+    @staticmethod
+    def _matches(value: Optional[str], names: FrozenSet[str], nets: Tuple[Any, ...]) -> bool:
+        if not value:
+            return False
+        if value in names:
+            return True
+        if not nets:
+            return False
+        try:
+            address = ipaddress.ip_address(value)
+        except ValueError:
+            return False
+        return any(address in net for net in nets)
+
+    def is_bad(self, value: Optional[str]) -> bool:
+        return self._matches(value, self._bad_names, self._bad_nets)
+
+    def is_trusted(self, value: Optional[str]) -> bool:
+        return self._matches(value, self._trusted_names, self._trusted_nets)
+
+    @classmethod
+    def from_settings(cls, config=None) -> "EntityReputation":
+        from src.asoc.core.config import settings
+
+        config = config or settings
+        return cls(
+            bad=(config.DETECTION_BAD_ENTITIES or "").split(","),
+            trusted=(config.DETECTION_TRUSTED_ENTITIES or "").split(","),
+        )
+
+
+def _event_name(event: Dict[str, Any]) -> str:
+    return event.get("EventName") or event.get("eventName") or event.get("event_name") or ""
+
+
+def _principal(event: Dict[str, Any]) -> Optional[str]:
+    identity = event.get("userIdentity") or event.get("UserIdentity") or {}
+    if not isinstance(identity, dict):
+        return None
+    return identity.get("userName") or identity.get("arn") or identity.get("principalName")
+
+
+def _is_benign_read(name: str) -> bool:
+    if name in _BENIGN_READS:
+        return True
+    verb, _, resource = name.partition(":")
+    return verb in _K8S_READ_VERBS and resource in _BENIGN_K8S_RESOURCES
+
+
+def triage_event(event: Dict[str, Any], reputation: Optional[EntityReputation] = None) -> TriageDecision:
+    """Decide allow / escalate / needs_llm for one event without calling a model."""
+    reputation = reputation or EntityReputation()
+    name = _event_name(event)
+    source_ip = event.get("sourceIPAddress") or event.get("source_ip")
+    principal = _principal(event)
+    category = risk_catalogue.category_for_event(name)
+    mitre = mitre_mapper.map_event(event) if name else None
+    technique = mitre.id if mitre else None
+
+    bad = [v for v in (source_ip, principal) if reputation.is_bad(v)]
+    if bad:
+        return TriageDecision(DetectionTier.ESCALATE, ESCALATE_RISK, [f"known-bad entity {v}" for v in bad], technique)
+    if category in _ALWAYS_ESCALATE:
+        return TriageDecision(DetectionTier.ESCALATE, ESCALATE_RISK, [f"{name} is {category}"], technique)
+    if category is not None:
+        return TriageDecision(DetectionTier.NEEDS_LLM, risk_catalogue.HIGH_RISK, [f"{name} is {category}"], technique)
+    if mitre is not None and mitre.tactic in _SENSITIVE_TACTICS:
+        return TriageDecision(DetectionTier.NEEDS_LLM, risk_catalogue.BASELINE_RISK, [f"{name} maps to {mitre.tactic}"], technique)
+    if _is_benign_read(name):
+        return TriageDecision(DetectionTier.ALLOW, ALLOW_RISK, [f"{name} is a benign read"], technique)
+    if reputation.is_trusted(principal) or reputation.is_trusted(source_ip):
+        return TriageDecision(DetectionTier.ALLOW, ALLOW_RISK, ["trusted caller, operation not high-risk"], technique)
+    return TriageDecision(DetectionTier.NEEDS_LLM, risk_catalogue.BASELINE_RISK, ["no deterministic verdict"], technique)
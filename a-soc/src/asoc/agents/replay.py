@@ -0,0 +1,332 @@
+"""Offline telemetry replay from exported audit-log files.
+
+`FileReplayProvider` feeds local exports into TelemetryAgent through the
+normal `BaseCloudProvider` interface. It accepts CloudTrail log files
+(`{"Records": [...]}`, usually `.json.gz`), GCP Logging sink exports
+(newline-delimited LogEntry JSON) and Azure diagnostic exports
+(`{"records": [...]}` or one record per line). It is the backfill path and
+the event source for throughput benchmarks.
+
+Files are decompressed and parsed in a process pool, a bounded number of
+files ahead of the consumer. Each file is parsed incrementally, one record
+at a time, so no whole file is ever held in memory. Replay runs as fast as
+possible by default; `speed=1.0` replays at the original wall-clock pace
+and `speed=10.0` runs ten times faster.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import IO, Any, AsyncIterator, Deque, Dict, Iterator, List, Optional, Tuple
+
+from src.asoc.agents.telemetry import BaseCloudProvider, CloudEvent, GCPCloudProvider, RawSource, _event_sort_key
+
+logger = logging.getLogger("asoc.cloud_providers")
+
+REPLAY_SUFFIXES = (".json.gz", ".json", ".jsonl.gz", ".jsonl", ".ndjson.gz", ".ndjson")
+_WRAPPER_KEYS = ("Records", "records")
+
+
+def iter_json_records(stream: IO[str], chunk_size: int = 1 << 16) -> Iterator[Dict[str, Any]]:
+    """Yield JSON objects from `stream` one at a time.
+
+    Handles a wrapper object whose first key is `Records`/`records` holding
+    an array (CloudTrail, Azure), a bare top-level array, and
+    newline-delimited objects (GCP). Only the current record and one read
+    chunk are buffered.
+    """
+    decoder = json.JSONDecoder()
+    buf = stream.read(chunk_size)
+    pos = 0
+    anchor: Optional[int] = None  # earliest offset that must survive compaction
+    eof = not buf
+
+    def _fill() -> bool:
+        nonlocal buf, pos, anchor, eof
+        if eof:
+            return False
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        cut = pos if anchor is None else anchor
+        buf = buf[cut:] + chunk
+        pos -= cut
+        if anchor is not None:
+            anchor = 0
+        return True
+
+    def _skip(chars: str = " \t\r\n") -> Optional[str]:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in chars:
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if not _fill():
+                return None
+
+    def _decode() -> Any:
+        nonlocal pos
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if not _fill():
+                    raise
+                continue
+            if end == len(buf) and not isinstance(value, (dict, list)) and _fill():
+                continue  # a scalar may continue in the next chunk
+            pos = end
+            return value
+
+    first = _skip()
+    if first is None:
+        return
+
+    in_array = False
+    if first == "[":
+        pos += 1
+        in_array = True
+    elif first == "{":
+        # Peek at the first key without consuming: a Records wrapper is
+        # streamed element by element, anything else is NDJSON.
+        anchor = pos
+        pos += 1
+        if _skip() == '"':
+            key = _decode()
+            if key in _WRAPPER_KEYS and _skip() == ":":
+                pos += 1
+                if _skip() == "[":
+                    pos += 1
+                    in_array = True
+        if not in_array:
+            pos = anchor
+        anchor = None
+
+    if in_array:
+        while True:
+            ch = _skip(" \t\r\n,")
+            if ch is None or ch == "]":
+                return
+            record = _decode()
+            if isinstance(record, dict):
+                yield record
+    else:
+        while _skip() is not None:
+            record = _decode()
+            if isinstance(record, dict):
+                yield record
+
+
+def _open_text(path: str) -> IO[str]:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def detect_source(record: Dict[str, Any]) -> str:
+    if "eventID" in record or "eventVersion" in record:
+        return "cloudtrail"
+    if "insertId" in record or "protoPayload" in record:
+        return "gcp"
+    if "operationName" in record:
+        return "azure"
+    return "unknown"
+
+
+@lru_cache(maxsize=2)
+def _export_records(path: str, size: int, mtime_ns: int) -> Tuple[Dict[str, Any], ...]:
+    with _open_text(path) as stream:
+        return tuple(iter_json_records(stream))
+
+
+def load_export_record(path: str, index: int) -> Dict[str, Any]:
+    """Record `index` of an export file; the lazy `raw` of replayed events.
+
+    The first access parses the file once, and the records are cached for
+    later accesses, so reading every raw of a file costs one extra parse
+    rather than one parse per event. The cache is keyed on size and mtime,
+    so a file rewritten in place is read again.
+    """
+    stat = os.stat(path)
+    records = _export_records(path, stat.st_size, stat.st_mtime_ns)
+    return records[index] if 0 <= index < len(records) else {}
+
+
+def _azure_event(record: Dict[str, Any], raw: RawSource) -> CloudEvent:
+    event_id = record.get("eventDataId") or "azure-" + hashlib.sha1(
+        json.dumps(
+            [record.get("time"), record.get("operationName"), record.get("resourceId"), record.get("correlationId")]
+        ).encode()
+    ).hexdigest()[:16]
+    claims = record.get("identity", {}).get("claims", {}) if isinstance(record.get("identity"), dict) else {}
+    return CloudEvent(
+        event_id=event_id,
+        event_name=record.get("operationName", "Unknown"),
+        event_time=record.get("time", datetime.now(timezone.utc).isoformat()),
+        source_ip=record.get("callerIpAddress"),
+        user_identity={"type": "AzureAD", "principalName": claims.get("name") or record.get("caller", "")},
+        resources=[{"type": "AzureResource", "name": record.get("resourceId", "")}],
+        raw=raw,
+        keep_raw=True,
+    )
+
+
+def to_cloud_event(record: Dict[str, Any], source: str, index: int, raw: RawSource) -> Optional[CloudEvent]:
+    if source == "auto":
+        source = detect_source(record)
+    if source == "cloudtrail":
+        return CloudEvent.from_cloudtrail_record(record, keep_raw=True, raw=raw)
+    if source == "gcp":
+        return GCPCloudProvider._to_event(record, index, datetime.now(timezone.utc), keep_raw=True, raw=raw)
+    if source == "azure":
+        return _azure_event(record, raw)
+    return None
+
+
+def parse_export_file(path: str, source: str = "auto", keep_raw: bool = False) -> List[CloudEvent]:
+    """Parse one export file into CloudEvents sorted by event time.
+
+    Without `keep_raw` each event's `raw` is a reference back into the file
+    rather than a copy of the record. Runs inside pool workers, so it must
+    stay a module-level function.
+    """
+    events = []
+    with _open_text(path) as stream:
+        for i, record in enumerate(iter_json_records(stream)):
+            raw = record if keep_raw else partial(load_export_record, path, i)
+            event = to_cloud_event(record, source, i, raw)
+            if event is not None:
+                events.append(event)
+    events.sort(key=_event_sort_key)
+    return events
+
+
+class FileReplayProvider(BaseCloudProvider):
+    def __init__(
+        self,
+        path: str,
+        source: str = "auto",
+        speed: Optional[float] = None,
+        workers: Optional[int] = None,
+        max_inflight: Optional[int] = None,
+        keep_raw: bool = False,
+    ):
+        if source not in ("auto", "cloudtrail", "gcp", "azure"):
+            raise ValueError(f"Unknown replay source '{source}'")
+        self.path = Path(path)
+        self.source = source
+        self.speed = speed or None
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_inflight = max_inflight or max(2, 2 * self.workers)
+        self.keep_raw = keep_raw
+        self.files_done = 0
+        self.events_replayed = 0
+        self._executor: Optional[Executor] = None
+        self._cursor: Optional[AsyncIterator[List[CloudEvent]]] = None
+        self._pending: Deque[CloudEvent] = deque()
+
+    def files(self) -> List[str]:
+        if self.path.is_file():
+            return [str(self.path)]
+        found = [str(p) for p in self.path.rglob("*") if p.is_file() and p.name.endswith(REPLAY_SUFFIXES)]
+        # CloudTrail, GCS sink and Azure blob names all embed the time
+        # window, so name order is close to time order.
+        return sorted(found)
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.workers > 0:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=1)
+        return self._executor
+
+    async def _parsed_files(self) -> AsyncIterator[List[CloudEvent]]:
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        paths = iter(self.files())
+        inflight: Deque[asyncio.Future] = deque()
+
+        def _submit() -> None:
+            path = next(paths, None)
+            if path is not None:
+                inflight.append(loop.run_in_executor(executor, parse_export_file, path, self.source, self.keep_raw))
+
+        for _ in range(self.max_inflight):
+            _submit()
+        try:
+            while inflight:
+                events = await inflight.popleft()
+                _submit()
+                self.files_done += 1
+                yield events
+            logger.info(f"Replay finished: {self.files_done} files from {self.path}")
+        finally:
+            for future in inflight:
+                future.cancel()
+
+    async def _paced(self, pages: AsyncIterator[List[CloudEvent]]) -> AsyncIterator[List[CloudEvent]]:
+        """Re-chunk pages so each event is released at its scaled original time."""
+        first_event: Optional[datetime] = None
+        started = 0.0
+        async for page in pages:
+            batch: List[CloudEvent] = []
+            for event in page:
+                event_time = _event_sort_key(event)
+                if first_event is None:
+                    first_event, started = event_time, time.monotonic()
+                delay = started + (event_time - first_event).total_seconds() / self.speed - time.monotonic()
+                if delay > 0:
+                    if batch:
+                        yield batch
+                        batch = []
+                    await asyncio.sleep(delay)
+                batch.append(event)
+            if batch:
+                yield batch
+
+    async def stream_events(self, max_results: Optional[int] = None, **kwargs) -> AsyncIterator[List[CloudEvent]]:
+        """Yield one page per file (or per due batch when paced)."""
+        pages = self._parsed_files()
+        if self.speed:
+            pages = self._paced(pages)
+        remaining = max_results
+        async for page in pages:
+            if remaining is not None:
+                page = page[:remaining]
+                remaining -= len(page)
+            self.events_replayed += len(page)
+            if page:
+                yield page
+            if remaining == 0:
+                return
+
+    async def fetch_events(self, max_results: int = 10, **kwargs) -> List[CloudEvent]:
+        """Return the next `max_results` replayed events; [] once the replay is exhausted."""
+        if self._cursor is None:
+            self._cursor = self.stream_events()
+        while len(self._pending) < max_results:
+            try:
+                self._pending.extend(await self._cursor.__anext__())
+            except StopAsyncIteration:
+                break
+        return [self._pending.popleft() for _ in range(min(max_results, len(self._pending)))]
+
+    async def health_check(self) -> bool:
+        return self.path.exists() and bool(self.files())
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,112 @@
+"""Shared catalogue of high-risk cloud operations.
+
+One table drives both the client-side risk heuristic in TelemetryAgent and
+the server-side filters pushed down to the providers (CloudTrail EventName
+lookups, GCP methodName clauses, Azure OperationNameValue clauses), so the
+two can never disagree about what counts as interesting.
+"""
+
+from dataclasses import dataclass
+from typing import FrozenSet, Iterable, Optional, Tuple
+
+HIGH_RISK = 0.8
+BASELINE_RISK = 0.3
+
+
+@dataclass(frozen=True)
+class RiskCategory:
+    name: str
+    aws: FrozenSet[str]
+    gcp: FrozenSet[str]
+    azure: FrozenSet[str]
+
+
+HIGH_RISK_CATALOGUE: Tuple[RiskCategory, ...] = (
+    RiskCategory(
+        name="identity",
+        aws=frozenset(
+            {
+                "ConsoleLogin",
+                "CreateUser",
+                "CreateAccessKey",
+                "CreateLoginProfile",
+                "UpdateLoginProfile",
+                "AttachRolePolicy",
+                "PutRolePolicy",
+                "UpdateAssumeRolePolicy",
+            }
+        ),
+        gcp=frozenset(
+            {
+                "google.iam.admin.v1.CreateServiceAccount",
+                "google.iam.admin.v1.CreateServiceAccountKey",
+                "SetIamPolicy",
+            }
+        ),
+        azure=frozenset(
+            {
+                "MICROSOFT.AUTHORIZATION/ROLEASSIGNMENTS/WRITE",
+                "MICROSOFT.AUTHORIZATION/ROLEDEFINITIONS/WRITE",
+            }
+        ),
+    ),
+    RiskCategory(
+        name="defense_evasion",
+        aws=frozenset({"StopLogging", "DeleteTrail", "UpdateTrail", "DeleteFlowLogs", "DisableAlarmActions"}),
+        gcp=frozenset({"google.logging.v2.ConfigServiceV2.DeleteSink", "google.logging.v2.ConfigServiceV2.UpdateSink"}),
+        azure=frozenset({"MICROSOFT.INSIGHTS/DIAGNOSTICSETTINGS/DELETE"}),
+    ),
+    RiskCategory(
+        name="network_exposure",
+        aws=frozenset({"AuthorizeSecurityGroupIngress", "ModifyNetworkInterfaceAttribute"}),
+        gcp=frozenset({"v1.compute.firewalls.insert", "v1.compute.firewalls.patch"}),
+        azure=frozenset(
+            {
+                "MICROSOFT.NETWORK/NETWORKSECURITYGROUPS/SECURITYRULES/WRITE",
+                "MICROSOFT.NETWORK/NETWORKSECURITYGROUPS/DELETE",
+            }
+        ),
+    ),
+    RiskCategory(
+        name="data_destruction",
+        aws=frozenset({"DeleteBucket", "TerminateInstance", "TerminateInstances", "DeleteDBInstance"}),
+        gcp=frozenset({"storage.buckets.delete", "google.cloud.sql.v1.Instances.Delete"}),
+        azure=frozenset(
+            {
+                "MICROSOFT.STORAGE/STORAGEACCOUNTS/DELETE",
+                "MICROSOFT.COMPUTE/VIRTUALMACHINES/DELETE",
+            }
+        ),
+    ),
+)
+
+_BY_NAME = {c.name: c for c in HIGH_RISK_CATALOGUE}
+_ALL_NAMES: FrozenSet[str] = frozenset().union(*(c.aws | c.gcp | c.azure for c in HIGH_RISK_CATALOGUE))
+_CATEGORY_BY_EVENT = {name: c.name for c in HIGH_RISK_CATALOGUE for name in c.aws | c.gcp | c.azure}
+
+
+def categories(names: Optional[Iterable[str]] = None) -> Tuple[RiskCategory, ...]:
+    """Resolve category names; None or "all" selects the whole catalogue."""
+    if names is None:
+        return HIGH_RISK_CATALOGUE
+    names = list(names)
+    if "all" in names:
+        return HIGH_RISK_CATALOGUE
+    unknown = set(names) - set(_BY_NAME)
+    if unknown:
+        raise ValueError(f"Unknown risk categories: {sorted(unknown)}")
+    return tuple(_BY_NAME[n] for n in names)
+
+
+def event_names(provider: str, selected: Optional[Iterable[str]] = None) -> FrozenSet[str]:
+    """High-risk operation names for one provider ("aws", "gcp" or "azure")."""
+    return frozenset().union(*(getattr(c, provider) for c in categories(selected)))
+
+
+def risk_for_event(name: str) -> float:
+    return HIGH_RISK if name in _ALL_NAMES else BASELINE_RISK
+
+
+def category_for_event(name: str) -> Optional[str]:
+    """Catalogue category of a high-risk operation name, or None."""
+    return _CATEGORY_BY_EVENT.get(name)
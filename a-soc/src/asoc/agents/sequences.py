@@ -0,0 +1,201 @@
+"""Windowed multi-event sequence correlation.
+
+Some attacks are only visible as a chain: a new access key, then a policy
+attached to its user, then CloudTrail switched off. Each step on its own
+looks routine. A `SequenceRule` declares such a chain as an ordered list of
+steps (event names, with `|` between alternatives) that must all happen for
+the same principal within `window_seconds` of the first step.
+
+`SequenceEngine` matches rules over the event stream. Per (rule, principal)
+it keeps one slot per step: the latest start time of a partial match that
+has reached that step, and the events that got it there. Keeping only the
+latest start is enough, since a later start always leaves more of the window
+to finish in. A completed chain produces one `SequenceMatch` and clears the
+state, so N events become one correlated alert. Events named in no rule
+cost a single dict lookup; expired partial matches are swept periodically.
+"""
+
+import time
+from itertools import islice
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple, Union
+
+from src.asoc.agents.baseline import event_timestamp, principal_id
+
+
+def _step(step: Union[str, Iterable[str]]) -> FrozenSet[str]:
+    names = step.split("|") if isinstance(step, str) else step
+    return frozenset(name.strip() for name in names if name.strip())
+
+
+@dataclass(frozen=True)
+class SequenceRule:
+    name: str
+    steps: Tuple[FrozenSet[str], ...]
+    window_seconds: float
+    risk_score: float = 0.9
+    technique: Optional[str] = None
+    description: str = ""
+
+    @classmethod
+    def of(cls, name: str, steps: Sequence[Union[str, Iterable[str]]], window_seconds: float, **kwargs: Any) -> "SequenceRule":
+        rule = cls(name, tuple(_step(s) for s in steps), float(window_seconds), **kwargs)
+        if len(rule.steps) < 2 or not all(rule.steps):
+            raise ValueError(f"Sequence rule '{name}' needs at least two non-empty steps")
+        if rule.window_seconds <= 0:
+            raise ValueError(f"Sequence rule '{name}' needs a positive window")
+        return rule
+
+    def describe(self) -> str:
+        return " -> ".join("|".join(sorted(step)) for step in self.steps)
+
+
+DEFAULT_SEQUENCES: Tuple[SequenceRule, ...] = (
+    SequenceRule.of(
+        "access_key_escalation_then_evasion",
+        ["CreateAccessKey", "AttachUserPolicy|PutUserPolicy|AddUserToGroup", "StopLogging|DeleteTrail|UpdateTrail"],
+        window_seconds=1800,
+        risk_score=0.95,
+        technique="T1098",
+        description="New credentials, escalated privileges, then audit logging disabled",
+    ),
+    SequenceRule.of(
+        "new_user_persistence",
+        ["CreateUser", "CreateAccessKey|CreateLoginProfile", "AttachUserPolicy|PutUserPolicy|AddUserToGroup"],
+        window_seconds=3600,
+        risk_score=0.85,
+        technique="T1136.003",
+        description="Cloud account created, given credentials and privileges",
+    ),
+    SequenceRule.of(
+        "bucket_exposure",
+        ["ListBuckets", "GetBucketPolicy|GetBucketAcl", "PutBucketPolicy|PutBucketAcl|DeletePublicAccessBlock"],
+        window_seconds=1800,
+        risk_score=0.85,
+        technique="T1530",
+        description="Bucket discovery followed by opening a bucket's access policy",
+    ),
+)
+
+
+@dataclass
+class SequenceMatch:
+    rule: SequenceRule
+    entity: str
+    events: Tuple[Dict[str, Any], ...] = field(repr=False)
+    started: float
+    ended: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rule": self.rule.name,
+            "entity": self.entity,
+            "steps": [e.get("eventName") or e.get("EventName") or e.get("event_name") for e in self.events],
+            "event_ids": [e.get("eventID") or e.get("EventId") for e in self.events],
+            "started": self.started,
+            "ended": self.ended,
+            "window_seconds": self.rule.window_seconds,
+        }
+
+
+_NO_MATCHES: List[SequenceMatch] = []
+# A sweep at the cap trims to this share of `max_states`, so the next one is
+# a while off rather than on the next new entity.
+SWEEP_TO = 0.9
+
+
+class SequenceEngine:
+    def __init__(
+        self, rules: Iterable[SequenceRule] = DEFAULT_SEQUENCES, max_states: int = 100_000, sweep_every: int = 10_000
+    ):
+        self.rules = tuple(rules)
+        self.max_states = max_states
+        self.sweep_every = sweep_every
+        self.matches_total = 0
+        # Event name -> (rule, step) pairs, later steps first so that one
+        # event never advances the same rule by two steps.
+        steps: Dict[str, List[Tuple[int, int]]] = {}
+        for r, rule in enumerate(self.rules):
+            for s, names in enumerate(rule.steps):
+                for name in names:
+                    steps.setdefault(name, []).append((r, s))
+        self._steps = {name: tuple(sorted(pairs, key=lambda p: (p[0], -p[1]))) for name, pairs in steps.items()}
+        self._states: Dict[Tuple[int, str], List[Optional[Tuple[float, Tuple[Dict[str, Any], ...]]]]] = {}
+        self._clock = 0.0
+        self._since_sweep = 0
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def observe(self, event: Dict[str, Any], now: Optional[float] = None) -> List[SequenceMatch]:
+        """Advance the rules `event` takes part in; return the chains it completes."""
+        pairs = self._steps.get(event.get("eventName") or event.get("EventName") or event.get("event_name"))
+        if pairs is None or event.get("errorCode"):
+            return _NO_MATCHES
+        entity = principal_id(event)
+        if not entity:
+            return _NO_MATCHES
+        t = event_timestamp(event, now if now is not None else time.time())
+        if t > self._clock:
+            self._clock = t
+        matches = _NO_MATCHES
+        states = self._states
+        for r, s in pairs:
+            rule = self.rules[r]
+            key = (r, entity)
+            slots = states.get(key)
+            if s == 0:
+                if slots is None:
+                    slots = states[key] = [None] * (len(rule.steps) - 1)
+                if slots[0] is None or slots[0][0] <= t:
+                    slots[0] = (t, (event,))
+                continue
+            if slots is None:
+                continue
+            prev = slots[s - 1]
+            if prev is None or t < prev[0] or t - prev[0] > rule.window_seconds:
+                continue
+            if s == len(rule.steps) - 1:
+                if matches is _NO_MATCHES:
+                    matches = []
+                matches.append(SequenceMatch(rule, entity, prev[1] + (event,), prev[0], t))
+                del states[key]
+                self.matches_total += 1
+            elif slots[s] is None or slots[s][0] <= prev[0]:
+                slots[s] = (prev[0], prev[1] + (event,))
+
+        self._since_sweep += 1
+        if self._since_sweep >= self.sweep_every or len(states) > self.max_states:
+            self.sweep()
+        return matches
+
+    def observe_many(self, events: Iterable[Dict[str, Any]], now: Optional[float] = None) -> List[SequenceMatch]:
+        now = now if now is not None else time.time()
+        matches: List[SequenceMatch] = []
+        observe = self.observe
+        for event in events:
+            found = observe(event, now)
+            if found:
+                matches.extend(found)
+        return matches
+
+    def sweep(self) -> int:
+        """Drop partial matches that can no longer complete; then, over `max_states`, the oldest.
+
+        Over the cap, partial matches are dropped down to `SWEEP_TO` of it.
+        """
+        self._since_sweep = 0
+        clock = self._clock
+        expired = [
+            key
+            for key, slots in self._states.items()
+            if max(slot[0] for slot in slots if slot is not None) + self.rules[key[0]].window_seconds < clock
+        ]
+        for key in expired:
+            del self._states[key]
+        excess = 0
+        if len(self._states) > self.max_states:
+            excess = len(self._states) - int(self.max_states * SWEEP_TO)
+            for key in list(islice(self._states, excess)):
+                del self._states[key]
+        return len(expired) + excess
@@ -0,0 +1,353 @@
+"""Push ingestion: a syslog/CEF/JSON listener for on-prem appliances.
+
+`SyslogIngestServer` listens on UDP (one message per datagram, or several
+newline-separated) and TCP (newline-framed) and turns each line into a
+`CloudEvent`. Lines may be RFC 5424 or RFC 3164 syslog, ArcSight CEF (bare
+or inside a syslog message) or a JSON object; JSON CloudTrail, GCP and
+Azure records are normalised exactly as replayed ones are.
+
+Parsed events go onto a bounded queue. One batcher task drains it and
+publishes through `TelemetryAgent.emit_events` whenever `batch_size` events
+have collected or `batch_ms` has passed since the first of them, so an idle
+appliance still sees low latency and a busy one gets pipelined publishes.
+When the queue is full the new event is dropped and counted in
+`syslog_events_shed_total` rather than slowing the senders down.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.asoc.agents.telemetry import CloudEvent, TelemetryAgent
+from src.asoc.core.metrics import get_metrics
+
+logger = logging.getLogger("asoc.syslog_ingest")
+
+_RFC5424 = re.compile(
+    r"<(?P<pri>\d{1,3})>1 (?P<ts>\S+) (?P<host>\S+) (?P<app>\S+) (?P<procid>\S+) (?P<msgid>\S+) "
+    r"(?P<sd>-|(?:\[(?:[^\]\\]|\\.)*\])+)(?: (?P<msg>.*))?$",
+    re.DOTALL,
+)
+_RFC3164 = re.compile(
+    r"<(?P<pri>\d{1,3})>(?P<ts>[A-Z][a-z]{2} [ \d]\d \d\d:\d\d:\d\d) (?P<host>\S+) "
+    r"(?P<tag>[^:\[\s]+)(?:\[[^\]]*\])?: ?(?P<msg>.*)$",
+    re.DOTALL,
+)
+_CEF_FIELD = r"((?:[^|\\]|\\.)*)\|"
+_CEF_HEADER = re.compile(r"CEF:(\d+)\|" + _CEF_FIELD * 6 + r"(.*)$", re.DOTALL)
+_CEF_EXTENSION = re.compile(r"(\w+)=((?:[^=\\]|\\.)*?)(?=\s+\w+=|\s*$)", re.DOTALL)
+_STOP = object()
+_SEVERITIES = ("emerg", "alert", "crit", "err", "warning", "notice", "info", "debug")
+
+
+def _unescape(value: str) -> str:
+    return re.sub(r"\\(.)", lambda m: "\n" if m.group(1) == "n" else m.group(1), value)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _event_id(prefix: str, line: str, peer: Optional[str]) -> str:
+    # Content-derived, so a retransmitted datagram maps to the same id.
+    return f"{prefix}-" + hashlib.sha1(f"{peer}|{line}".encode()).hexdigest()[:16]
+
+
+def parse_cef(message: str, peer: Optional[str] = None, line: Optional[str] = None) -> Optional[CloudEvent]:
+    match = _CEF_HEADER.search(message)
+    if match is None:
+        return None
+    _, vendor, product, _, signature, name, severity = (_unescape(g) for g in match.groups()[:7])
+    ext = {k: _unescape(v) for k, v in _CEF_EXTENSION.findall(match.group(8))}
+    event_time = _now()
+    if ext.get("rt", "").isdigit():
+        event_time = datetime.fromtimestamp(int(ext["rt"]) / 1000, timezone.utc).isoformat()
+    return CloudEvent(
+        event_id=ext.get("externalId") or _event_id("cef", line or message, peer),
+        event_name=name or signature,
+        event_time=event_time,
+        source_ip=ext.get("src") or peer,
+        user_identity={"type": "CEFUser", "userName": ext.get("suser", "")},
+        resources=[
+            {
+                "type": f"cef:{vendor}/{product}",
+                "name": ext.get("dst") or ext.get("dhost", ""),
+                "signatureId": signature,
+                "severity": severity,
+                "message": ext.get("msg", ""),
+            }
+        ],
+        raw={"cef": ext, "vendor": vendor, "product": product},
+    )
+
+
+def parse_json(message: str, peer: Optional[str] = None) -> Optional[CloudEvent]:
+    from src.asoc.agents.replay import detect_source, to_cloud_event
+
+    try:
+        record = json.loads(message)
+    except ValueError:
+        return None
+    if not isinstance(record, dict):
+        return None
+    if detect_source(record) != "unknown":
+        return to_cloud_event(record, "auto", 0, record)
+    return CloudEvent(
+        event_id=str(record.get("id") or record.get("eventID") or _event_id("json", message, peer)),
+        event_name=str(record.get("eventName") or record.get("event") or record.get("type") or "JSONEvent"),
+        event_time=str(record.get("eventTime") or record.get("timestamp") or record.get("time") or _now()),
+        source_ip=record.get("sourceIPAddress") or record.get("src_ip") or record.get("src") or peer,
+        user_identity={"type": "JSONUser", "userName": str(record.get("user") or record.get("userName") or "")},
+        resources=[{"type": "json", "name": str(record.get("host") or record.get("resource") or "")}],
+        raw=record,
+    )
+
+
+def _rfc3164_time(ts: str, now: Optional[datetime] = None) -> Optional[str]:
+    """The RFC 3164 timestamp (no year) in the year that puts it closest to `now`; None if no such date."""
+    now = now or datetime.now(timezone.utc)
+    # Last year for a December line received in January, next year for a
+    # January line from a sender whose clock is ahead on 31 December.
+    candidates = []
+    for year in (now.year - 1, now.year, now.year + 1):
+        try:
+            candidates.append(datetime.strptime(f"{year} {ts}", "%Y %b %d %H:%M:%S").replace(tzinfo=timezone.utc))
+        except ValueError:
+            continue  # Feb 29 outside a leap year, Feb 30, ...
+    if not candidates:
+        return None
+    return min(candidates, key=lambda t: abs(t - now)).isoformat()
+
+
+def _syslog_header(line: str) -> Optional[Tuple[Dict[str, str], str]]:
+    match = _RFC5424.match(line)
+    if match:
+        fields = match.groupdict()
+        return {
+            "pri": fields["pri"],
+            "time": fields["ts"] if fields["ts"] != "-" else _now(),
+            "host": fields["host"],
+            "app": fields["app"],
+            "name": fields["msgid"] if fields["msgid"] != "-" else fields["app"],
+        }, fields["msg"] or ""
+    match = _RFC3164.match(line)
+    if match:
+        fields = match.groupdict()
+        event_time = _rfc3164_time(fields["ts"])
+        if event_time is None:
+            return None
+        return {
+            "pri": fields["pri"],
+            "time": event_time,
+            "host": fields["host"],
+            "app": fields["tag"],
+            "name": fields["tag"],
+        }, fields["msg"]
+    return None
+
+
+def parse_line(line: str, peer: Optional[str] = None) -> Optional[CloudEvent]:
+    """Parse one pushed line (syslog, CEF or JSON) into a CloudEvent; None if unrecognised."""
+    line = line.strip().lstrip("\ufeff")
+    if not line:
+        return None
+    if line.startswith("{"):
+        return parse_json(line, peer)
+    if line.startswith("CEF:"):
+        return parse_cef(line, peer)
+    parsed = _syslog_header(line)
+    if parsed is None:
+        return None
+    header, message = parsed
+    message = message.lstrip("\ufeff")
+    if message.startswith("CEF:"):
+        return parse_cef(message, peer, line)
+    if message.startswith("{"):
+        event = parse_json(message, peer)
+        if event is not None:
+            return event
+    pri = int(header["pri"])
+    return CloudEvent(
+        event_id=_event_id("syslog", line, peer),
+        event_name=header["name"],
+        event_time=header["time"],
+        source_ip=peer,
+        user_identity={"type": "SyslogHost", "hostName": header["host"]},
+        resources=[
+            {
+                "type": "syslog",
+                "name": header["app"],
+                "facility": pri >> 3,
+                "severity": _SEVERITIES[pri & 7],
+                "message": message,
+            }
+        ],
+        raw={"line": line},
+    )
+
+
+class _UDPProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server: "SyslogIngestServer"):
+        self.server = server
+
+    def datagram_received(self, data: bytes, addr: Tuple[Any, ...]) -> None:
+        for line in data.decode("utf-8", errors="replace").splitlines():
+            self.server.submit(line, addr[0], "udp")
+
+
+class SyslogIngestServer:
+    """Accepts pushed syslog/CEF/JSON lines over UDP and TCP and publishes them in micro-batches."""
+
+    def __init__(
+        self,
+        agent: TelemetryAgent,
+        host: str = "0.0.0.0",
+        udp_port: Optional[int] = 5514,
+        tcp_port: Optional[int] = 5514,
+        batch_size: int = 500,
+        batch_ms: float = 50.0,
+        queue_size: int = 10000,
+        max_line_bytes: int = 64 * 1024,
+    ):
+        self.agent = agent
+        self.host = host
+        self.udp_port = udp_port
+        self.tcp_port = tcp_port
+        self.batch_size = batch_size
+        self.batch_ms = batch_ms
+        self.max_line_bytes = max_line_bytes
+        self.received = 0
+        self.shed = 0
+        self.unparsed = 0
+        self.published = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        self._tcp: Optional[asyncio.AbstractServer] = None
+        self._batcher: Optional[asyncio.Task] = None
+
+    @property
+    def udp_address(self) -> Optional[Tuple[str, int]]:
+        return self._transport.get_extra_info("sockname")[:2] if self._transport else None
+
+    @property
+    def tcp_address(self) -> Optional[Tuple[str, int]]:
+        return self._tcp.sockets[0].getsockname()[:2] if self._tcp else None
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self.udp_port is not None:
+            self._transport, _ = await loop.create_datagram_endpoint(
+                lambda: _UDPProtocol(self), local_addr=(self.host, self.udp_port)
+            )
+        if self.tcp_port is not None:
+            self._tcp = await asyncio.start_server(
+                self._handle_tcp, self.host, self.tcp_port, limit=self.max_line_bytes
+            )
+        self._batcher = asyncio.create_task(self._run_batcher())
+        logger.info(f"Syslog ingest listening on udp={self.udp_address} tcp={self.tcp_address}")
+
+    async def stop(self) -> None:
+        """Stop accepting lines and publish whatever is still queued."""
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+        if self._tcp is not None:
+            self._tcp.close()
+            await self._tcp.wait_closed()
+            self._tcp = None
+        if self._batcher is not None:
+            await self._queue.put(_STOP)
+            await self._batcher
+            self._batcher = None
+
+    def submit(self, line: str, peer: Optional[str], transport: str) -> bool:
+        """Parse and enqueue one line; False if it was unparseable or shed."""
+        metrics = get_metrics()
+        self.received += 1
+        metrics.inc_counter("syslog_lines_received_total", transport=transport)
+        try:
+            event = parse_line(line, peer)
+        except Exception as e:
+            # One malformed line must not take down the sender's connection
+            # or the rest of its datagram.
+            logger.debug(f"Syslog ingest: failed to parse a line from {peer}: {e}")
+            event = None
+        if event is None:
+            if line.strip():
+                self.unparsed += 1
+                metrics.inc_counter("syslog_lines_unparsed_total", transport=transport)
+            return False
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.shed += 1
+            metrics.inc_counter("syslog_events_shed_total", transport=transport)
+            if self.shed & (self.shed - 1) == 0:  # log at powers of two, not per event
+                logger.warning(f"Syslog ingest queue saturated; {self.shed} events shed so far")
+            return False
+        return True
+
+    async def _handle_tcp(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        peer = (writer.get_extra_info("peername") or ("unknown",))[0]
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Longer than max_line_bytes: the framing is lost, drop the connection.
+                    logger.warning(f"Syslog ingest: oversized line from {peer}, closing connection")
+                    break
+                if not line:
+                    break
+                self.submit(line.decode("utf-8", errors="replace"), peer, "tcp")
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _next_batch(self) -> Tuple[List[CloudEvent], bool]:
+        """Collect up to `batch_size` events within `batch_ms` of the first; True once stopping."""
+        loop = asyncio.get_running_loop()
+        item = await self._queue.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        deadline = loop.time() + self.batch_ms / 1000
+        while len(batch) < self.batch_size:
+            if self._queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                item = self._queue.get_nowait()
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _publish(self, batch: List[CloudEvent]) -> None:
+        get_metrics().set_gauge("syslog_queue_depth", self._queue.qsize())
+        try:
+            ok = await self.agent.emit_events(batch, provider="syslog")
+        except Exception as e:
+            logger.error(f"Syslog ingest: publishing {len(batch)} events failed: {e}")
+            ok = False
+        if ok:
+            self.published += len(batch)
+        else:
+            get_metrics().inc_counter("syslog_publish_failures_total", len(batch))
+
+    async def _run_batcher(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._next_batch()
+            if batch:
+                await self._publish(batch)
@@ -1,21 +1,50 @@
 import abc
 import asyncio
+import hashlib
+import heapq
 import logging
+import sys
+import threading
+import time
+import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Set, Union
 
 from langsmith import traceable
 
+from src.asoc.agents import risk_catalogue
 from src.asoc.agents.base import BaseAgent
 from src.asoc.agents.message import ASOCMessage, MessageType, Priority
 from src.asoc.agents.observation import AgentObservation, ObservationNextState
 from src.asoc.agents.state import AgentState
+from src.asoc.core.api_pacing import get_api_pacer
 from src.asoc.core.config import settings
+from src.asoc.core.metrics import get_metrics
+from src.asoc.core.watermarks import OffsetStore, Watermark, WatermarkStore, cursor_key, parse_event_time
+from src.asoc.middleware.rate_limiter import TokenBucket
 
 logger = logging.getLogger("asoc.cloud_providers")
 
 
+RawSource = Union[Dict[str, Any], Callable[[], Dict[str, Any]], None]
+
+
 class CloudEvent:
+    """One normalised audit event.
+
+    Slotted and treated as immutable once built: catch-up can buffer
+    millions of these. Event names are interned, `to_dict()` is computed
+    once and shared (callers must not mutate it), and the provider's raw
+    record is kept only when `keep_raw` (default `TELEMETRY_RETAIN_RAW`)
+    is set. A zero-argument callable may be passed as `raw` instead; it is
+    always kept and resolves the record on access, e.g. by re-reading it
+    from a replay file.
+    """
+
+    __slots__ = ("event_id", "event_name", "event_time", "source_ip", "user_identity", "resources", "_raw", "_dict")
+
+    retain_raw: bool = settings.TELEMETRY_RETAIN_RAW
+
     def __init__(
         self,
         event_id: str,
@@ -24,38 +53,174 @@ class CloudEvent:
         source_ip: Optional[str],
         user_identity: Dict[str, Any],
         resources: List[Dict[str, Any]],
-        raw: Dict[str, Any],
+        raw: RawSource = None,
+        keep_raw: Optional[bool] = None,
     ):
         self.event_id = event_id
-        self.event_name = event_name
+        self.event_name = sys.intern(event_name) if type(event_name) is str else event_name
         self.event_time = event_time
         self.source_ip = source_ip
         self.user_identity = user_identity
         self.resources = resources
-        self.raw = raw
+        if not callable(raw) and not (self.retain_raw if keep_raw is None else keep_raw):
+            raw = None
+        self._raw = raw
+        self._dict: Optional[Dict[str, Any]] = None
+
+    @property
+    def raw(self) -> Dict[str, Any]:
+        raw = self._raw
+        if callable(raw):
+            return raw()
+        return raw if raw is not None else {}
+
+    @raw.setter
+    def raw(self, value: RawSource) -> None:
+        self._raw = value
 
     def to_dict(self) -> Dict[str, Any]:
-        return {
-            "eventID": self.event_id,
-            "eventName": self.event_name,
-            "eventTime": self.event_time,
-            "sourceIPAddress": self.source_ip,
-            "userIdentity": self.user_identity,
-            "resources": self.resources,
-        }
+        if self._dict is None:
+            self._dict = {
+                "eventID": self.event_id,
+                "eventName": self.event_name,
+                "eventTime": self.event_time,
+                "sourceIPAddress": self.source_ip,
+                "userIdentity": self.user_identity,
+                "resources": self.resources,
+            }
+        return self._dict
+
+    def __repr__(self) -> str:
+        return f"CloudEvent({self.event_id!r}, {self.event_name!r}, {self.event_time!r})"
 
     @classmethod
-    def from_cloudtrail(cls, event: Dict[str, Any]) -> "CloudEvent":
+    def from_cloudtrail(cls, event: Dict[str, Any], keep_raw: Optional[bool] = None) -> "CloudEvent":
+        event_time = event.get("EventTime", datetime.now(timezone.utc).isoformat())
+        if isinstance(event_time, datetime):
+            event_time = parse_event_time(event_time).isoformat()
         return cls(
             event_id=event.get("EventId", ""),
             event_name=event.get("EventName", "Unknown"),
-            event_time=event.get("EventTime", datetime.now(timezone.utc).isoformat()),
+            event_time=event_time,
             source_ip=event.get("SourceIPAddress"),
             user_identity=event.get("UserIdentity", {}),
             resources=event.get("Resources", []),
             raw=event,
+            keep_raw=keep_raw,
         )
 
+    @classmethod
+    def from_cloudtrail_record(
+        cls, record: Dict[str, Any], keep_raw: Optional[bool] = None, raw: RawSource = None
+    ) -> "CloudEvent":
+        """Build from a CloudTrail log-file record (camelCase keys, unlike LookupEvents)."""
+        return cls(
+            event_id=record.get("eventID", ""),
+            event_name=record.get("eventName", "Unknown"),
+            event_time=record.get("eventTime", datetime.now(timezone.utc).isoformat()),
+            source_ip=record.get("sourceIPAddress"),
+            user_identity=record.get("userIdentity", {}),
+            resources=record.get("resources", []),
+            raw=raw or record,
+            keep_raw=keep_raw,
+        )
+
+
+def _event_sort_key(event: CloudEvent) -> datetime:
+    try:
+        return parse_event_time(event.event_time)
+    except (TypeError, ValueError):
+        return datetime.min.replace(tzinfo=timezone.utc)
+
+
+
+def _quote(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+_END_OF_STREAM = object()
+
+
+async def _stream_pages(pages: Callable[[], Iterable[List[Any]]], prefetch: int = 2) -> AsyncIterator[List[Any]]:
+    """Drive a blocking page iterator in the executor, at most `prefetch` pages ahead.
+
+    The producer thread blocks on the bounded queue, so a slow consumer
+    throttles SDK pagination instead of letting pages pile up in memory.
+    Exceptions raised by the iterator are re-raised in the consumer.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, prefetch))
+    stop = threading.Event()
+
+    def _put(item: Any) -> None:
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def _produce() -> None:
+        iterator = iter(pages())
+        try:
+            for page in iterator:
+                if stop.is_set():
+                    return
+                _put(page)
+            item: Any = _END_OF_STREAM
+        except Exception as e:
+            item = e
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+        if not stop.is_set():
+            _put(item)
+
+    producer = loop.run_in_executor(None, _produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END_OF_STREAM:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+        await producer
+    finally:
+        stop.set()
+        while not queue.empty():
+            queue.get_nowait()
+
+
+async def _merge_streams(streams: List[AsyncIterator[List[Any]]]) -> AsyncIterator[List[Any]]:
+    """Interleave pages from several async page streams in arrival order.
+
+    The first stream error cancels the others and is re-raised in the consumer.
+    """
+    if len(streams) == 1:
+        async for page in streams[0]:
+            yield page
+        return
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=2 * len(streams))
+
+    async def _pump(stream: AsyncIterator[List[Any]]) -> None:
+        async for page in stream:
+            await queue.put(page)
+
+    async def _pump_all() -> None:
+        try:
+            await asyncio.gather(*(_pump(s) for s in streams))
+        except Exception as e:
+            await queue.put(e)
+        else:
+            await queue.put(_END_OF_STREAM)
+
+    pump = asyncio.create_task(_pump_all())
+    try:
+        while (item := await queue.get()) is not _END_OF_STREAM:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        pump.cancel()
+
 
 class BaseCloudProvider(abc.ABC):
     @abc.abstractmethod
@@ -64,29 +229,91 @@ class BaseCloudProvider(abc.ABC):
     @abc.abstractmethod
     async def health_check(self) -> bool: ...
 
+    async def stream_events(self, max_results: Optional[int] = None, **kwargs) -> AsyncIterator[List[CloudEvent]]:
+        """Yield events page by page. Providers without native paging yield one page."""
+        events = await self.fetch_events(max_results=max_results or 10, **kwargs)
+        if events:
+            yield events
+
+    async def commit_cursor(self) -> None:
+        """Persist the cursor staged by the last incremental fetch.
+
+        Called once the fetched events have been published, so a crash between
+        fetch and publish re-delivers them instead of losing them.
+        """
+
 
 class AWSCloudTrailProvider(BaseCloudProvider):
+    PAGE_SIZE = 50  # LookupEvents hard limit per page
+
     def __init__(
-        self, region: str = "us-east-1", access_key_id: Optional[str] = None, secret_access_key: Optional[str] = None
+        self,
+        region: str = "us-east-1",
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+        account_id: Optional[str] = None,
+        watermarks: Optional[WatermarkStore] = None,
+        role_arn: Optional[str] = None,
+        event_names: Optional[Iterable[str]] = None,
+        lookup_rate: float = 2.0,
+        lookup_burst: int = 1,
     ):
         self.region = region
         self.access_key_id = access_key_id
         self.secret_access_key = secret_access_key
+        self.role_arn = role_arn
+        if account_id is None and role_arn:
+            account_id = role_arn.split(":")[4]
+        self.account_id = account_id
+        self.watermarks = watermarks
+        self.event_names = sorted(event_names) if event_names else None
+        # LookupEvents quota is per account and region, so every provider and
+        # every per-EventName query against it shares one pacer.
+        self.pacer = get_api_pacer(
+            f"cloudtrail:LookupEvents:{cursor_key('aws', account_id or '', region)}", lookup_rate, lookup_burst
+        )
         self._client = None
+        self._client_expires: Optional[datetime] = None
         self._healthy = False
+        self._staged: Optional[Watermark] = None
+
+    @property
+    def cursor_key(self) -> str:
+        key = cursor_key("aws", self.account_id or "", self.region)
+        if self.event_names:
+            # A filtered cursor only advances over matching events, so it must
+            # never be shared with an unfiltered one.
+            key += ":" + hashlib.sha1(",".join(self.event_names).encode()).hexdigest()[:8]
+        return key
 
     def _get_client(self):
-        if self._client is not None:
+        if self._client is not None and (
+            self._client_expires is None or datetime.now(timezone.utc) < self._client_expires - timedelta(minutes=5)
+        ):
             return self._client
         try:
             import boto3
+            from botocore.config import Config
 
             session_kwargs: Dict[str, Any] = {"region_name": self.region}
             if self.access_key_id and self.secret_access_key:
                 session_kwargs["aws_access_key_id"] = self.access_key_id
                 session_kwargs["aws_secret_access_key"] = self.secret_access_key
             session = boto3.Session(**session_kwargs)
-            self._client = session.client("cloudtrail")
+            if self.role_arn:
+                creds = session.client("sts").assume_role(
+                    RoleArn=self.role_arn, RoleSessionName="a-soc-telemetry"
+                )["Credentials"]
+                session = boto3.Session(
+                    region_name=self.region,
+                    aws_access_key_id=creds["AccessKeyId"],
+                    aws_secret_access_key=creds["SecretAccessKey"],
+                    aws_session_token=creds["SessionToken"],
+                )
+                self._client_expires = creds["Expiration"]
+            # Throttling is handled by the pacer; boto's own retries would
+            # bypass it and hammer the quota.
+            self._client = session.client("cloudtrail", config=Config(retries={"max_attempts": 1, "mode": "standard"}))
             self._healthy = True
             logger.info("AWS CloudTrail client initialized successfully")
         except Exception as e:
@@ -95,42 +322,154 @@ class AWSCloudTrailProvider(BaseCloudProvider):
         return self._client
 
     async def fetch_events(
-        self, max_results: int = 10, start_time: Optional[datetime] = None, **kwargs
+        self,
+        max_results: int = 10,
+        start_time: Optional[datetime] = None,
+        incremental: bool = False,
+        **kwargs,
     ) -> List[CloudEvent]:
-        client = self._get_client()
-        if client is None:
+        """Look up CloudTrail events.
+
+        With `incremental=True` and a watermark store configured, the lookup
+        resumes from the stored watermark, pages through every new event
+        (ignoring `max_results`), drops events already seen at the boundary,
+        and stages the advanced watermark for `commit_cursor()`. An empty
+        result means nothing new, so no mock events are substituted.
+        """
+        if self._get_client() is None:
             logger.info("No AWS CloudTrail client available, returning mock events")
             return self._mock_events(max_results)
 
+        try:
+            events = [
+                e
+                async for page in self.stream_events(
+                    max_results=max_results, start_time=start_time, incremental=incremental
+                )
+                for e in page
+            ]
+        except Exception as e:
+            if type(e).__name__ in ("NoCredentialsError", "PartialCredentialsError"):
+                # Unconfigured, same as having no client.
+                logger.info("No AWS credentials available, returning mock events")
+                return self._mock_events(max_results)
+            # Never substitute mock events for a failed or throttled lookup:
+            # downstream detection would treat them as real activity.
+            logger.error(f"CloudTrail LookupEvents failed: {e}")
+            return []
+
+        if incremental and self.watermarks is not None and start_time is None:
+            # LookupEvents returns newest first; emit in event-time order.
+            return sorted(events, key=_event_sort_key)
+
+        if not events:
+            logger.info("No CloudTrail events found, returning mock events")
+            return self._mock_events(max_results)
+        return events
+
+    async def stream_events(
+        self,
+        max_results: Optional[int] = None,
+        start_time: Optional[datetime] = None,
+        incremental: bool = False,
+        prefetch: int = 2,
+        **kwargs,
+    ) -> AsyncIterator[List[CloudEvent]]:
+        """Yield CloudEvent pages as LookupEvents paginates.
+
+        With `event_names` configured, one LookupEvents query per EventName
+        runs concurrently (LookupAttributes takes a single attribute) and
+        their pages are interleaved. Incremental streams filter every page against the stored watermark
+        and stage the advanced watermark only once the last page has been
+        consumed, so abandoning a stream never moves the cursor.
+        """
+        # A watermark staged by an earlier poll whose events were never
+        # published must not be committed after this one.
+        self._staged = None
+        client = self._get_client()
+        if client is None:
+            yield self._mock_events(max_results or 10)
+            return
+
+        watermark = None
+        incremental = incremental and self.watermarks is not None and start_time is None
+        if incremental:
+            watermark = self.watermarks.get(self.cursor_key)
+            if watermark is not None:
+                start_time = watermark.time
         if start_time is None:
             start_time = datetime.now(timezone.utc) - timedelta(hours=1)
+        limit = None if incremental else max_results
 
-        loop = asyncio.get_event_loop()
-
-        def _lookup() -> List[Dict[str, Any]]:
+        names = self.event_names or [None]
+        streams = [
+            _stream_pages(lambda name=name: self._lookup_pages(client, start_time, limit, name), prefetch) for name in names
+        ]
+        staged, fetched, fresh = watermark, 0, 0
+        async for raw_page in _merge_streams(streams):
+            page = [CloudEvent.from_cloudtrail(e) for e in raw_page]
+            if limit is not None:
+                page = page[: limit - fetched]
+            fetched += len(page)
+            if incremental:
+                keyed = [(e.event_id, _event_sort_key(e), e) for e in page]
+                if watermark is not None:
+                    page = watermark.filter_new(keyed)
+                staged = Watermark.advance(staged, ((e.event_id, _event_sort_key(e)) for e in page))
+                fresh += len(page)
+            if page:
+                yield page
+            if limit is not None and fetched >= limit:
+                return
+
+        if incremental:
+            self._staged = staged
+            logger.info("cloudtrail_incremental_fetch", cursor=self.cursor_key, fetched=fetched, new=fresh)
+
+    def _lookup_pages(
+        self, client, start_time: datetime, limit: Optional[int], event_name: Optional[str] = None
+    ) -> Iterator[List[Dict[str, Any]]]:
+        paginator = client.get_paginator("lookup_events")
+        params: Dict[str, Any] = {"StartTime": start_time}
+        if event_name:
+            params["LookupAttributes"] = [{"AttributeKey": "EventName", "AttributeValue": event_name}]
+        page_size = min(limit, self.PAGE_SIZE) if limit else self.PAGE_SIZE
+        cursor: Dict[str, Any] = {"pages": None, "token": None}
+
+        def _next_page() -> Optional[Dict[str, Any]]:
+            # Each page is one LookupEvents call. A throttled call kills the
+            # paginator, so it is rebuilt from the last token and the page retried.
+            if cursor["pages"] is None:
+                config: Dict[str, Any] = {"PageSize": page_size}
+                if cursor["token"]:
+                    config["StartingToken"] = cursor["token"]
+                cursor["pages"] = iter(paginator.paginate(PaginationConfig=config, **params))
             try:
-                paginator = client.get_paginator("lookup_events")
-                pages = paginator.paginate(StartTime=start_time, MaxResults=max_results)
-                events = []
-                for page in pages:
-                    for e in page.get("Events", []):
-                        events.append(e)
-                        if len(events) >= max_results:
-                            break
-                    if len(events) >= max_results:
-                        break
-                return events
-            except Exception as e:
-                logger.error(f"CloudTrail LookupEvents failed: {e}")
-                return []
-
-        raw_events = await loop.run_in_executor(None, _lookup)
-
-        if not raw_events:
-            logger.info("No CloudTrail events found, returning mock events")
-            return self._mock_events(max_results)
-
-        return [CloudEvent.from_cloudtrail(e) for e in raw_events]
+                return next(cursor["pages"], None)
+            except Exception:
+                cursor["pages"] = None
+                raise
+
+        seen = 0
+        while (page := self.pacer.call(_next_page)) is not None:
+            cursor["token"] = page.get("NextToken")
+            events = page.get("Events", [])
+            if limit is not None:
+                events = events[: limit - seen]
+            seen += len(events)
+            yield events
+            if limit is not None and seen >= limit:
+                return
+
+    def pacing_stats(self) -> Dict[str, float]:
+        """Achieved vs allowed LookupEvents throughput for this account and region."""
+        return self.pacer.stats()
+
+    async def commit_cursor(self) -> None:
+        if self.watermarks is None or self._staged is None:
+            return
+        staged, self._staged = self._staged, None
+        await asyncio.to_thread(self.watermarks.set, self.cursor_key, staged)
 
     async def health_check(self) -> bool:
         client = self._get_client()
@@ -175,9 +514,15 @@ class AWSCloudTrailProvider(BaseCloudProvider):
 
 
 class GCPCloudProvider(BaseCloudProvider):
-    def __init__(self, project_id: Optional[str] = None, credentials_path: Optional[str] = None):
+    def __init__(
+        self,
+        project_id: Optional[str] = None,
+        credentials_path: Optional[str] = None,
+        method_names: Optional[Iterable[str]] = None,
+    ):
         self.project_id = project_id
         self.credentials_path = credentials_path
+        self.method_names = sorted(method_names) if method_names else None
         self._client = None
         self._healthy = False
 
@@ -206,67 +551,91 @@ class GCPCloudProvider(BaseCloudProvider):
     async def fetch_events(
         self, max_results: int = 10, start_time: Optional[datetime] = None, **kwargs
     ) -> List[CloudEvent]:
-        client = self._get_client()
-        if client is None:
+        if self._get_client() is None:
             logger.info("No GCP Cloud Logging client available, returning mock events")
             return self._mock_events(max_results)
 
-        if start_time is None:
-            start_time = datetime.now(timezone.utc) - timedelta(hours=1)
-
-        loop = asyncio.get_event_loop()
-
-        def _list_entries() -> List[Dict[str, Any]]:
-            try:
-                entries = client.list_entries(
-                    resource_names=[f"projects/{self.project_id}"],
-                    filter_=f'protoPayload.serviceName="cloudaudit.googleapis.com" AND timestamp >= "{start_time.isoformat()}Z"',
-                    page_size=max_results,
-                )
-                results = []
-                for entry in entries:
-                    if len(results) >= max_results:
-                        break
-                    payload = entry.payload
-                    if isinstance(payload, dict):
-                        results.append(payload)
-                    else:
-                        results.append(
-                            {
-                                "protoPayload": payload,
-                                "timestamp": (
-                                    entry.timestamp.isoformat()
-                                    if hasattr(entry, "timestamp")
-                                    else start_time.isoformat()
-                                ),
-                            }
-                        )
-                return results
-            except Exception as e:
-                logger.error(f"GCP Logging list_entries failed: {e}")
-                return []
-
-        raw_entries = await loop.run_in_executor(None, _list_entries)
+        try:
+            events = [e async for page in self.stream_events(max_results=max_results, start_time=start_time) for e in page]
+        except Exception as e:
+            logger.error(f"GCP Logging list_entries failed: {e}")
+            events = []
 
-        if not raw_entries:
+        if not events:
             logger.info("No GCP audit log entries found, returning mock events")
             return self._mock_events(max_results)
+        return events
 
-        return [
-            CloudEvent(
-                event_id=entry.get("insertId", f"gcp-{i}"),
-                event_name=entry.get("protoPayload", {}).get("methodName", "Unknown"),
-                event_time=entry.get("timestamp", start_time.isoformat()),
-                source_ip=entry.get("protoPayload", {}).get("requestMetadata", {}).get("callerIp"),
-                user_identity=entry.get("protoPayload", {}).get("authenticationInfo", {}),
-                resources=[
-                    {"type": r.get("type", ""), "name": r.get("name", "")}
-                    for r in entry.get("protoPayload", {}).get("resourceList", [])
-                ],
-                raw=entry,
-            )
-            for i, entry in enumerate(raw_entries)
-        ]
+    async def stream_events(
+        self,
+        max_results: Optional[int] = None,
+        start_time: Optional[datetime] = None,
+        prefetch: int = 2,
+        **kwargs,
+    ) -> AsyncIterator[List[CloudEvent]]:
+        """Yield CloudEvent pages as `list_entries` paginates."""
+        client = self._get_client()
+        if client is None:
+            yield self._mock_events(max_results or 10)
+            return
+
+        if start_time is None:
+            start_time = datetime.now(timezone.utc) - timedelta(hours=1)
+
+        offset = 0
+        async for raw_page in _stream_pages(lambda: self._entry_pages(client, start_time, max_results), prefetch):
+            yield [self._to_event(entry, offset + i, start_time) for i, entry in enumerate(raw_page)]
+            offset += len(raw_page)
+
+    def _entry_pages(
+        self, client, start_time: datetime, limit: Optional[int]
+    ) -> Iterator[List[Dict[str, Any]]]:
+        log_filter = f'protoPayload.serviceName="cloudaudit.googleapis.com" AND timestamp >= "{start_time.isoformat()}Z"'
+        if self.method_names:
+            log_filter += " AND (" + " OR ".join(f"protoPayload.methodName={_quote(m)}" for m in self.method_names) + ")"
+        entries = client.list_entries(
+            resource_names=[f"projects/{self.project_id}"],
+            filter_=log_filter,
+            page_size=min(limit, 1000) if limit else 1000,
+        )
+        seen = 0
+        for page in entries.pages:
+            results = []
+            for entry in page:
+                if limit is not None and seen >= limit:
+                    break
+                seen += 1
+                payload = entry.payload
+                if isinstance(payload, dict):
+                    results.append(payload)
+                else:
+                    results.append(
+                        {
+                            "protoPayload": payload,
+                            "timestamp": (
+                                entry.timestamp.isoformat() if hasattr(entry, "timestamp") else start_time.isoformat()
+                            ),
+                        }
+                    )
+            yield results
+            if limit is not None and seen >= limit:
+                return
+
+    @staticmethod
+    def _to_event(
+        entry: Dict[str, Any], index: int, start_time: datetime, keep_raw: Optional[bool] = None, raw: RawSource = None
+    ) -> CloudEvent:
+        proto = entry.get("protoPayload", {})
+        return CloudEvent(
+            event_id=entry.get("insertId", f"gcp-{index}"),
+            event_name=proto.get("methodName", "Unknown"),
+            event_time=entry.get("timestamp", start_time.isoformat()),
+            source_ip=proto.get("requestMetadata", {}).get("callerIp"),
+            user_identity=proto.get("authenticationInfo", {}),
+            resources=[{"type": r.get("type", ""), "name": r.get("name", "")} for r in proto.get("resourceList", [])],
+            raw=raw or entry,
+            keep_raw=keep_raw,
+        )
 
     async def health_check(self) -> bool:
         client = self._get_client()
@@ -311,17 +680,23 @@ class GCPCloudProvider(BaseCloudProvider):
 
 
 class AzureCloudProvider(BaseCloudProvider):
+    ROW_PAGE_SIZE = 500
+
     def __init__(
         self,
         tenant_id: Optional[str] = None,
         client_id: Optional[str] = None,
         client_secret: Optional[str] = None,
         subscription_id: Optional[str] = None,
+        workspace_id: Optional[str] = None,
+        operation_names: Optional[Iterable[str]] = None,
     ):
         self.tenant_id = tenant_id
         self.client_id = client_id
         self.client_secret = client_secret
         self.subscription_id = subscription_id
+        self.workspace_id = workspace_id
+        self.operation_names = sorted(operation_names) if operation_names else None
         self._client = None
         self._healthy = False
 
@@ -348,65 +723,88 @@ class AzureCloudProvider(BaseCloudProvider):
     async def fetch_events(
         self, max_results: int = 10, start_time: Optional[datetime] = None, **kwargs
     ) -> List[CloudEvent]:
-        client = self._get_client()
-        if client is None:
+        if self._get_client() is None:
             logger.info("No Azure Logs Query client available, returning mock events")
             return self._mock_events(max_results)
 
-        if start_time is None:
-            start_time = datetime.now(timezone.utc) - timedelta(hours=1)
+        try:
+            events = [
+                e async for page in self.stream_events(max_results=max_results, start_time=start_time, **kwargs) for e in page
+            ]
+        except Exception as e:
+            logger.error(f"Azure Log Analytics query failed: {e}")
+            events = []
 
-        end_time = start_time + timedelta(hours=1)
-        loop = asyncio.get_event_loop()
-        workspace_id = kwargs.get("workspace_id", self.subscription_id or "")
+        if not events:
+            logger.info("No Azure Activity log entries found, returning mock events")
+            return self._mock_events(max_results)
+        return events
 
-        def _query() -> List[Dict[str, Any]]:
-            try:
-                query = (
-                    f"AzureActivity "
-                    f"| where TimeGenerated between (datetime({start_time.isoformat()}) .. datetime({end_time.isoformat()})) "
-                    f"| project TimeGenerated, OperationName, CallerIpAddress, Caller, Resource, ActivityStatus "
-                    f"| take {max_results}"
-                )
-                response = client.query_workspace(workspace_id, query)
-                tables = response.tables
-                if not tables:
-                    return []
-                rows = []
-                for row in tables[0].rows:
-                    rows.append(
-                        {
-                            "TimeGenerated": row[0].isoformat() if hasattr(row[0], "isoformat") else str(row[0]),
-                            "OperationName": str(row[1]) if len(row) > 1 else "Unknown",
-                            "CallerIpAddress": str(row[2]) if len(row) > 2 and row[2] else None,
-                            "Caller": str(row[3]) if len(row) > 3 else "",
-                            "Resource": str(row[4]) if len(row) > 4 else "",
-                            "ActivityStatus": str(row[5]) if len(row) > 5 else "Accepted",
-                        }
-                    )
-                return rows
-            except Exception as e:
-                logger.error(f"Azure Log Analytics query failed: {e}")
-                return []
+    async def stream_events(
+        self,
+        max_results: Optional[int] = None,
+        start_time: Optional[datetime] = None,
+        prefetch: int = 2,
+        **kwargs,
+    ) -> AsyncIterator[List[CloudEvent]]:
+        """Yield CloudEvent pages of `ROW_PAGE_SIZE` rows from the query result."""
+        client = self._get_client()
+        if client is None:
+            yield self._mock_events(max_results or 10)
+            return
 
-        raw_rows = await loop.run_in_executor(None, _query)
+        if start_time is None:
+            start_time = datetime.now(timezone.utc) - timedelta(hours=1)
+        workspace_id = kwargs.get("workspace_id", self.workspace_id or self.subscription_id or "")
 
-        if not raw_rows:
-            logger.info("No Azure Activity log entries found, returning mock events")
-            return self._mock_events(max_results)
+        offset = 0
+        async for raw_page in _stream_pages(
+            lambda: self._row_pages(client, workspace_id, start_time, max_results), prefetch
+        ):
+            yield [
+                CloudEvent(
+                    event_id=f"azure-{hash(str(row))}-{offset + i}",
+                    event_name=row.get("OperationName", "Unknown"),
+                    event_time=row.get("TimeGenerated", start_time.isoformat()),
+                    source_ip=row.get("CallerIpAddress"),
+                    user_identity={"type": "AzureAD", "principalName": row.get("Caller", "")},
+                    resources=[{"type": "AzureResource", "name": row.get("Resource", "")}],
+                    raw=row,
+                )
+                for i, row in enumerate(raw_page)
+            ]
+            offset += len(raw_page)
 
-        return [
-            CloudEvent(
-                event_id=f"azure-{hash(str(row))}-{i}",
-                event_name=row.get("OperationName", "Unknown"),
-                event_time=row.get("TimeGenerated", start_time.isoformat()),
-                source_ip=row.get("CallerIpAddress"),
-                user_identity={"type": "AzureAD", "principalName": row.get("Caller", "")},
-                resources=[{"type": "AzureResource", "name": row.get("Resource", "")}],
-                raw=row,
-            )
-            for i, row in enumerate(raw_rows)
-        ]
+    def _row_pages(
+        self, client, workspace_id: str, start_time: datetime, limit: Optional[int]
+    ) -> Iterator[List[Dict[str, Any]]]:
+        end_time = start_time + timedelta(hours=1)
+        query = (
+            f"AzureActivity "
+            f"| where TimeGenerated between (datetime({start_time.isoformat()}) .. datetime({end_time.isoformat()})) "
+        )
+        if self.operation_names:
+            query += f"| where OperationNameValue in~ ({', '.join(_quote(o) for o in self.operation_names)}) "
+        query += "| project TimeGenerated, OperationName, CallerIpAddress, Caller, Resource, ActivityStatus"
+        if limit:
+            query += f" | take {limit}"
+        response = client.query_workspace(workspace_id, query)
+        tables = response.tables
+        if not tables:
+            return
+        rows = tables[0].rows
+        for i in range(0, len(rows), self.ROW_PAGE_SIZE):
+            yield [
+                {
+                    "TimeGenerated": row[0].isoformat() if hasattr(row[0], "isoformat") else str(row[0]),
+                    "OperationName": str(row[1]) if len(row) > 1 else "Unknown",
+                    "CallerIpAddress": str(row[2]) if len(row) > 2 and row[2] else None,
+                    "Caller": str(row[3]) if len(row) > 3 else "",
+                    "Resource": str(row[4]) if len(row) > 4 else "",
+                    "ActivityStatus": str(row[5]) if len(row) > 5 else "Accepted",
+                }
+                for row in rows[i : i + self.ROW_PAGE_SIZE]
+            ]
 
     async def health_check(self) -> bool:
         client = self._get_client()
@@ -416,7 +814,7 @@ class AzureCloudProvider(BaseCloudProvider):
             loop = asyncio.get_event_loop()
 
             def _check():
-                client.query_workspace(self.subscription_id or "", "AzureActivity | take 1")
+                client.query_workspace(self.workspace_id or self.subscription_id or "", "AzureActivity | take 1")
                 return True
 
             return await loop.run_in_executor(None, _check)
@@ -450,21 +848,194 @@ class AzureCloudProvider(BaseCloudProvider):
         return events
 
 
+class CompositeCloudProvider(BaseCloudProvider):
+    """Polls many providers concurrently and merges their events by event time.
+
+    Each child provider has its own token bucket, so a slow or throttled
+    region never holds back the others; a `rate_limit` of 0 leaves the
+    children unpaced. A child that fails or exceeds
+    `timeout` contributes no events for that poll; the rest still merge.
+    `max_results` applies per child. `commit_cursor` commits only the
+    children that completed the last poll.
+    """
+
+    def __init__(
+        self,
+        providers: List[BaseCloudProvider],
+        rate_limit: float = 2.0,
+        burst: int = 2,
+        timeout: float = 30.0,
+    ):
+        self.providers = providers
+        self.timeout = timeout
+        self._buckets: List[Optional[TokenBucket]] = [
+            TokenBucket(burst, rate_limit) if rate_limit > 0 else None for _ in providers
+        ]
+        self._refill_rate = rate_limit
+        self._polled: Set[int] = set()
+
+    async def _acquire(self, bucket: Optional[TokenBucket]) -> None:
+        if bucket is None:
+            return
+        while not bucket.consume():
+            await asyncio.sleep((1.0 - bucket.available) / self._refill_rate)
+
+    async def _fetch_one(self, index: int, max_results: int, **kwargs) -> List[CloudEvent]:
+        provider = self.providers[index]
+        await self._acquire(self._buckets[index])
+        try:
+            events = await asyncio.wait_for(provider.fetch_events(max_results=max_results, **kwargs), self.timeout)
+        except Exception as e:
+            logger.error(f"Telemetry fan-in: {type(provider).__name__}[{index}] fetch failed: {e}")
+            return []
+        self._polled.add(index)
+        return sorted(events, key=_event_sort_key)
+
+    async def fetch_events(self, max_results: int = 10, **kwargs) -> List[CloudEvent]:
+        self._polled = set()
+        results = await asyncio.gather(*(self._fetch_one(i, max_results, **kwargs) for i in range(len(self.providers))))
+        return list(heapq.merge(*results, key=_event_sort_key))
+
+    async def stream_events(self, max_results: Optional[int] = None, **kwargs) -> AsyncIterator[List[CloudEvent]]:
+        """Yield pages from every child as they arrive.
+
+        Pages are interleaved in arrival order, not merged by time; use
+        `fetch_events` when a single time-ordered batch is needed.
+        """
+
+        async def _child(index: int) -> AsyncIterator[List[CloudEvent]]:
+            await self._acquire(self._buckets[index])
+            try:
+                async for page in self.providers[index].stream_events(max_results=max_results, **kwargs):
+                    yield page
+            except Exception as e:
+                logger.error(f"Telemetry fan-in: {type(self.providers[index]).__name__}[{index}] stream failed: {e}")
+            else:
+                self._polled.add(index)
+
+        self._polled = set()
+        async for page in _merge_streams([_child(i) for i in range(len(self.providers))]):
+            yield page
+
+    async def commit_cursor(self) -> None:
+        polled, self._polled = self._polled, set()
+        await asyncio.gather(*(self.providers[i].commit_cursor() for i in sorted(polled)))
+
+    async def health_check(self) -> bool:
+        results = await asyncio.gather(*(p.health_check() for p in self.providers), return_exceptions=True)
+        return any(r is True for r in results)
+
+
+def _split(value: Optional[str]) -> List[str]:
+    return [v.strip() for v in (value or "").split(",") if v.strip()]
+
+
+def create_cloud_provider(config=None) -> BaseCloudProvider:
+    """Build the telemetry provider from settings.
+
+    One AWS provider per (role, region) from `TELEMETRY_AWS_REGIONS` and
+    `TELEMETRY_AWS_ROLE_ARNS`, one GCP provider per `TELEMETRY_GCP_PROJECTS`
+    entry and one Azure provider per `TELEMETRY_AZURE_WORKSPACES` entry.
+    `TELEMETRY_PUSHDOWN_CATEGORIES` ("all" or risk catalogue category
+    names) restricts every provider's query server-side to the catalogue's
+    high-risk operations. A single source is returned as-is; several are
+    wrapped in a `CompositeCloudProvider`. `TELEMETRY_REPLAY_PATH` replaces
+    all live sources with a `FileReplayProvider` over local exports.
+    `TELEMETRY_FLOW_LOG_PATH` adds a `VPCFlowLogProvider` and
+    `TELEMETRY_K8S_AUDIT_PATH` a `K8sAuditLogProvider` to either.
+    """
+    config = config or settings
+    providers: List[BaseCloudProvider] = []
+    if config.TELEMETRY_FLOW_LOG_PATH:
+        from src.asoc.agents.flow_logs import VPCFlowLogProvider
+
+        providers.append(
+            VPCFlowLogProvider(
+                config.TELEMETRY_FLOW_LOG_PATH,
+                window_seconds=config.TELEMETRY_FLOW_WINDOW_SECONDS,
+                outlier_sigma=config.TELEMETRY_FLOW_OUTLIER_SIGMA,
+                min_bytes=config.TELEMETRY_FLOW_MIN_BYTES,
+            )
+        )
+    if config.TELEMETRY_K8S_AUDIT_PATH:
+        from src.asoc.agents.k8s_audit import K8sAuditLogProvider
+
+        providers.append(
+            K8sAuditLogProvider(config.TELEMETRY_K8S_AUDIT_PATH, offsets=OffsetStore(config.TELEMETRY_OFFSETS_PATH))
+        )
+    if config.TELEMETRY_REPLAY_PATH:
+        from src.asoc.agents.replay import FileReplayProvider
+
+        providers.insert(
+            0,
+            FileReplayProvider(
+                config.TELEMETRY_REPLAY_PATH,
+                speed=config.TELEMETRY_REPLAY_SPEED,
+                workers=config.TELEMETRY_REPLAY_WORKERS,
+            ),
+        )
+        return _combine(providers, config)
+    watermarks = WatermarkStore(config.TELEMETRY_WATERMARK_PATH)
+    pushdown = _split(config.TELEMETRY_PUSHDOWN_CATEGORIES)
+    aws_names = risk_catalogue.event_names("aws", pushdown) if pushdown else None
+    gcp_names = risk_catalogue.event_names("gcp", pushdown) if pushdown else None
+    azure_names = risk_catalogue.event_names("azure", pushdown) if pushdown else None
+    aws_key = config.AWS_ACCESS_KEY_ID.get_secret_value() if config.AWS_ACCESS_KEY_ID else None
+    aws_secret = config.AWS_SECRET_ACCESS_KEY.get_secret_value() if config.AWS_SECRET_ACCESS_KEY else None
+
+    for role_arn in _split(config.TELEMETRY_AWS_ROLE_ARNS) or [None]:
+        for region in _split(config.TELEMETRY_AWS_REGIONS) or [config.AWS_REGION]:
+            providers.append(
+                AWSCloudTrailProvider(
+                    region=region,
+                    access_key_id=aws_key,
+                    secret_access_key=aws_secret,
+                    account_id=None if role_arn else config.AWS_ACCOUNT_ID,
+                    watermarks=watermarks,
+                    role_arn=role_arn,
+                    event_names=aws_names,
+                    lookup_rate=config.CLOUDTRAIL_LOOKUP_RATE,
+                    lookup_burst=config.CLOUDTRAIL_LOOKUP_BURST,
+                )
+            )
+    for project_id in _split(config.TELEMETRY_GCP_PROJECTS):
+        providers.append(
+            GCPCloudProvider(
+                project_id=project_id, credentials_path=config.GCP_CREDENTIALS_PATH, method_names=gcp_names
+            )
+        )
+    azure_secret = config.AZURE_CLIENT_SECRET.get_secret_value() if config.AZURE_CLIENT_SECRET else None
+    for workspace_id in _split(config.TELEMETRY_AZURE_WORKSPACES):
+        providers.append(
+            AzureCloudProvider(
+                tenant_id=config.AZURE_TENANT_ID,
+                client_id=config.AZURE_CLIENT_ID,
+                client_secret=azure_secret,
+                subscription_id=config.AZURE_SUBSCRIPTION_ID,
+                workspace_id=workspace_id,
+                operation_names=azure_names,
+            )
+        )
+    return _combine(providers, config)
+
+
+def _combine(providers: List[BaseCloudProvider], config) -> BaseCloudProvider:
+    if len(providers) == 1:
+        return providers[0]
+    return CompositeCloudProvider(
+        providers,
+        rate_limit=config.TELEMETRY_PROVIDER_RATE_LIMIT,
+        burst=config.TELEMETRY_PROVIDER_BURST,
+        timeout=config.TELEMETRY_PROVIDER_TIMEOUT_SECONDS,
+    )
+
+
 class TelemetryAgent(BaseAgent):
     def __init__(self, provider: Optional[BaseCloudProvider] = None):
         super().__init__(
             name="TelemetryAgent", description="Pulls logs from AWS CloudTrail, VPC Flow Logs, and K8s audit logs"
         )
-        if provider:
-            self.provider = provider
-        else:
-            aws_key = settings.AWS_ACCESS_KEY_ID.get_secret_value() if settings.AWS_ACCESS_KEY_ID else None
-            aws_secret = settings.AWS_SECRET_ACCESS_KEY.get_secret_value() if settings.AWS_SECRET_ACCESS_KEY else None
-            self.provider = AWSCloudTrailProvider(
-                region=settings.AWS_REGION,
-                access_key_id=aws_key,
-                secret_access_key=aws_secret,
-            )
+        self.provider = provider or create_cloud_provider()
 
     def _register_default_tools(self) -> None:
         self.tool_registry.register(
@@ -500,17 +1071,13 @@ class TelemetryAgent(BaseAgent):
         return [e.to_dict() for e in events]
 
     async def _tool_filter_events_by_risk(self, events: List[Dict[str, Any]], min_risk: float = 0.3) -> List[Dict[str, Any]]:
-        HIGH_RISK_EVENTS = {
-            "ConsoleLogin", "CreateUser", "DeleteBucket",
-            "AuthorizeSecurityGroupIngress", "TerminateInstance",
-        }
         filtered = []
         for event in events:
             name = event.get("eventName", event.get("EventName", ""))
-            risk = 0.8 if name in HIGH_RISK_EVENTS else 0.3
+            risk = risk_catalogue.risk_for_event(name)
             if risk >= min_risk:
-                event["_risk_heuristic"] = risk
-                filtered.append(event)
+                # Annotate a copy: `event` may be a CloudEvent's shared to_dict().
+                filtered.append({**event, "_risk_heuristic": risk})
         return filtered
 
     async def _tool_normalize_event(self, raw_event: Dict[str, Any]) -> Dict[str, Any]:
@@ -524,9 +1091,9 @@ class TelemetryAgent(BaseAgent):
             payload={"event": event, "provider": "aws_cloudtrail"},
             priority=priority_map.get(priority, Priority.MEDIUM),
         )
-        await self.send_message(msg)
+        sent = await self.send_message(msg)
         await self.log_event("log_ingestion", {"event_id": event.get("eventID", ""), "event_name": event.get("eventName", "")})
-        return True
+        return sent
 
     @traceable(name="telemetry_perceive", run_type="chain")
     async def perceive(self, state: AgentState) -> Dict[str, Any]:
@@ -566,32 +1133,79 @@ class TelemetryAgent(BaseAgent):
             metadata={"event_count": len(events), "events": events[:5]},
         )
 
+    def _build_alerts(self, event_dicts: List[Dict[str, Any]], provider: str = "aws_cloudtrail") -> List[ASOCMessage]:
+        """Build one ALERT per event, skipping per-message validation.
+
+        Every field is produced here with its final type, so `model_construct`
+        is safe and avoids running the validator once per event.
+        """
+        now = datetime.now(timezone.utc)
+        return [
+            ASOCMessage.model_construct(
+                message_id=str(uuid.uuid4()),
+                timestamp=now,
+                message_type=MessageType.ALERT.value,
+                source_agent=self.name,
+                target_agent=None,
+                payload={"event": event_dict, "provider": provider},
+                priority=Priority.MEDIUM.value,
+                security_context=None,
+                correlation_id=None,
+            )
+            for event_dict in event_dicts
+        ]
+
+    def _record_ingest(self, count: int, elapsed: float, provider: str = "aws_cloudtrail") -> None:
+        metrics = get_metrics()
+        metrics.inc_counter("telemetry_events_ingested_total", count, provider=provider)
+        metrics.observe_histogram("telemetry_ingest_batch_seconds", elapsed, provider=provider)
+        if elapsed > 0:
+            metrics.set_gauge("telemetry_ingest_rate_eps", count / elapsed, provider=provider)
+        self.logger.info(f"Ingested {count} events in {elapsed * 1000:.1f}ms")
+
+    async def emit_events(self, events: List[CloudEvent], provider: str) -> bool:
+        """Publish pushed events as one batch of ALERTs, as `poll_cloudtrail` does for polled ones.
+
+        Returns False if publishing or the audit write failed.
+        """
+        if not events:
+            return True
+        started = time.perf_counter()
+        published = await self.send_messages(self._build_alerts([event.to_dict() for event in events], provider=provider))
+        logged = await self.log_events(
+            "log_ingestion",
+            [{"event_id": e.event_id, "event_name": e.event_name, "source": provider} for e in events],
+        )
+        self._record_ingest(len(events), time.perf_counter() - started, provider=provider)
+        return published and logged
+
     async def poll_cloudtrail(self) -> Optional[ASOCMessage]:
         self.logger.info("Polling CloudTrail for new events...")
         try:
-            events = await self.provider.fetch_events(max_results=5)
+            events = await self.provider.fetch_events(max_results=10, incremental=True)
             if not events:
                 self.logger.info("No events returned from provider")
                 return None
 
-            for event in events:
-                message = ASOCMessage(
-                    message_type=MessageType.ALERT,
-                    source_agent=self.name,
-                    payload={"event": event.to_dict(), "provider": "aws_cloudtrail"},
-                    priority=Priority.MEDIUM,
-                )
-                await self.send_message(message)
-                await self.log_event(
-                    "log_ingestion",
-                    {"event_id": event.event_id, "event_name": event.event_name, "source": "cloudtrail"},
-                )
-                self.logger.info(f"Ingested event: {event.event_name} ({event.event_id})")
+            started = time.perf_counter()
+            event_dicts = [event.to_dict() for event in events]
+            published = await self.send_messages(self._build_alerts(event_dicts))
+            logged = await self.log_events(
+                "log_ingestion",
+                [{"event_id": e.event_id, "event_name": e.event_name, "source": "cloudtrail"} for e in events],
+            )
+            if published and logged:
+                await self.provider.commit_cursor()
+            else:
+                # Leave the watermark where it was: the next poll re-reads
+                # these events rather than losing them.
+                self.logger.warning("cursor_not_committed", events=len(events), published=published, logged=logged)
+            self._record_ingest(len(events), time.perf_counter() - started)
 
             return ASOCMessage(
                 message_type=MessageType.ALERT,
                 source_agent=self.name,
-                payload={"events": [e.to_dict() for e in events], "provider": "aws_cloudtrail"},
+                payload={"events": event_dicts, "provider": "aws_cloudtrail"},
                 priority=Priority.MEDIUM,
             )
         except Exception as e:
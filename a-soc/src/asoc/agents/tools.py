@@ -1,8 +1,10 @@
 import abc
+import asyncio
+import inspect
 import json
 import logging
 from dataclasses import dataclass, field
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 logger = logging.getLogger("asoc.agents.tools")
 
@@ -16,6 +18,88 @@ class ToolDefinition:
     output_schema: Dict[str, Any] = field(default_factory=dict)
     is_high_risk: bool = False
     requires_authorization: bool = False
+    validate: Callable[[Dict[str, Any]], None] = field(default=lambda kwargs: None, repr=False, compare=False)
+
+
+class ToolArgumentError(ValueError):
+    """A tool was called with arguments its schema or signature does not accept."""
+
+
+# JSON Schema types and the Python types that satisfy them. bool is an int
+# subclass, so it is rejected explicitly where a number is expected.
+_SCHEMA_TYPES: Dict[str, Tuple[Tuple[type, ...], bool]] = {
+    "string": ((str,), True),
+    "integer": ((int,), False),
+    "number": ((int, float), False),
+    "boolean": ((bool,), True),
+    "object": ((dict,), True),
+    "array": ((list, tuple), True),
+}
+
+
+def compile_validator(name: str, func: Callable, input_schema: Dict[str, Any]) -> Callable[[Dict[str, Any]], None]:
+    """Build the argument check for a tool once, from its schema and signature.
+
+    Required and accepted argument names come from `func`'s signature; types
+    come from `input_schema`. `None` is accepted for any typed argument, as
+    the tools treat it as "not given".
+    """
+    required: frozenset = frozenset()
+    accepted: Optional[frozenset] = None
+    try:
+        params = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        params = None
+    if params is not None and not any(p.kind is p.VAR_KEYWORD for p in params):
+        named = [p for p in params if p.kind in (p.POSITIONAL_OR_KEYWORD, p.KEYWORD_ONLY)]
+        accepted = frozenset(p.name for p in named)
+        required = frozenset(p.name for p in named if p.default is p.empty)
+    checks = tuple(
+        (arg, *_SCHEMA_TYPES[spec["type"]])
+        for arg, spec in input_schema.items()
+        if isinstance(spec, dict) and spec.get("type") in _SCHEMA_TYPES
+    )
+
+    def validate(kwargs: Dict[str, Any]) -> None:
+        if required and not required <= kwargs.keys():
+            raise ToolArgumentError(f"Tool '{name}' missing argument(s) {sorted(required - kwargs.keys())}")
+        if accepted is not None and not kwargs.keys() <= accepted:
+            raise ToolArgumentError(f"Tool '{name}' got unexpected argument(s) {sorted(kwargs.keys() - accepted)}")
+        for arg, types, allow_bool in checks:
+            value = kwargs.get(arg)
+            if value is None:
+                continue
+            if not isinstance(value, types) or (not allow_bool and isinstance(value, bool)):
+                raise ToolArgumentError(f"Tool '{name}' argument '{arg}' must be {input_schema[arg]['type']}, got {type(value).__name__}")
+
+    return validate
+
+
+@dataclass(frozen=True)
+class Ref:
+    """A plan argument filled from another node's result, optionally transformed."""
+
+    node: str
+    transform: Optional[Callable[[Any], Any]] = None
+
+    def resolve(self, results: Dict[str, Any]) -> Any:
+        value = results[self.node]
+        return self.transform(value) if self.transform else value
+
+
+@dataclass
+class PlanStep:
+    """One tool call in a plan. It runs once every `Ref` argument and `after` node has finished."""
+
+    tool: str
+    args: Dict[str, Any] = field(default_factory=dict)
+    after: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+
+    @property
+    def depends_on(self) -> Tuple[str, ...]:
+        refs = tuple(v.node for v in self.args.values() if isinstance(v, Ref))
+        return tuple(dict.fromkeys(self.after + refs))
 
 
 class ToolRegistry:
@@ -40,6 +124,7 @@ class ToolRegistry:
             output_schema=output_schema or {},
             is_high_risk=is_high_risk,
             requires_authorization=requires_authorization,
+            validate=compile_validator(name, func, input_schema or {}),
         )
         logger.debug("tool_registered", extra={"tool": name, "high_risk": is_high_risk})
 
@@ -56,10 +141,63 @@ class ToolRegistry:
         tool = self._tools.get(tool_name)
         if tool is None:
             raise ValueError(f"Tool '{tool_name}' not registered")
-        logger.info("tool_executing", extra={"tool": tool_name, "args": list(kwargs.keys())})
-        result = await tool.func(**kwargs)
-        logger.info("tool_completed", extra={"tool": tool_name})
-        return result
+        tool.validate(kwargs)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("tool_executing", extra={"tool": tool_name, "arg_names": list(kwargs)})
+            result = await tool.func(**kwargs)
+            logger.info("tool_completed", extra={"tool": tool_name})
+            return result
+        return await tool.func(**kwargs)
+
+    async def execute_plan(self, plan: Dict[str, PlanStep], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Run a dependency graph of tool calls and return their results keyed by node.
+
+        Every node starts as soon as the nodes it depends on have finished, so
+        independent calls run concurrently and the plan takes as long as its
+        longest chain. `timeout` is the default per-node limit; a step's own
+        `timeout` overrides it. The first failure cancels the nodes still
+        running and is raised.
+        """
+        for name, step in plan.items():
+            missing = [dep for dep in step.depends_on if dep not in plan]
+            if missing:
+                raise ValueError(f"Plan node '{name}' depends on unknown node(s) {missing}")
+        self._check_acyclic(plan)
+
+        results: Dict[str, Any] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run(name: str, step: PlanStep) -> Any:
+            if step.depends_on:
+                await asyncio.gather(*(tasks[dep] for dep in step.depends_on))
+            args = {k: v.resolve(results) if isinstance(v, Ref) else v for k, v in step.args.items()}
+            limit = step.timeout if step.timeout is not None else timeout
+            call = self.execute(step.tool, **args)
+            results[name] = await (asyncio.wait_for(call, limit) if limit else call)
+            return results[name]
+
+        for name, step in plan.items():
+            tasks[name] = asyncio.ensure_future(run(name, step))
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        return {name: results[name] for name in plan}
+
+    @staticmethod
+    def _check_acyclic(plan: Dict[str, PlanStep]) -> None:
+        remaining = {name: set(step.depends_on) for name, step in plan.items()}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Plan has a dependency cycle among {sorted(remaining)}")
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
 
     def get_langchain_tools(self) -> List[Any]:
         from langchain_core.tools import StructuredTool
@@ -0,0 +1,285 @@
+"""Learned first-stage triage between the prefilter and the LLM.
+
+The prefilter (agents/prefilter.py) decides the events a fixed rule can be
+sure about. What it leaves as `needs_llm` is scored here by a logistic
+regression over hashed categorical features of the event (name, verb,
+service, region, identity type, error, user agent, source address kind,
+risk category) and the event's behaviour-baseline z-scores. Past hashing
+the tokens, a batch is scored with one gather and one matrix product:
+about a millisecond per hundred events. Only the events the model is
+unsure about go on to the LLM.
+
+The model is trained offline from the event store: analyst labels
+(`alert_labelled` records) and the verdicts of earlier LLM and prefilter
+decisions (`threat_detected` records). Verdicts the model itself made are
+never trained on. Each training run writes a new numbered version,
+`triage-model-NNNN.npz`, to the model directory, and agents load the
+latest on start.
+
+    python -m src.asoc.train_triage --dir data/triage_models
+"""
+
+import ipaddress
+import json
+import os
+import re
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.asoc.agents import risk_catalogue
+from src.asoc.agents.baseline import FEATURES as BASELINE_FEATURES
+from src.asoc.core.logging import get_logger
+
+logger = get_logger("asoc.agents.triage_model")
+
+# Bump when `event_tokens` or the dense features change, so that models
+# trained on the old features are not loaded.
+FEATURE_VERSION = 1
+BUCKETS = 1 << 14
+DENSE_FEATURES = ("zscore",) + BASELINE_FEATURES
+LABEL_EVENT = "alert_labelled"
+DETECTION_EVENT = "threat_detected"
+_FILE = re.compile(r"^triage-model-(\d+)\.npz$")
+_VERB = re.compile(r"^[A-Za-z][a-z]*")
+
+
+def _ip_kind(value: Optional[str]) -> str:
+    if not value:
+        return "none"
+    try:
+        address = ipaddress.ip_address(value)
+    except ValueError:
+        return "service" if "." in value else "other"
+    return "private" if address.is_private else "public"
+
+
+def event_tokens(event: Dict[str, Any]) -> List[str]:
+    """The categorical features of an event, always the same number of them."""
+    name = event.get("eventName") or event.get("EventName") or event.get("event_name") or ""
+    identity = event.get("userIdentity") or event.get("UserIdentity") or {}
+    identity_type = identity.get("type", "") if isinstance(identity, dict) else ""
+    agent = re.split(r"[/ (]", str(event.get("userAgent") or ""), maxsplit=1)[0].lower()[:32]
+    verb = _VERB.match(name)
+    return [
+        f"name={name}",
+        f"verb={verb.group(0) if verb else ''}",
+        f"source={event.get('eventSource', '')}",
+        f"region={event.get('awsRegion', '')}",
+        f"identity={identity_type}",
+        f"error={event.get('errorCode') or '-'}",
+        f"agent={agent}",
+        f"ip={_ip_kind(event.get('sourceIPAddress') or event.get('source_ip'))}",
+        f"category={risk_catalogue.category_for_event(name) or '-'}",
+        f"name|identity={name}|{identity_type}",
+    ]
+
+
+def featurize(
+    events: Sequence[Dict[str, Any]], baselines: Optional[Sequence[Optional[Dict[str, Any]]]] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Hashed token indices, shape (n, tokens), and dense baseline features, shape (n, 5)."""
+    index = np.array(
+        [[zlib.crc32(token.encode()) % BUCKETS for token in event_tokens(event)] for event in events], dtype=np.int64
+    ).reshape(len(events), -1)
+    dense = np.zeros((len(events), len(DENSE_FEATURES)), dtype=np.float32)
+    for row, baseline in enumerate(baselines or ()):
+        if baseline:
+            features = baseline.get("features") or {}
+            dense[row] = [baseline.get("zscore", 0.0)] + [features.get(name, 0.0) for name in BASELINE_FEATURES]
+    # z-scores are heavy-tailed; log1p keeps one huge one from dominating.
+    return index, np.log1p(np.clip(dense, 0.0, None))
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(x, -30.0, 30.0)))
+
+
+@dataclass
+class TriageModel:
+    weights: np.ndarray
+    dense_weights: np.ndarray
+    bias: float = 0.0
+    version: int = 0
+    trained_at: str = ""
+    metrics: Dict[str, float] = field(default_factory=dict)
+
+    def _logits(self, index: np.ndarray, dense: np.ndarray) -> np.ndarray:
+        return self.weights[index].sum(axis=1) + dense @ self.dense_weights + self.bias
+
+    def predict(
+        self, events: Sequence[Dict[str, Any]], baselines: Optional[Sequence[Optional[Dict[str, Any]]]] = None
+    ) -> np.ndarray:
+        """Probability that each event is a threat."""
+        if not events:
+            return np.zeros(0)
+        return _sigmoid(self._logits(*featurize(events, baselines)))
+
+    def save(self, directory: str) -> Path:
+        """Write this model as the next version in `directory`."""
+        target_dir = Path(directory)
+        target_dir.mkdir(parents=True, exist_ok=True)
+        self.version = max((v for v, _ in _versions(target_dir)), default=0) + 1
+        self.trained_at = self.trained_at or datetime.now(timezone.utc).isoformat()
+        meta = {
+            "version": self.version,
+            "feature_version": FEATURE_VERSION,
+            "trained_at": self.trained_at,
+            "metrics": self.metrics,
+        }
+        target = target_dir / f"triage-model-{self.version:04d}.npz"
+        tmp = target.with_suffix(".npz.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                weights=self.weights,
+                dense_weights=self.dense_weights,
+                bias=np.array(self.bias),
+                meta=np.array(json.dumps(meta)),
+            )
+        os.replace(tmp, target)
+        return target
+
+    @classmethod
+    def load(cls, path: str) -> Optional["TriageModel"]:
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(str(data["meta"]))
+                if meta.get("feature_version") != FEATURE_VERSION or data["weights"].shape != (BUCKETS,):
+                    logger.warning("triage_model_incompatible", path=str(path), feature_version=meta.get("feature_version"))
+                    return None
+                return cls(
+                    weights=data["weights"],
+                    dense_weights=data["dense_weights"],
+                    bias=float(data["bias"]),
+                    version=int(meta["version"]),
+                    trained_at=meta.get("trained_at", ""),
+                    metrics=meta.get("metrics", {}),
+                )
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning("triage_model_unreadable", path=str(path), error=str(e))
+            return None
+
+    @classmethod
+    def latest(cls, directory: str) -> Optional["TriageModel"]:
+        """The highest-numbered model in `directory` that loads, if any."""
+        for _, path in sorted(_versions(Path(directory)), reverse=True):
+            model = cls.load(str(path))
+            if model is not None:
+                return model
+        return None
+
+
+def _versions(directory: Path) -> List[Tuple[int, Path]]:
+    if not directory.is_dir():
+        return []
+    return [(int(m.group(1)), path) for path in directory.iterdir() if (m := _FILE.match(path.name))]
+
+
+def train(
+    events: Sequence[Dict[str, Any]],
+    labels: Sequence[bool],
+    baselines: Optional[Sequence[Optional[Dict[str, Any]]]] = None,
+    epochs: int = 200,
+    learning_rate: float = 0.5,
+    l2: float = 1e-4,
+) -> TriageModel:
+    """Fit a class-balanced logistic regression with Adagrad over full batches."""
+    y = np.asarray(labels, dtype=np.float64)
+    positives = int(y.sum())
+    if len(y) != len(events) or positives == 0 or positives == len(y):
+        raise ValueError("Training needs labelled examples of both classes")
+    index, dense = featurize(events, baselines)
+    n, tokens = index.shape
+    # Each class carries half the total weight, so a rare positive class
+    # is not drowned out by routine traffic.
+    sample = np.where(y == 1, n / (2 * positives), n / (2 * (n - positives))) / n
+    model = TriageModel(np.zeros(BUCKETS), np.zeros(len(DENSE_FEATURES)))
+    flat = index.ravel()
+    params = (model.weights, model.dense_weights)
+    history = [np.full(BUCKETS, 1e-8), np.full(len(DENSE_FEATURES), 1e-8), 1e-8]
+    for _ in range(epochs):
+        residual = sample * (_sigmoid(model._logits(index, dense)) - y)
+        grads = (
+            np.bincount(flat, weights=np.repeat(residual, tokens), minlength=BUCKETS) + l2 * model.weights,
+            dense.T @ residual + l2 * model.dense_weights,
+        )
+        for i, (param, grad) in enumerate(zip(params, grads)):
+            history[i] += grad * grad
+            param -= learning_rate * grad / np.sqrt(history[i])
+        grad_bias = residual.sum()
+        history[2] += grad_bias * grad_bias
+        model.bias -= learning_rate * grad_bias / np.sqrt(history[2])
+
+    p = np.clip(_sigmoid(model._logits(index, dense)), 1e-7, 1 - 1e-7)
+    model.metrics = {
+        "examples": n,
+        "positives": positives,
+        "log_loss": round(float(-(y * np.log(p) + (1 - y) * np.log(1 - p)).mean()), 4),
+        "accuracy": round(float(((p >= 0.5) == (y == 1)).mean()), 4),
+    }
+    return model
+
+
+def examples_from_records(
+    records: Sequence[Dict[str, Any]],
+) -> Tuple[List[Dict[str, Any]], List[bool], List[Optional[Dict[str, Any]]]]:
+    """Training examples from event store records.
+
+    An analyst label overrides any automated verdict for the same event
+    (matched on `eventID`). Verdicts made by the triage model are skipped,
+    so the model never learns from its own output, and so are the mock
+    heuristics (`mock`, `fallback`) that stand in for the LLM. A payload may be a JSON
+    string, as `PostgresEventStore` can return it.
+    """
+    examples: Dict[Any, Tuple[Dict[str, Any], bool, Optional[Dict[str, Any]], bool]] = {}
+    for n, record in enumerate(records):
+        payload = record.get("payload") or {}
+        if isinstance(payload, str):
+            try:
+                payload = json.loads(payload)
+            except ValueError:
+                continue
+        if not isinstance(payload, dict):
+            continue
+        event = payload.get("event")
+        if not isinstance(event, dict):
+            continue
+        if record.get("type") == LABEL_EVENT:
+            label, analyst = bool(payload.get("malicious")), True
+        elif record.get("type") == DETECTION_EVENT and payload.get("decided_by") in ("llm", "prefilter"):
+            label, analyst = bool(payload.get("threat_detected")), False
+        else:
+            continue
+        key = event.get("eventID") or ("record", n)
+        if key in examples and examples[key][3] and not analyst:
+            continue
+        examples[key] = (event, label, payload.get("baseline"), analyst)
+    values = list(examples.values())
+    return [v[0] for v in values], [v[1] for v in values], [v[2] for v in values]
+
+
+async def load_records(store: Any, limit: int = 100_000, page_size: int = 1000) -> List[Dict[str, Any]]:
+    """Labelled and decided detections from an `EventStore` or `PostgresEventStore`."""
+    records: List[Dict[str, Any]] = []
+    for event_type in (DETECTION_EVENT, LABEL_EVENT):
+        offset = 0
+        while offset < limit:
+            page = await store.search_events(event_type=event_type, limit=min(page_size, limit - offset), offset=offset)
+            records.extend(r for r in page["events"] if r.get("type") == event_type)
+            offset += len(page["events"])
+            if not page["events"] or offset >= page["total"]:
+                break
+    # Labels come last so they override verdicts for the same event.
+    return records
+
+
+async def record_label(
+    store: Any, event: Dict[str, Any], malicious: bool, baseline: Optional[Dict[str, Any]] = None, agent: str = "Analyst"
+) -> Dict[str, Any]:
+    """Store an analyst's verdict on an event for the next training run."""
+    return await store.append_event(LABEL_EVENT, {"event": event, "malicious": malicious, "baseline": baseline}, agent)
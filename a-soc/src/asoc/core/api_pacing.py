@@ -0,0 +1,179 @@
+"""Adaptive client-side pacing for rate-limited cloud APIs.
+
+Cloud audit APIs enforce small per-account, per-region quotas (CloudTrail
+LookupEvents allows 2 requests/sec). `AdaptivePacer` paces calls with a
+`TokenBucket` at the configured quota and adjusts it AIMD-style:
+- A throttling response halves the refill rate and backs off with jitter.
+- Each success adds back a tenth of the quota, up to the quota ceiling.
+
+Callers therefore run close to the quota without throttling storms. All
+callers of one API in one account and region should share a pacer via
+`get_api_pacer`.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+from src.asoc.core.logging import get_logger
+from src.asoc.core.metrics import get_metrics
+from src.asoc.middleware.rate_limiter import TokenBucket
+
+logger = get_logger("asoc.api_pacing")
+
+THROTTLING_ERROR_CODES = frozenset(
+    {
+        "Throttling",
+        "ThrottlingException",
+        "ThrottledException",
+        "TooManyRequestsException",
+        "RequestLimitExceeded",
+        "RequestThrottled",
+        "SlowDown",
+        "429",
+    }
+)
+
+
+def is_throttling_error(exc: BaseException) -> bool:
+    """True for botocore ClientErrors (or lookalikes) carrying a throttling code."""
+    response = getattr(exc, "response", None)
+    if isinstance(response, dict):
+        code = response.get("Error", {}).get("Code", "")
+        status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        return code in THROTTLING_ERROR_CODES or status == 429
+    return False
+
+
+class AdaptivePacer:
+    """Thread-safe AIMD pacer for one API quota."""
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: int = 1,
+        min_rate: float = 0.1,
+        max_retries: int = 8,
+        max_backoff: float = 30.0,
+        window: float = 60.0,
+    ) -> None:
+        self.name = name
+        self.ceiling = rate
+        self.min_rate = min(min_rate, rate)
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.window = window
+        self.throttles = 0
+        self.calls = 0
+        self._bucket = TokenBucket(burst, rate)
+        self._lock = threading.Lock()
+        self._recent: Deque[float] = deque()
+
+    @property
+    def rate(self) -> float:
+        return self._bucket.refill_rate
+
+    def _try_acquire(self) -> float:
+        """Take a token, or return the seconds until one is available."""
+        with self._lock:
+            if self._bucket.consume():
+                now = time.monotonic()
+                self._recent.append(now)
+                while self._recent and self._recent[0] < now - self.window:
+                    self._recent.popleft()
+                self.calls += 1
+                return 0.0
+            return max(0.001, (1.0 - self._bucket.available) / self._bucket.refill_rate)
+
+    def acquire(self) -> None:
+        """Block the calling thread until a request may be sent."""
+        while (wait := self._try_acquire()) > 0:
+            time.sleep(wait)
+
+    def on_success(self) -> None:
+        with self._lock:
+            if self._bucket.refill_rate < self.ceiling:
+                self._bucket.refill_rate = min(self.ceiling, self._bucket.refill_rate + self.ceiling / 10)
+        self._publish()
+
+    def on_throttle(self, attempt: int) -> float:
+        """Record a throttle; return how long to back off before retrying."""
+        with self._lock:
+            self.throttles += 1
+            self._bucket.refill_rate = max(self.min_rate, self._bucket.refill_rate / 2)
+        get_metrics().inc_counter("api_pacer_throttles_total", api=self.name)
+        self._publish()
+        return min(self.max_backoff, (2**attempt) / self.ceiling) * random.uniform(0.5, 1.0)
+
+    def call(self, fn: Callable[[], Any]) -> Any:
+        """Run `fn` paced; retry throttling errors with backoff up to `max_retries`."""
+        attempt = 0
+        while True:
+            self.acquire()
+            try:
+                result = fn()
+            except Exception as e:
+                if not is_throttling_error(e) or attempt >= self.max_retries:
+                    raise
+                delay = self.on_throttle(attempt)
+                logger.warning("api_throttled", api=self.name, attempt=attempt + 1, backoff=round(delay, 3), rate=self.rate)
+                attempt += 1
+                time.sleep(delay)
+                continue
+            self.on_success()
+            return result
+
+    def stats(self) -> Dict[str, float]:
+        """Achieved vs allowed throughput over the trailing window."""
+        with self._lock:
+            now = time.monotonic()
+            while self._recent and self._recent[0] < now - self.window:
+                self._recent.popleft()
+            span = min(self.window, now - self._recent[0]) if self._recent else 0.0
+            achieved = len(self._recent) / span if span > 0 else 0.0
+            return {
+                "allowed_rps": self.ceiling,
+                "current_rps": self._bucket.refill_rate,
+                "achieved_rps": achieved,
+                "utilisation": achieved / self.ceiling if self.ceiling else 0.0,
+                "calls": float(self.calls),
+                "throttles": float(self.throttles),
+            }
+
+    def _publish(self) -> None:
+        stats = self.stats()
+        metrics = get_metrics()
+        metrics.set_gauge("api_pacer_allowed_rps", stats["allowed_rps"], api=self.name)
+        metrics.set_gauge("api_pacer_current_rps", stats["current_rps"], api=self.name)
+        metrics.set_gauge("api_pacer_achieved_rps", stats["achieved_rps"], api=self.name)
+
+
+_pacers: Dict[str, AdaptivePacer] = {}
+_pacers_lock = threading.Lock()
+
+
+def get_api_pacer(name: str, rate: float, burst: int = 1) -> AdaptivePacer:
+    """Return the process-wide pacer for `name`, creating it on first use."""
+    with _pacers_lock:
+        pacer = _pacers.get(name)
+        if pacer is None:
+            pacer = _pacers[name] = AdaptivePacer(name, rate, burst)
+        return pacer
+
+
+def all_pacer_stats() -> Dict[str, Dict[str, float]]:
+    with _pacers_lock:
+        pacers = list(_pacers.values())
+    return {p.name: p.stats() for p in pacers}
+
+
+def reset_api_pacers(name: Optional[str] = None) -> None:
+    """Drop registered pacers (all, or one by name). Intended for tests."""
+    with _pacers_lock:
+        if name is None:
+            _pacers.clear()
+        else:
+            _pacers.pop(name, None)
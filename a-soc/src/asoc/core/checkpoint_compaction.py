@@ -0,0 +1,251 @@
+"""Checkpoint compaction for finished LangGraph threads.
+
+Every super-step of an incident workflow writes a checkpoint, and nothing
+ever removes them. The compactor keeps the newest K checkpoints per thread
+(K=1 keeps only the final state) and deletes the intermediate ones in small
+batched transactions so it can run online next to live workflows.
+
+Threads are only compacted once they have been idle for the namespace's
+grace period; the newest checkpoint is never deleted, so paused (HITL)
+threads stay resumable.
+"""
+
+import abc
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from src.asoc.core.config import settings
+from src.asoc.core.logging import get_logger
+
+logger = get_logger("asoc.checkpoint.compaction")
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """Retention rules for one checkpoint namespace."""
+
+    namespace: str
+    keep_last: int = 1
+    idle_seconds: float = 3600.0
+
+    def __post_init__(self) -> None:
+        if self.keep_last < 1:
+            raise ValueError("keep_last must be >= 1; the final checkpoint is always retained")
+
+
+def default_retention_policies() -> Dict[str, RetentionPolicy]:
+    """Per-namespace policies for the namespaces used by CheckpointConfig."""
+    return {
+        "a-soc-incidents": RetentionPolicy(
+            namespace="a-soc-incidents",
+            keep_last=settings.CHECKPOINT_KEEP_LAST_INCIDENTS,
+            idle_seconds=settings.CHECKPOINT_COMPACTION_IDLE_SECONDS,
+        ),
+        "a-soc-agents": RetentionPolicy(
+            namespace="a-soc-agents",
+            keep_last=settings.CHECKPOINT_KEEP_LAST_AGENTS,
+            idle_seconds=settings.CHECKPOINT_COMPACTION_IDLE_SECONDS,
+        ),
+    }
+
+
+@dataclass
+class CompactionStats:
+    """Outcome of a single compaction pass."""
+
+    threads_scanned: int = 0
+    threads_compacted: int = 0
+    checkpoints_deleted: int = 0
+    batches: int = 0
+    by_namespace: Dict[str, int] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {
+            "threads_scanned": self.threads_scanned,
+            "threads_compacted": self.threads_compacted,
+            "checkpoints_deleted": self.checkpoints_deleted,
+            "batches": self.batches,
+            "by_namespace": dict(self.by_namespace),
+        }
+
+
+class CheckpointStore(abc.ABC):
+    """Storage operations the compactor needs from a checkpoint backend."""
+
+    @abc.abstractmethod
+    async def list_compactable_threads(
+        self, namespace: str, keep_last: int, idle_before: datetime, limit: int
+    ) -> List[str]:
+        """Return thread ids idle since `idle_before` holding more than `keep_last` checkpoints."""
+        ...
+
+    @abc.abstractmethod
+    async def delete_intermediate(self, thread_id: str, namespace: str, keep_last: int, batch_size: int) -> int:
+        """Delete up to `batch_size` of the oldest checkpoints beyond the newest `keep_last`
+        in one transaction. Returns the number of checkpoints deleted."""
+        ...
+
+
+class PostgresCheckpointStore(CheckpointStore):
+    """Compaction queries against the AsyncPostgresSaver schema."""
+
+    def __init__(self, pool=None) -> None:
+        self._pool = pool
+
+    async def _get_pool(self):
+        if self._pool is None:
+            from src.asoc.core.connection import get_db_pool
+
+            self._pool = (await get_db_pool()).pool
+        return self._pool
+
+    async def list_compactable_threads(
+        self, namespace: str, keep_last: int, idle_before: datetime, limit: int
+    ) -> List[str]:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(
+                """
+                SELECT thread_id
+                FROM checkpoints
+                WHERE checkpoint_ns = $1
+                GROUP BY thread_id
+                HAVING COUNT(*) > $2 AND MAX((checkpoint->>'ts')::timestamptz) < $3
+                LIMIT $4
+                """,
+                namespace,
+                keep_last,
+                idle_before,
+                limit,
+            )
+        return [r["thread_id"] for r in rows]
+
+    async def delete_intermediate(self, thread_id: str, namespace: str, keep_last: int, batch_size: int) -> int:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                deleted = await conn.fetch(
+                    """
+                    WITH doomed AS (
+                        SELECT checkpoint_id FROM checkpoints
+                        WHERE thread_id = $1 AND checkpoint_ns = $2
+                        ORDER BY checkpoint_id DESC
+                        OFFSET $3 LIMIT $4
+                    )
+                    DELETE FROM checkpoints c
+                    USING doomed d
+                    WHERE c.thread_id = $1 AND c.checkpoint_ns = $2 AND c.checkpoint_id = d.checkpoint_id
+                    RETURNING c.checkpoint_id
+                    """,
+                    thread_id,
+                    namespace,
+                    keep_last,
+                    batch_size,
+                )
+                if not deleted:
+                    return 0
+                ids = [r["checkpoint_id"] for r in deleted]
+                await conn.execute(
+                    "DELETE FROM checkpoint_writes WHERE thread_id = $1 AND checkpoint_ns = $2 AND checkpoint_id = ANY($3::text[])",
+                    thread_id,
+                    namespace,
+                    ids,
+                )
+                await conn.execute(
+                    """
+                    DELETE FROM checkpoint_blobs b
+                    WHERE b.thread_id = $1 AND b.checkpoint_ns = $2
+                    AND NOT EXISTS (
+                        SELECT 1 FROM checkpoints c
+                        WHERE c.thread_id = b.thread_id AND c.checkpoint_ns = b.checkpoint_ns
+                        AND c.checkpoint->'channel_versions'->>b.channel = b.version
+                    )
+                    """,
+                    thread_id,
+                    namespace,
+                )
+        return len(ids)
+
+
+class CheckpointCompactor:
+    """Applies retention policies to a checkpoint store with bounded I/O.
+
+    Each pass touches at most `max_threads_per_pass` threads per namespace and
+    deletes at most `batch_size` checkpoints per transaction, sleeping
+    `pause_seconds` between batches so foreground writes are not starved.
+    """
+
+    def __init__(
+        self,
+        store: CheckpointStore,
+        policies: Optional[Dict[str, RetentionPolicy]] = None,
+        batch_size: int = 500,
+        max_threads_per_pass: int = 100,
+        pause_seconds: float = 0.05,
+    ) -> None:
+        self._store = store
+        self._policies = policies if policies is not None else default_retention_policies()
+        self._batch_size = batch_size
+        self._max_threads = max_threads_per_pass
+        self._pause = pause_seconds
+
+    @property
+    def policies(self) -> Dict[str, RetentionPolicy]:
+        return dict(self._policies)
+
+    async def compact_namespace(self, policy: RetentionPolicy, now: Optional[datetime] = None) -> CompactionStats:
+        stats = CompactionStats()
+        now = now or datetime.now(timezone.utc)
+        idle_before = now - timedelta(seconds=policy.idle_seconds)
+        threads = await self._store.list_compactable_threads(
+            policy.namespace, policy.keep_last, idle_before, self._max_threads
+        )
+        stats.threads_scanned = len(threads)
+        for thread_id in threads:
+            thread_deleted = 0
+            while True:
+                deleted = await self._store.delete_intermediate(
+                    thread_id, policy.namespace, policy.keep_last, self._batch_size
+                )
+                if deleted:
+                    stats.batches += 1
+                    thread_deleted += deleted
+                if deleted < self._batch_size:
+                    break
+                await asyncio.sleep(self._pause)
+            if thread_deleted:
+                stats.threads_compacted += 1
+                stats.checkpoints_deleted += thread_deleted
+            if self._pause:
+                await asyncio.sleep(self._pause)
+        stats.by_namespace[policy.namespace] = stats.checkpoints_deleted
+        return stats
+
+    async def run_once(self, now: Optional[datetime] = None) -> CompactionStats:
+        """Run one compaction pass over every configured namespace."""
+        total = CompactionStats()
+        for policy in self._policies.values():
+            try:
+                ns_stats = await self.compact_namespace(policy, now=now)
+            except Exception as e:
+                logger.error("checkpoint_compaction_failed", namespace=policy.namespace, error=str(e))
+                continue
+            total.threads_scanned += ns_stats.threads_scanned
+            total.threads_compacted += ns_stats.threads_compacted
+            total.checkpoints_deleted += ns_stats.checkpoints_deleted
+            total.batches += ns_stats.batches
+            total.by_namespace.update(ns_stats.by_namespace)
+        logger.info("checkpoint_compaction_complete", **total.to_dict())
+        return total
+
+    async def run_forever(self, interval_seconds: float, stop: Optional[asyncio.Event] = None) -> None:
+        """Run compaction passes every `interval_seconds` until `stop` is set."""
+        stop = stop or asyncio.Event()
+        while not stop.is_set():
+            await self.run_once()
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=interval_seconds)
+            except asyncio.TimeoutError:
+                pass
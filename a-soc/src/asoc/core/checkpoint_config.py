@@ -12,30 +12,51 @@ _checkpointer_instance = None
 
 
 async def create_checkpointer():
-    """Create PostgreSQL-backed checkpointer for durable agent memory.
+    """Create the checkpointer selected by CHECKPOINT_BACKEND.
 
-    Uses AsyncPostgresSaver for non-blocking checkpoint operations.
-    Falls back to in-memory MemorySaver if PostgreSQL is unavailable.
+    "postgres" uses AsyncPostgresSaver for non-blocking durable checkpoints,
+    "sqlite" uses a local WAL-mode SQLiteCheckpointSaver for single-node and
+    edge installs, and "memory" uses MemorySaver. If PostgreSQL is
+    unavailable, falls back to CHECKPOINT_FALLBACK (in-memory by default).
     Every agent run is resumable from last checkpoint.
     """
     global _checkpointer_instance
     if _checkpointer_instance is not None:
         return _checkpointer_instance
 
-    try:
-        from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+    backend = settings.CHECKPOINT_BACKEND
+    if backend == "postgres":
+        try:
+            from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+
+            saver = AsyncPostgresSaver.from_conn_string(settings.DATABASE_URL)
+            await saver.setup()
+            _checkpointer_instance = saver
+            logger.info("postgresql_checkpointer_initialized", database=settings.DATABASE_URL.split("@")[-1] if "@" in settings.DATABASE_URL else "configured")
+            return saver
+        except Exception as e:
+            logger.warning("postgresql_checkpointer_unavailable", error=str(e), fallback=settings.CHECKPOINT_FALLBACK)
+            backend = settings.CHECKPOINT_FALLBACK
+
+    _checkpointer_instance = _create_local_checkpointer(backend)
+    return _checkpointer_instance
+
 
-        saver = AsyncPostgresSaver.from_conn_string(settings.DATABASE_URL)
-        await saver.setup()
-        _checkpointer_instance = saver
-        logger.info("postgresql_checkpointer_initialized", database=settings.DATABASE_URL.split("@")[-1] if "@" in settings.DATABASE_URL else "configured")
+def _create_local_checkpointer(backend: str):
+    if backend == "sqlite":
+        from src.asoc.core.sqlite_checkpoint import SQLiteCheckpointSaver
+
+        saver = SQLiteCheckpointSaver(
+            path=settings.CHECKPOINT_SQLITE_PATH,
+            batch_size=settings.CHECKPOINT_SQLITE_BATCH_SIZE,
+            flush_interval=settings.CHECKPOINT_SQLITE_FLUSH_INTERVAL,
+        )
+        saver.setup()
         return saver
-    except Exception as e:
-        logger.warning("postgresql_checkpointer_unavailable", error=str(e), fallback="memory")
-        from langgraph.checkpoint.memory import MemorySaver
 
-        _checkpointer_instance = MemorySaver()
-        return _checkpointer_instance
+    from langgraph.checkpoint.memory import MemorySaver
+
+    return MemorySaver()
 
 
 def get_checkpointer():
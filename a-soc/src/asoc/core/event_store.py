@@ -215,6 +215,37 @@ class PostgresEventStore:
             "signature": signature,
         }
 
+    async def append_events(self, event_type: str, payloads: List[Dict[str, Any]], agent: str) -> List[Dict[str, Any]]:
+        """Persist several events of one type with a single batched INSERT."""
+        if not payloads:
+            return []
+        now = datetime.now(timezone.utc)
+        trace_id, incident_id = get_trace_id(), get_incident_id()
+        records = [
+            {
+                "id": str(uuid.uuid4()),
+                "timestamp": now.isoformat(),
+                "type": event_type,
+                "agent": agent,
+                "payload": payload,
+                "signature": self._sign_payload(payload),
+            }
+            for payload in payloads
+        ]
+        pool = await get_db_pool()
+        async with pool.pool.acquire() as conn:
+            await conn.executemany(
+                """
+                INSERT INTO events (id, timestamp, event_type, agent, payload, signature, trace_id, incident_id)
+                VALUES ($1, $2, $3, $4, $5::jsonb, $6, $7, $8)
+                """,
+                [
+                    (r["id"], now, event_type, agent, json.dumps(r["payload"]), r["signature"], trace_id, incident_id)
+                    for r in records
+                ],
+            )
+        return records
+
     async def get_recent_events(self, limit: int = 50) -> List[Dict[str, Any]]:
         pool = await get_db_pool()
         async with pool.pool.acquire() as conn:
@@ -37,20 +37,41 @@ class MessageBus:
             await self._redis.close()
         logger.info("message_bus_disconnected")
 
-    async def publish(self, topic: str, message: Dict[str, Any]) -> str:
-        if self._redis is None:
-            await self.connect()
-        msg_id = str(uuid.uuid4())
-        payload = {
-            "id": msg_id,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+    @staticmethod
+    def _envelope(topic: str, message: Dict[str, Any], timestamp: str) -> Dict[str, str]:
+        return {
+            "id": str(uuid.uuid4()),
+            "timestamp": timestamp,
             "topic": topic,
             "data": json.dumps(message, default=str),
         }
+
+    async def publish(self, topic: str, message: Dict[str, Any]) -> str:
+        if self._redis is None:
+            await self.connect()
+        payload = self._envelope(topic, message, datetime.now(timezone.utc).isoformat())
         stream = f"{STREAM_PREFIX}{topic}"
         await self._redis.xadd(stream, payload, maxlen=MAXLEN)
-        logger.debug("message_published", topic=topic, msg_id=msg_id)
-        return msg_id
+        logger.debug("message_published", topic=topic, msg_id=payload["id"])
+        return payload["id"]
+
+    async def publish_batch(self, topic: str, messages: List[Dict[str, Any]]) -> List[str]:
+        """Publish several messages to one topic in a single pipelined round trip."""
+        if not messages:
+            return []
+        if self._redis is None:
+            await self.connect()
+        timestamp = datetime.now(timezone.utc).isoformat()
+        stream = f"{STREAM_PREFIX}{topic}"
+        ids = []
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for message in messages:
+                payload = self._envelope(topic, message, timestamp)
+                pipe.xadd(stream, payload, maxlen=MAXLEN)
+                ids.append(payload["id"])
+            await pipe.execute()
+        logger.debug("messages_published", topic=topic, count=len(ids))
+        return ids
 
     async def subscribe(self, topic: str, handler: Callable, batch_size: int = 10) -> None:
         if self._redis is None:
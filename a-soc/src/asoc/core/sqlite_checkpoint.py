@@ -0,0 +1,417 @@
+"""SQLite-backed LangGraph checkpointer for single-node and edge deployments.
+
+Uses a WAL-mode database file so readers never block the writer, and
+group-commits checkpoint writes: puts are buffered and flushed in one
+transaction when `batch_size` rows are pending or every `flush_interval`
+seconds, whichever comes first. Reads flush first, so a thread always sees
+its own writes. A crash can lose at most one flush interval of checkpoints;
+set `flush_interval=0` to commit on every put.
+"""
+
+import asyncio
+import json
+import random
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_metadata,
+)
+
+from src.asoc.core.checkpoint_compaction import CheckpointStore
+from src.asoc.core.logging import get_logger
+
+logger = get_logger("asoc.checkpoint.sqlite")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    ts TEXT NOT NULL DEFAULT '',
+    type TEXT,
+    checkpoint BLOB,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS checkpoint_writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    task_path TEXT NOT NULL DEFAULT '',
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE INDEX IF NOT EXISTS idx_checkpoints_ns_ts ON checkpoints(checkpoint_ns, ts);
+"""
+
+_INSERT_CHECKPOINT = (
+    "INSERT OR REPLACE INTO checkpoints "
+    "(thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, ts, type, checkpoint, metadata) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_UPSERT_WRITE = (
+    "INSERT OR REPLACE INTO checkpoint_writes "
+    "(thread_id, checkpoint_ns, checkpoint_id, task_id, task_path, idx, channel, type, value) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_INSERT_WRITE = _UPSERT_WRITE.replace("INSERT OR REPLACE", "INSERT OR IGNORE")
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver):
+    """Durable local checkpointer with WAL journaling and batched commits."""
+
+    def __init__(
+        self,
+        path: str = "data/checkpoints.db",
+        batch_size: int = 64,
+        flush_interval: float = 0.05,
+        serde=None,
+    ) -> None:
+        super().__init__(serde=serde)
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._pending: List[Tuple[str, tuple]] = []
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self.flushes = 0
+        self.rows_written = 0
+
+    def setup(self) -> None:
+        if self._conn is not None:
+            return
+        with self._lock:
+            if self._conn is not None:
+                return
+            if self.path != ":memory:":
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        if self.flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, name="sqlite-checkpoint-flusher", daemon=True)
+            self._flusher.start()
+        logger.info("sqlite_checkpointer_initialized", path=self.path, batch_size=self.batch_size)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=5)
+            self._flusher = None
+        with self._lock:
+            if self._conn is not None:
+                self._flush_locked()
+                self._conn.close()
+                self._conn = None
+
+    # ── write path ───────────────────────────────────────────────────────
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("sqlite_checkpoint_flush_failed", error=str(e))
+
+    def flush(self) -> int:
+        """Commit all buffered rows in a single transaction."""
+        with self._lock:
+            return self._flush_locked()
+
+    def _flush_locked(self) -> int:
+        if not self._pending or self._conn is None:
+            return 0
+        pending, self._pending = self._pending, []
+        cur = self._conn.cursor()
+        try:
+            cur.execute("BEGIN")
+            start = 0
+            while start < len(pending):
+                sql = pending[start][0]
+                end = start
+                while end < len(pending) and pending[end][0] == sql:
+                    end += 1
+                cur.executemany(sql, [params for _, params in pending[start:end]])
+                start = end
+            cur.execute("COMMIT")
+        except Exception:
+            cur.execute("ROLLBACK")
+            self._pending = pending + self._pending
+            raise
+        finally:
+            cur.close()
+        self.flushes += 1
+        self.rows_written += len(pending)
+        return len(pending)
+
+    def _enqueue(self, rows: List[Tuple[str, tuple]]) -> None:
+        self.setup()
+        with self._lock:
+            self._pending.extend(rows)
+            if self.flush_interval <= 0 or len(self._pending) >= self.batch_size:
+                self._flush_locked()
+
+    def put(
+        self,
+        config: Dict[str, Any],
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> Dict[str, Any]:
+        configurable = config["configurable"]
+        thread_id = str(configurable["thread_id"])
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        type_, blob = self.serde.dumps_typed(checkpoint)
+        meta = json.dumps(get_checkpoint_metadata(config, metadata), ensure_ascii=False, default=str).encode()
+        self._enqueue(
+            [
+                (
+                    _INSERT_CHECKPOINT,
+                    (
+                        thread_id,
+                        checkpoint_ns,
+                        checkpoint["id"],
+                        configurable.get("checkpoint_id"),
+                        checkpoint.get("ts", ""),
+                        type_,
+                        blob,
+                        meta,
+                    ),
+                )
+            ]
+        )
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(
+        self, config: Dict[str, Any], writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str = ""
+    ) -> None:
+        configurable = config["configurable"]
+        sql = _UPSERT_WRITE if all(channel in WRITES_IDX_MAP for channel, _ in writes) else _INSERT_WRITE
+        self._enqueue(
+            [
+                (
+                    sql,
+                    (
+                        str(configurable["thread_id"]),
+                        configurable.get("checkpoint_ns", ""),
+                        str(configurable["checkpoint_id"]),
+                        task_id,
+                        task_path,
+                        WRITES_IDX_MAP.get(channel, idx),
+                        channel,
+                        *self.serde.dumps_typed(value),
+                    ),
+                )
+                for idx, (channel, value) in enumerate(writes)
+            ]
+        )
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.setup()
+        with self._lock:
+            self._flush_locked()
+            self._conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (str(thread_id),))
+            self._conn.execute("DELETE FROM checkpoint_writes WHERE thread_id = ?", (str(thread_id),))
+
+    # ── read path ────────────────────────────────────────────────────────
+
+    def _row_to_tuple(self, row: tuple) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, blob, meta = row
+        writes = self._conn.execute(
+            "SELECT task_id, channel, type, value FROM checkpoint_writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}},
+            checkpoint=self.serde.loads_typed((type_, blob)),
+            metadata=json.loads(meta) if meta else {},
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_id}}
+                if parent_id
+                else None
+            ),
+            pending_writes=[(task_id, channel, self.serde.loads_typed((wtype, value))) for task_id, channel, wtype, value in writes],
+        )
+
+    def get_tuple(self, config: Dict[str, Any]) -> Optional[CheckpointTuple]:
+        self.setup()
+        configurable = config["configurable"]
+        thread_id = str(configurable["thread_id"])
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        checkpoint_id = configurable.get("checkpoint_id")
+        columns = "thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata"
+        with self._lock:
+            self._flush_locked()
+            if checkpoint_id:
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            return self._row_to_tuple(row) if row else None
+
+    def list(
+        self,
+        config: Optional[Dict[str, Any]],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        self.setup()
+        conditions: List[str] = []
+        params: List[Any] = []
+        if config:
+            configurable = config["configurable"]
+            conditions.append("thread_id = ?")
+            params.append(str(configurable["thread_id"]))
+            if configurable.get("checkpoint_ns") is not None:
+                conditions.append("checkpoint_ns = ?")
+                params.append(configurable["checkpoint_ns"])
+            if configurable.get("checkpoint_id"):
+                conditions.append("checkpoint_id = ?")
+                params.append(configurable["checkpoint_id"])
+        if before and before.get("configurable", {}).get("checkpoint_id"):
+            conditions.append("checkpoint_id < ?")
+            params.append(before["configurable"]["checkpoint_id"])
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        with self._lock:
+            self._flush_locked()
+            rows = self._conn.execute(
+                "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata "
+                f"FROM checkpoints{where} ORDER BY checkpoint_id DESC",
+                params,
+            ).fetchall()
+            results = []
+            for row in rows:
+                if filter:
+                    meta = json.loads(row[6]) if row[6] else {}
+                    if any(meta.get(k) != v for k, v in filter.items()):
+                        continue
+                results.append(self._row_to_tuple(row))
+                if limit is not None and len(results) >= limit:
+                    break
+        yield from results
+
+    def get_next_version(self, current: Optional[str], channel: None = None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # ── async API ────────────────────────────────────────────────────────
+
+    async def aget_tuple(self, config: Dict[str, Any]) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[Dict[str, Any]],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: Dict[str, Any],
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> Dict[str, Any]:
+        # A put can flush, and waits on the lock while the flusher thread
+        # commits; neither may block the event loop.
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self, config: Dict[str, Any], writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str = ""
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """Compaction queries against the SQLiteCheckpointSaver schema."""
+
+    def __init__(self, saver: SQLiteCheckpointSaver) -> None:
+        self._saver = saver
+
+    async def list_compactable_threads(self, namespace, keep_last, idle_before, limit) -> List[str]:
+        def _query() -> List[str]:
+            self._saver.setup()
+            with self._saver._lock:
+                self._saver._flush_locked()
+                rows = self._saver._conn.execute(
+                    "SELECT thread_id FROM checkpoints WHERE checkpoint_ns = ? "
+                    "GROUP BY thread_id HAVING COUNT(*) > ? AND MAX(ts) < ? LIMIT ?",
+                    (namespace, keep_last, idle_before.isoformat(), limit),
+                ).fetchall()
+            return [r[0] for r in rows]
+
+        return await asyncio.to_thread(_query)
+
+    async def delete_intermediate(self, thread_id, namespace, keep_last, batch_size) -> int:
+        def _delete() -> int:
+            self._saver.setup()
+            with self._saver._lock:
+                conn = self._saver._conn
+                conn.execute("BEGIN")
+                try:
+                    ids = [
+                        r[0]
+                        for r in conn.execute(
+                            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                            "ORDER BY checkpoint_id DESC LIMIT ? OFFSET ?",
+                            (thread_id, namespace, batch_size, keep_last),
+                        ).fetchall()
+                    ]
+                    if ids:
+                        marks = ",".join("?" * len(ids))
+                        conn.execute(
+                            f"DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id IN ({marks})",
+                            (thread_id, namespace, *ids),
+                        )
+                        conn.execute(
+                            f"DELETE FROM checkpoint_writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id IN ({marks})",
+                            (thread_id, namespace, *ids),
+                        )
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+            return len(ids)
+
+        return await asyncio.to_thread(_delete)
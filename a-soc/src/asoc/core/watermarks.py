@@ -0,0 +1,161 @@
+"""Persisted ingestion watermarks for incremental telemetry polling.
+
+A watermark records the newest event time ingested from one source cursor
+(provider, account, region) plus the ids of the events seen at exactly that
+time. Polls resume from the watermark time; events at the boundary whose ids
+were already seen are dropped, so nothing is ingested twice even though
+cloud APIs treat the start time as inclusive.
+
+File tailers use `OffsetStore` instead: a byte offset per inode, so a
+tailer can finish a rotated file and pick up its replacement after a restart.
+"""
+
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+def cursor_key(provider: str, account: str, region: str) -> str:
+    return f"{provider}:{account or 'default'}:{region or 'global'}"
+
+
+def _write_json_atomic(path: Path, payload: Any) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(payload, indent=2, sort_keys=True))
+    os.replace(tmp, path)
+
+
+def parse_event_time(value: Any) -> datetime:
+    """Parse an event timestamp (datetime or ISO-8601 string) into an aware UTC datetime."""
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def event_timestamp(event: Dict[str, Any], default: float) -> float:
+    """The event's time as epoch seconds, or `default` when it has none."""
+    value = event.get("eventTime") or event.get("EventTime") or event.get("timestamp")
+    if not value:
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return parse_event_time(value).timestamp()
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass
+class Watermark:
+    """Newest ingested event time and the event ids seen at that instant."""
+
+    event_time: str
+    boundary_ids: List[str] = field(default_factory=list)
+
+    @property
+    def time(self) -> datetime:
+        return parse_event_time(self.event_time)
+
+    def filter_new(self, events: Iterable[Tuple[str, datetime, Any]]) -> List[Any]:
+        """Drop events older than the watermark or already seen at the boundary.
+
+        `events` yields (event_id, event_time, item) tuples; returns the items.
+        """
+        boundary = set(self.boundary_ids)
+        wm_time = self.time
+        fresh = []
+        for event_id, event_time, item in events:
+            if event_time < wm_time:
+                continue
+            if event_time == wm_time and event_id in boundary:
+                continue
+            fresh.append(item)
+        return fresh
+
+    @classmethod
+    def advance(cls, current: Optional["Watermark"], events: Iterable[Tuple[str, datetime]]) -> Optional["Watermark"]:
+        """Return the watermark after ingesting `events` ((event_id, event_time) pairs)."""
+        newest = current.time if current else None
+        ids = set(current.boundary_ids) if current else set()
+        for event_id, event_time in events:
+            if newest is None or event_time > newest:
+                newest, ids = event_time, {event_id}
+            elif event_time == newest:
+                ids.add(event_id)
+        if newest is None:
+            return None
+        return cls(event_time=newest.isoformat(), boundary_ids=sorted(ids))
+
+
+class WatermarkStore:
+    """JSON-file backed watermark persistence, one entry per cursor key.
+
+    Writes go to a temp file and are renamed into place so a crash never
+    leaves a truncated file behind.
+    """
+
+    def __init__(self, path: str = "data/telemetry_watermarks.json") -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._marks: Dict[str, Watermark] = self._load()
+
+    def _load(self) -> Dict[str, Watermark]:
+        if not self.path.exists():
+            return {}
+        try:
+            raw = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+        return {key: Watermark(**value) for key, value in raw.items()}
+
+    def get(self, key: str) -> Optional[Watermark]:
+        return self._marks.get(key)
+
+    def set(self, key: str, watermark: Watermark) -> None:
+        with self._lock:
+            self._marks[key] = watermark
+            self._persist()
+
+    def _persist(self) -> None:
+        payload = {k: {"event_time": w.event_time, "boundary_ids": w.boundary_ids} for k, w in self._marks.items()}
+        _write_json_atomic(self.path, payload)
+
+    def keys(self) -> List[str]:
+        return list(self._marks)
+
+
+class OffsetStore:
+    """JSON-file backed read offsets for file tailers: cursor key -> {inode: offset}."""
+
+    def __init__(self, path: str = "data/telemetry_offsets.json") -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._offsets: Dict[str, Dict[int, int]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[int, int]]:
+        if not self.path.exists():
+            return {}
+        try:
+            raw = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+        return {key: {int(inode): int(offset) for inode, offset in value.items()} for key, value in raw.items()}
+
+    def get(self, key: str) -> Optional[Dict[int, int]]:
+        offsets = self._offsets.get(key)
+        return dict(offsets) if offsets is not None else None
+
+    def set(self, key: str, offsets: Dict[int, int]) -> None:
+        with self._lock:
+            self._offsets[key] = dict(offsets)
+            payload = {k: {str(inode): off for inode, off in v.items()} for k, v in self._offsets.items()}
+            _write_json_atomic(self.path, payload)
@@ -33,8 +33,18 @@ class RiskScorer:
         if context.get("irreversible"):
             base_score += 0.2
 
+        if context.get("baseline_zscore"):
+            base_score += RiskScorer.anomaly_boost(context["baseline_zscore"])
+
         return min(base_score, 1.0)
 
+    @staticmethod
+    def anomaly_boost(zscore: float, threshold: float = 3.0) -> float:
+        """Risk added for behaviour `zscore` standard deviations off the actor's baseline."""
+        if zscore < threshold:
+            return 0.0
+        return min(0.25, 0.1 + 0.05 * (zscore - threshold))
+
     @staticmethod
     def get_risk_level(score: float) -> RiskLevel:
         if score < 0.3:
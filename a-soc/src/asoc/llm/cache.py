@@ -0,0 +1,177 @@
+"""Verdict cache in front of an LLM provider.
+
+Alerts repeat: the same principal calling the same API with the same
+parameters produces events that differ only in timestamps and request ids.
+`event_fingerprint` hashes an event with those volatile fields removed,
+together with the model and prompt version, so a repeat is answered from
+the cache instead of the model.
+
+The cache has an in-memory LRU tier and an optional SQLite tier that
+survives restarts. Both honour the same TTL.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.asoc.core.cache import LRUCache
+from src.asoc.core.metrics import get_metrics
+from src.asoc.llm.providers import PROMPT_VERSION, LLMProvider, LLMResult, VerdictCallback, report_verdict
+
+# Fields that differ between otherwise identical events.
+VOLATILE_FIELDS = frozenset({
+    "eventTime", "eventID", "requestID", "sharedEventID", "eventVersion",
+    "requestReceivedTimestamp", "stageTimestamp", "auditID",
+    "event_time", "event_id", "request_id", "timestamp", "@timestamp", "receiveTimestamp", "insertId",
+    "TimeGenerated", "CorrelationId",
+})
+
+
+def _strip_volatile(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _strip_volatile(v) for k, v in value.items() if k not in VOLATILE_FIELDS}
+    if isinstance(value, list):
+        return [_strip_volatile(v) for v in value]
+    return value
+
+
+def event_fingerprint(event: Dict[str, Any], model: str, prompt_version: str = PROMPT_VERSION) -> str:
+    canonical = json.dumps(_strip_volatile(event), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{model}\0{prompt_version}\0{canonical}".encode()).hexdigest()
+
+
+def _to_dict(result: LLMResult) -> Dict[str, Any]:
+    return {
+        "threat_detected": result.threat_detected,
+        "risk_score": result.risk_score,
+        "reasoning": result.reasoning,
+        "attack_technique": result.attack_technique,
+    }
+
+
+class _DiskTier:
+    """Verdicts in a SQLite file, keyed by fingerprint."""
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS verdicts (key TEXT PRIMARY KEY, expires REAL NOT NULL, verdict TEXT NOT NULL)")
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT expires, verdict FROM verdicts WHERE key = ?", (key,)).fetchone()
+        if row is None or row[0] < time.time():
+            return None
+        return json.loads(row[1])
+
+    def set(self, key: str, verdict: Dict[str, Any], expires: float) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?)", (key, expires, json.dumps(verdict)))
+
+    def purge_expired(self) -> int:
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM verdicts WHERE expires < ?", (time.time(),)).rowcount
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class VerdictCache:
+    def __init__(self, ttl_seconds: float = 3600.0, max_entries: int = 10000, disk_path: Optional[str] = None):
+        self.ttl_seconds = ttl_seconds
+        self._memory = LRUCache(max_size=max_entries, ttl_seconds=ttl_seconds)
+        self._disk_path = disk_path
+        self._disk: Optional[_DiskTier] = None
+
+    @classmethod
+    def from_settings(cls, config=None) -> "VerdictCache":
+        from src.asoc.core.config import settings
+
+        config = config or settings
+        return cls(
+            ttl_seconds=config.LLM_CACHE_TTL_SECONDS,
+            max_entries=config.LLM_CACHE_MAX_ENTRIES,
+            disk_path=config.LLM_CACHE_PATH or None,
+        )
+
+    def _disk_tier(self) -> Optional[_DiskTier]:
+        if self._disk is None and self._disk_path:
+            self._disk = _DiskTier(self._disk_path)
+        return self._disk
+
+    def get(self, key: str) -> Optional[LLMResult]:
+        metrics = get_metrics()
+        verdict = self._memory.get(key)
+        tier = "memory"
+        if verdict is None and self._disk_tier() is not None:
+            verdict = self._disk.get(key)
+            tier = "disk"
+            if verdict is not None:
+                self._memory.set(key, verdict)
+        if verdict is None:
+            metrics.inc_counter("llm_cache_misses_total")
+            return None
+        metrics.inc_counter("llm_cache_hits_total", tier=tier)
+        return LLMResult(**verdict)
+
+    def set(self, key: str, result: LLMResult) -> None:
+        verdict = _to_dict(result)
+        self._memory.set(key, verdict)
+        if self._disk_tier() is not None:
+            self._disk.set(key, verdict, time.time() + self.ttl_seconds)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return self._memory.stats
+
+
+class CachedProvider(LLMProvider):
+    """Answers repeated events from a `VerdictCache`; sends the rest to `provider`."""
+
+    def __init__(self, provider: LLMProvider, cache: VerdictCache):
+        self.provider = provider
+        self.cache = cache
+
+    @property
+    def name(self) -> str:
+        return self.provider.name
+
+    def _key(self, event_data: dict) -> str:
+        return event_fingerprint(event_data, self.provider.name)
+
+    async def analyze(
+        self, event_data: dict, on_verdict: Optional[VerdictCallback] = None, need_reasoning: bool = True
+    ) -> LLMResult:
+        key = self._key(event_data)
+        cached = self.cache.get(key)
+        if cached is not None:
+            report_verdict(cached, on_verdict)
+            return cached
+        result = await self.provider.analyze(event_data, on_verdict=on_verdict, need_reasoning=need_reasoning)
+        # A verdict cut short of its reasoning is still right, but a later
+        # caller that wants the explanation should not be served an empty one.
+        if need_reasoning or result.reasoning:
+            self.cache.set(key, result)
+        return result
+
+    async def analyze_batch(self, events: List[dict]) -> List[LLMResult]:
+        keys = [self._key(event) for event in events]
+        results: List[Optional[LLMResult]] = [self.cache.get(key) for key in keys]
+        # Identical events within the batch are analysed once.
+        misses: Dict[str, int] = {}
+        for i, (key, result) in enumerate(zip(keys, results)):
+            if result is None:
+                misses.setdefault(key, i)
+        if misses:
+            fresh = await self.provider.analyze_batch([events[i] for i in misses.values()])
+            by_key = dict(zip(misses, fresh))
+            for key, result in by_key.items():
+                self.cache.set(key, result)
+            results = [result if result is not None else by_key[key] for key, result in zip(keys, results)]
+        return results  # type: ignore[return-value]
@@ -0,0 +1,132 @@
+"""Compact event payloads before they are put into an LLM prompt.
+
+Events arrive with every field the source produced, often with the full
+provider record nested under `raw` or a CloudTrail `CloudTrailEvent`
+string. Most of it is noise to the model and all of it costs input tokens.
+`compact_event` keeps only the fields that matter for the event's kind,
+drops empty values, truncates long strings and lists, and `compact_json`
+serialises the result without whitespace.
+"""
+
+import json
+from typing import Any, Dict, Optional, Tuple
+
+# Fields worth showing the model, by event kind.
+_COMMON_FIELDS = ("eventName", "eventSource", "eventTime", "awsRegion", "sourceIPAddress", "userAgent", "userIdentity")
+_PROJECTIONS: Dict[str, Tuple[str, ...]] = {
+    "cloudtrail": _COMMON_FIELDS + (
+        "eventType", "readOnly", "errorCode", "errorMessage", "requestParameters", "resources", "recipientAccountId",
+    ),
+    "kubernetes": _COMMON_FIELDS + ("resources",),
+    "flow": ("eventName", "eventTime", "sourceIPAddress", "resources"),
+}
+# Extra fields that carry the signal for particular operations.
+_EVENT_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "ConsoleLogin": ("additionalEventData", "responseElements"),
+    "CreateAccessKey": ("responseElements",),
+    "AssumeRole": ("responseElements",),
+    "GetFederationToken": ("responseElements",),
+    "CreateLoginProfile": ("responseElements",),
+}
+_IDENTITY_FIELDS = ("type", "userName", "principalId", "arn", "accountId", "invokedBy", "hostName", "groups")
+_SESSION_FIELDS = ("mfaAuthenticated", "creationDate")
+
+MAX_VALUE_CHARS = 256
+MAX_LIST_ITEMS = 10
+MAX_DEPTH = 5
+
+
+def _kind(name: str) -> str:
+    if name.startswith("VPCFlow"):
+        return "flow"
+    if ":" in name:
+        return "kubernetes"
+    return "cloudtrail"
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def _shrink(value: Any, max_chars: int, depth: int = 0) -> Any:
+    if isinstance(value, str):
+        return value if len(value) <= max_chars else f"{value[:max_chars]}...[+{len(value) - max_chars} chars]"
+    if depth >= MAX_DEPTH:
+        return value if not isinstance(value, (dict, list)) else "..."
+    if isinstance(value, dict):
+        shrunk = {k: _shrink(v, max_chars, depth + 1) for k, v in value.items() if not _is_empty(v)}
+        return {k: v for k, v in shrunk.items() if not _is_empty(v)}
+    if isinstance(value, list):
+        items = [_shrink(v, max_chars, depth + 1) for v in value[:MAX_LIST_ITEMS] if not _is_empty(v)]
+        if len(value) > MAX_LIST_ITEMS:
+            items.append(f"...[+{len(value) - MAX_LIST_ITEMS} items]")
+        return items
+    return value
+
+
+def _identity(identity: Any) -> Any:
+    if not isinstance(identity, dict):
+        return identity
+    projected = {k: identity[k] for k in _IDENTITY_FIELDS if k in identity}
+    session = identity.get("sessionContext") or {}
+    attributes = session.get("attributes") or {}
+    issuer = session.get("sessionIssuer") or {}
+    projected.update({k: attributes[k] for k in _SESSION_FIELDS if k in attributes})
+    if issuer.get("arn"):
+        projected["sessionIssuer"] = issuer["arn"]
+    return projected
+
+
+def _source_record(event: Dict[str, Any]) -> Dict[str, Any]:
+    """The event merged over the full record it was normalised from, if that is present."""
+    record: Dict[str, Any] = {}
+    nested = event.get("CloudTrailEvent")
+    if isinstance(nested, str):
+        try:
+            nested = json.loads(nested)
+        except ValueError:
+            nested = None
+    raw = event.get("raw")
+    for source in (raw, nested):
+        if isinstance(source, dict):
+            inner = source.get("CloudTrailEvent")
+            if isinstance(inner, str):
+                try:
+                    record.update(json.loads(inner))
+                except ValueError:
+                    pass
+            record.update(source)
+    record.update({k: v for k, v in event.items() if not _is_empty(v)})
+    # LookupEvents uses capitalised keys for the summary fields.
+    for upper, lower in (("EventName", "eventName"), ("EventTime", "eventTime"), ("EventSource", "eventSource")):
+        if upper in record and lower not in record:
+            record[lower] = record[upper]
+    if "Username" in record and _is_empty(record.get("userIdentity")):
+        record["userIdentity"] = {"userName": record["Username"]}
+    return record
+
+
+def compact_event(event: Dict[str, Any], max_chars: int = MAX_VALUE_CHARS) -> Dict[str, Any]:
+    """The security-relevant subset of `event`, with empty values dropped and long values truncated."""
+    record = _source_record(event)
+    name = str(record.get("eventName") or record.get("event_name") or "")
+    fields = _PROJECTIONS[_kind(name)] + _EVENT_FIELDS.get(name, ())
+    projected: Dict[str, Any] = {}
+    for key in fields:
+        value = record.get(key)
+        if key == "userIdentity":
+            value = _identity(value)
+        if not _is_empty(value):
+            projected[key] = value
+    if "eventName" not in projected and name:
+        projected["eventName"] = name
+    if len(projected) <= 1:
+        # Not a shape we know: keep everything except the nested source record.
+        projected = {k: v for k, v in event.items() if k not in ("raw", "CloudTrailEvent")}
+    return _shrink(projected, max_chars)
+
+
+def compact_json(event: Dict[str, Any], max_chars: Optional[int] = None) -> str:
+    return json.dumps(
+        compact_event(event, max_chars or MAX_VALUE_CHARS), separators=(",", ":"), sort_keys=True, default=str
+    )
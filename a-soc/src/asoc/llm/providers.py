@@ -1,9 +1,15 @@
 import abc
+import asyncio
 import json
 import logging
-from typing import Any, Dict, Optional
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
 
 from src.asoc.core.config import settings
+from src.asoc.core.metrics import get_metrics
+from src.asoc.llm.compaction import compact_event
+from src.asoc.llm.scheduler import get_llm_scheduler
+from src.asoc.llm.streaming import VerdictStreamParser
 
 logger = logging.getLogger("asoc.llm")
 
@@ -21,9 +27,116 @@ class LLMResult:
         return {"risk_score": self.risk_score, "reasoning": self.reasoning, "attack_technique": self.attack_technique}
 
 
+# Part of every cached verdict's key; bump it whenever either prompt changes.
+PROMPT_VERSION = "3"
+
+PROMPT_TEMPLATE = """Analyze this AWS CloudTrail event for security threats.
+Event: {event_json}
+
+Return a JSON object with exactly these fields, in this order:
+- threat_detected: boolean
+- risk_score: float between 0.0 and 1.0
+- attack_technique: string (MITRE ATT&CK ID if applicable, or null)
+- reasoning: string explaining the analysis"""
+
+BATCH_PROMPT_TEMPLATE = """Analyze each of these AWS CloudTrail events for security threats. Judge every event on its own.
+Events, one JSON object per line, each with an "id" and the "event":
+{events_jsonl}
+
+Return a JSON array with one object per event and exactly these fields:
+- id: the id of the event
+- threat_detected: boolean
+- risk_score: float between 0.0 and 1.0
+- reasoning: string explaining the analysis
+- attack_technique: string (MITRE ATT&CK ID if applicable, or null)"""
+
+# Rough sizing for batch planning: ~4 characters per token, and the tokens a
+# single verdict takes in the response.
+CHARS_PER_TOKEN = 4
+VERDICT_TOKENS = 160
+_BATCH_OVERHEAD_TOKENS = len(BATCH_PROMPT_TEMPLATE) // CHARS_PER_TOKEN
+
+# A streamed verdict is usable once these arrive, and complete with reasoning.
+VERDICT_FIELDS = ("threat_detected", "risk_score")
+RESULT_FIELDS = VERDICT_FIELDS + ("attack_technique",)
+
+
+def _result_from_dict(result: Dict[str, Any]) -> LLMResult:
+    return LLMResult(
+        threat_detected=result.get("threat_detected", True),
+        risk_score=result.get("risk_score", 0.5),
+        reasoning=result.get("reasoning", "No reasoning provided"),
+        attack_technique=result.get("attack_technique"),
+    )
+
+
+def _strip_fences(content: str) -> str:
+    content = content.strip()
+    if content.startswith("```"):
+        content = content.split("\n", 1)[1] if "\n" in content else ""
+        content = content.rsplit("```", 1)[0]
+    return content.strip()
+
+
+def plan_batches(lines: List[str], token_budget: int, max_events: int) -> List[List[int]]:
+    """Group event indexes so each group's prompt and verdicts fit `token_budget`.
+
+    `lines` are the serialised events. An event too large to share a prompt
+    gets a group of its own.
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    used = _BATCH_OVERHEAD_TOKENS
+    for i, line in enumerate(lines):
+        cost = len(line) // CHARS_PER_TOKEN + VERDICT_TOKENS
+        if current and (used + cost > token_budget or len(current) >= max_events):
+            batches.append(current)
+            current, used = [], _BATCH_OVERHEAD_TOKENS
+        current.append(i)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def parse_batch_response(content: str, ids: List[str]) -> Dict[str, LLMResult]:
+    """Map each id in `ids` to its verdict. Ids the model skipped are absent."""
+    parsed = json.loads(_strip_fences(content))
+    if isinstance(parsed, dict):
+        parsed = parsed.get("results") or parsed.get("verdicts") or []
+    wanted = set(ids)
+    verdicts: Dict[str, LLMResult] = {}
+    for item in parsed:
+        if isinstance(item, dict) and str(item.get("id")) in wanted:
+            verdicts[str(item["id"])] = _result_from_dict(item)
+    return verdicts
+
+
+VerdictCallback = Callable[[Dict[str, Any]], None]
+
+
+def report_verdict(result: LLMResult, on_verdict: Optional[VerdictCallback]) -> None:
+    """Call `on_verdict` for a verdict that arrived whole rather than streamed."""
+    if on_verdict is not None:
+        on_verdict({"threat_detected": result.threat_detected, "risk_score": result.risk_score})
+
+
 class LLMProvider(abc.ABC):
     @abc.abstractmethod
-    async def analyze(self, event_data: dict) -> LLMResult: ...
+    async def analyze(
+        self, event_data: dict, on_verdict: Optional[VerdictCallback] = None, need_reasoning: bool = True
+    ) -> LLMResult:
+        """One verdict for `event_data`.
+
+        `on_verdict` is called with `threat_detected` and `risk_score` as soon
+        as they are known, before the rest of the verdict. With
+        `need_reasoning=False` a streaming provider stops once the decision
+        fields are in and does not wait for the prose.
+        """
+
+    async def analyze_batch(self, events: List[dict]) -> List[LLMResult]:
+        """One verdict per event, in order. Providers without a batch prompt analyse each event."""
+        return list(await asyncio.gather(*(self.analyze(event) for event in events)))
 
     @property
     @abc.abstractmethod
@@ -35,27 +148,184 @@ class MockProvider(LLMProvider):
     def name(self) -> str:
         return "mock"
 
-    async def analyze(self, event_data: dict) -> LLMResult:
-        return LLMResult(
+    async def analyze(
+        self, event_data: dict, on_verdict: Optional[VerdictCallback] = None, need_reasoning: bool = True
+    ) -> LLMResult:
+        result = LLMResult(
             threat_detected=True, risk_score=0.85, reasoning="Suspicious ConsoleLogin from unusual IP address (1.2.3.4)"
         )
+        report_verdict(result, on_verdict)
+        return result
 
 
-PROMPT_TEMPLATE = """Analyze this AWS CloudTrail event for security threats.
-Event: {event_json}
+class CompletionProvider(LLMProvider):
+    """A provider backed by a single text completion call.
 
-Return a JSON object with exactly these fields:
-- threat_detected: boolean
-- risk_score: float between 0.0 and 1.0
-- reasoning: string explaining the analysis
-- attack_technique: string (MITRE ATT&CK ID if applicable, or null)"""
+    Subclasses implement `_complete`, and `_stream` if the SDK can stream;
+    prompt building, parsing and batching are shared. With `streaming` on,
+    single-event analysis reads the completion as it is generated and stops
+    as soon as every verdict field has arrived.
+    """
+
+    label = "LLM"
+
+    def __init__(self, streaming: bool = False):
+        self._client = None
+        self._batch_limit: Optional[int] = None
+        self.streaming = streaming
+
+    def _lazy_init(self): ...
 
+    @abc.abstractmethod
+    async def _complete(self, prompt: str, max_tokens: int) -> str: ...
+
+    async def _stream(self, prompt: str, max_tokens: int) -> AsyncIterator[str]:
+        """Completion text as it is generated. Closing the iterator ends the request."""
+        yield await self._complete(prompt, max_tokens)
+
+    async def _send(self, prompt: str, max_tokens: int, call: Optional[Callable] = None) -> Any:
+        """`call` (by default `_complete`) through this provider's process-wide scheduler."""
+        tokens = len(prompt) // CHARS_PER_TOKEN + max_tokens
+        call = call or (lambda: self._complete(prompt, max_tokens))
+        return await get_llm_scheduler(self.name).run(call, tokens=tokens)
+
+    async def _complete_streaming(
+        self,
+        prompt: str,
+        max_tokens: int,
+        on_verdict: Optional[VerdictCallback] = None,
+        need_reasoning: bool = True,
+    ) -> Dict[str, Any]:
+        """Stream one verdict; report it early and stop once it is complete.
+
+        `on_verdict` gets `threat_detected` and `risk_score` as soon as both
+        have arrived. Generation is cut off when the remaining fields are in
+        and `reasoning` is complete or longer than `LLM_STREAM_MAX_REASONING_CHARS`,
+        or as soon as the remaining fields are in without `need_reasoning`.
+        """
+        max_reasoning = settings.LLM_STREAM_MAX_REASONING_CHARS
+        parser = VerdictStreamParser()
+        started = time.perf_counter()
+        reported = stopped = False
+        chunks = self._stream(prompt, max_tokens)
+        try:
+            async for chunk in chunks:
+                parser.feed(chunk)
+                if not reported and parser.has(*VERDICT_FIELDS):
+                    reported = True
+                    get_metrics().observe_histogram("llm_time_to_verdict_seconds", time.perf_counter() - started, provider=self.name)
+                    if on_verdict is not None:
+                        on_verdict({key: parser.fields[key] for key in VERDICT_FIELDS})
+                if parser.has(*RESULT_FIELDS):
+                    reasoning = parser.fields.get("reasoning", parser.partial("reasoning"))
+                    if (
+                        not need_reasoning
+                        or "reasoning" in parser.fields
+                        or (reasoning is not None and len(reasoning) >= max_reasoning)
+                    ):
+                        stopped = True
+                        break
+        finally:
+            await chunks.aclose()
+        if not stopped:
+            return json.loads(_strip_fences(parser.text))
+        get_metrics().inc_counter("llm_stream_early_stops_total", provider=self.name)
+        result = dict(parser.fields)
+        if "reasoning" not in result:
+            partial = parser.partial("reasoning")
+            result["reasoning"] = partial[:max_reasoning] + "..." if partial else ""
+        return result
+
+    def _event_json(self, event_data: dict, event_id: Optional[str] = None) -> str:
+        """The event as it goes into a prompt: compacted and minified, unless compaction is off."""
+        if not settings.LLM_COMPACT_PROMPTS:
+            if event_id is None:
+                return json.dumps(event_data, indent=2, default=str)
+            return json.dumps({"id": event_id, "event": event_data}, separators=(",", ":"), default=str)
+        compact = compact_event(event_data, settings.LLM_PROMPT_MAX_VALUE_CHARS)
+        text = json.dumps(compact if event_id is None else {"id": event_id, "event": compact}, separators=(",", ":"), default=str)
+        # Measured against the uncompacted, indented event that prompts used to carry.
+        saved = (len(json.dumps(event_data, indent=2, default=str)) - len(text)) // CHARS_PER_TOKEN
+        get_metrics().observe_histogram("llm_prompt_tokens_saved", max(0, saved), provider=self.name)
+        return text
+
+    async def analyze(
+        self, event_data: dict, on_verdict: Optional[VerdictCallback] = None, need_reasoning: bool = True
+    ) -> LLMResult:
+        self._lazy_init()
+        try:
+            prompt = PROMPT_TEMPLATE.format(event_json=self._event_json(event_data))
+            if self.streaming:
+                result = await self._send(
+                    prompt, 1024, lambda: self._complete_streaming(prompt, 1024, on_verdict, need_reasoning)
+                )
+                return _result_from_dict(result)
+            content = await self._send(prompt, max_tokens=1024)
+            result = _result_from_dict(json.loads(_strip_fences(content)))
+            report_verdict(result, on_verdict)
+            return result
+        except Exception as e:
+            logger.error("%s analysis failed: %s", self.label, e)
+            raise
 
-class OpenAIProvider(LLMProvider):
-    def __init__(self, api_key: str, model: str = "gpt-4"):
+    async def analyze_batch(self, events: List[dict], token_budget: Optional[int] = None) -> List[LLMResult]:
+        """Analyse `events` with as few completions as the token budget allows.
+
+        Events are packed into prompts of up to `LLM_BATCH_MAX_EVENTS`, sized
+        by `LLM_BATCH_TOKEN_BUDGET`. Verdicts are matched back by id. Events
+        whose verdict is missing or unparseable are analysed one by one. A
+        failed batch halves the batch size for the next call; each clean
+        batch lets it grow by one again.
+        """
+        if len(events) <= 1:
+            return [await self.analyze(event) for event in events]
+        self._lazy_init()
+        max_events = settings.LLM_BATCH_MAX_EVENTS
+        if self._batch_limit is None:
+            self._batch_limit = max_events
+        lines = [self._event_json(event, event_id=f"e{i}") for i, event in enumerate(events)]
+        groups = plan_batches(lines, token_budget or settings.LLM_BATCH_TOKEN_BUDGET, self._batch_limit)
+        results: List[Optional[LLMResult]] = [None] * len(events)
+        await asyncio.gather(*(self._analyze_group(events, lines, group, results) for group in groups))
+        return results  # type: ignore[return-value]
+
+    async def _analyze_group(self, events: List[dict], lines: List[str], group: List[int], results: list) -> None:
+        if len(group) == 1:
+            results[group[0]] = await self.analyze(events[group[0]])
+            return
+        ids = [f"e{i}" for i in group]
+        try:
+            prompt = BATCH_PROMPT_TEMPLATE.format(events_jsonl="\n".join(lines[i] for i in group))
+            content = await self._send(prompt, max_tokens=VERDICT_TOKENS * len(group) + 256)
+            verdicts = parse_batch_response(content, ids)
+        except Exception as e:
+            logger.warning("%s batch analysis of %d events failed: %s", self.label, len(group), e)
+            verdicts = {}
+        missing = [i for i, event_id in zip(group, ids) if event_id not in verdicts]
+        for i, event_id in zip(group, ids):
+            if event_id in verdicts:
+                results[i] = verdicts[event_id]
+        if missing:
+            self._batch_limit = max(1, self._batch_limit // 2)
+            fallback = await asyncio.gather(*(self.analyze(events[i]) for i in missing))
+            for i, result in zip(missing, fallback):
+                results[i] = result
+        else:
+            self._batch_limit = min(settings.LLM_BATCH_MAX_EVENTS, self._batch_limit + 1)
+        metrics = get_metrics()
+        if len(missing) < len(group):
+            metrics.inc_counter("llm_batch_events_total", len(group) - len(missing), provider=self.name, outcome="batched")
+        if missing:
+            metrics.inc_counter("llm_batch_events_total", len(missing), provider=self.name, outcome="fallback")
+
+
+class OpenAIProvider(CompletionProvider):
+    label = "OpenAI"
+
+    def __init__(self, api_key: str, model: str = "gpt-4", streaming: bool = False):
+        super().__init__(streaming)
         self.api_key = api_key
         self.model = model
-        self._client = None
 
     @property
     def name(self) -> str:
@@ -67,32 +337,38 @@ class OpenAIProvider(LLMProvider):
 
             self._client = AsyncOpenAI(api_key=self.api_key)
 
-    async def analyze(self, event_data: dict) -> LLMResult:
-        self._lazy_init()
+    async def _complete(self, prompt: str, max_tokens: int) -> str:
+        response = await self._client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0,
+            max_tokens=max_tokens,
+        )
+        return response.choices[0].message.content
+
+    async def _stream(self, prompt: str, max_tokens: int) -> AsyncIterator[str]:
+        stream = await self._client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0,
+            max_tokens=max_tokens,
+            stream=True,
+        )
         try:
-            prompt = PROMPT_TEMPLATE.format(event_json=json.dumps(event_data, indent=2))
-            response = await self._client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0,
-            )
-            result = json.loads(response.choices[0].message.content.strip())
-            return LLMResult(
-                threat_detected=result.get("threat_detected", True),
-                risk_score=result.get("risk_score", 0.5),
-                reasoning=result.get("reasoning", "No reasoning provided"),
-                attack_technique=result.get("attack_technique"),
-            )
-        except Exception as e:
-            logger.error("OpenAI analysis failed: %s", e)
-            raise
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
+
 
+class AnthropicProvider(CompletionProvider):
+    label = "Anthropic"
 
-class AnthropicProvider(LLMProvider):
-    def __init__(self, api_key: str, model: str = "claude-3-opus-20240229"):
+    def __init__(self, api_key: str, model: str = "claude-3-opus-20240229", streaming: bool = False):
+        super().__init__(streaming)
         self.api_key = api_key
         self.model = model
-        self._client = None
 
     @property
     def name(self) -> str:
@@ -104,33 +380,31 @@ class AnthropicProvider(LLMProvider):
 
             self._client = AsyncAnthropic(api_key=self.api_key)
 
-    async def analyze(self, event_data: dict) -> LLMResult:
-        self._lazy_init()
-        try:
-            prompt = PROMPT_TEMPLATE.format(event_json=json.dumps(event_data, indent=2))
-            response = await self._client.messages.create(
-                model=self.model,
-                max_tokens=1024,
-                messages=[{"role": "user", "content": prompt}],
-            )
-            content = response.content[0].text if hasattr(response.content[0], "text") else str(response.content)
-            result = json.loads(content.strip())
-            return LLMResult(
-                threat_detected=result.get("threat_detected", True),
-                risk_score=result.get("risk_score", 0.5),
-                reasoning=result.get("reasoning", "No reasoning provided"),
-                attack_technique=result.get("attack_technique"),
-            )
-        except Exception as e:
-            logger.error("Anthropic analysis failed: %s", e)
-            raise
+    async def _complete(self, prompt: str, max_tokens: int) -> str:
+        response = await self._client.messages.create(
+            model=self.model,
+            max_tokens=max_tokens,
+            messages=[{"role": "user", "content": prompt}],
+        )
+        return response.content[0].text if hasattr(response.content[0], "text") else str(response.content)
 
+    async def _stream(self, prompt: str, max_tokens: int) -> AsyncIterator[str]:
+        async with self._client.messages.stream(
+            model=self.model,
+            max_tokens=max_tokens,
+            messages=[{"role": "user", "content": prompt}],
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
 
-class OllamaProvider(LLMProvider):
-    def __init__(self, model: str = "llama3", base_url: str = "http://localhost:11434"):
+
+class OllamaProvider(CompletionProvider):
+    label = "Ollama"
+
+    def __init__(self, model: str = "llama3", base_url: str = "http://localhost:11434", streaming: bool = False):
+        super().__init__(streaming)
         self.model = model
         self.base_url = base_url
-        self._client = None
 
     @property
     def name(self) -> str:
@@ -142,34 +416,53 @@ class OllamaProvider(LLMProvider):
 
             self._client = AsyncOpenAI(base_url=f"{self.base_url}/v1", api_key="ollama")
 
-    async def analyze(self, event_data: dict) -> LLMResult:
-        self._lazy_init()
+    async def _complete(self, prompt: str, max_tokens: int) -> str:
+        response = await self._client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0,
+            max_tokens=max_tokens,
+        )
+        return response.choices[0].message.content
+
+    async def _stream(self, prompt: str, max_tokens: int) -> AsyncIterator[str]:
+        stream = await self._client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0,
+            max_tokens=max_tokens,
+            stream=True,
+        )
         try:
-            prompt = PROMPT_TEMPLATE.format(event_json=json.dumps(event_data, indent=2))
-            response = await self._client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0,
-            )
-            result = json.loads(response.choices[0].message.content.strip())
-            return LLMResult(
-                threat_detected=result.get("threat_detected", True),
-                risk_score=result.get("risk_score", 0.5),
-                reasoning=result.get("reasoning", "No reasoning provided"),
-                attack_technique=result.get("attack_technique"),
-            )
-        except Exception as e:
-            logger.error("Ollama analysis failed: %s", e)
-            raise
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
 
 
-def create_llm_provider() -> LLMProvider:
+def _create_base_provider() -> LLMProvider:
     provider_type = settings.LLM_PROVIDER
     if provider_type == "openai" and settings.OPENAI_API_KEY:
-        return OpenAIProvider(api_key=settings.OPENAI_API_KEY.get_secret_value(), model=settings.LLM_MODEL)
+        return OpenAIProvider(
+            api_key=settings.OPENAI_API_KEY.get_secret_value(), model=settings.LLM_MODEL, streaming=settings.LLM_STREAMING
+        )
     if provider_type == "anthropic" and settings.ANTHROPIC_API_KEY:
-        return AnthropicProvider(api_key=settings.ANTHROPIC_API_KEY.get_secret_value(), model=settings.LLM_MODEL)
+        return AnthropicProvider(
+            api_key=settings.ANTHROPIC_API_KEY.get_secret_value(), model=settings.LLM_MODEL, streaming=settings.LLM_STREAMING
+        )
     if provider_type in ("ollama", "local"):
-        return OllamaProvider(model=settings.LOCAL_LLM_MODEL, base_url=settings.LOCAL_LLM_BASE_URL)
+        return OllamaProvider(
+            model=settings.LOCAL_LLM_MODEL, base_url=settings.LOCAL_LLM_BASE_URL, streaming=settings.LLM_STREAMING
+        )
     logger.warning("No valid LLM provider configured for '%s'. Using mock fallback.", provider_type)
     return MockProvider()
+
+
+def create_llm_provider() -> LLMProvider:
+    provider = _create_base_provider()
+    if isinstance(provider, MockProvider) or not settings.LLM_CACHE_ENABLED:
+        return provider
+    from src.asoc.llm.cache import CachedProvider, VerdictCache
+
+    return CachedProvider(provider, VerdictCache.from_settings())
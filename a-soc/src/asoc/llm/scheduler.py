@@ -0,0 +1,209 @@
+"""Process-wide scheduling of LLM requests.
+
+Every completion sent by a provider goes through the `LLMScheduler` for that
+provider (`get_llm_scheduler`). The scheduler:
+- caps requests in flight (`LLM_MAX_IN_FLIGHT`);
+- paces estimated tokens per minute with a `TokenBucket` (`LLM_TOKENS_PER_MINUTE`);
+- admits waiting requests highest priority first, then in arrival order;
+- on a 429, pauses the whole provider for a jittered backoff (or the
+  server's `retry-after`) and retries the request, up to `LLM_MAX_RETRIES`.
+
+Callers choose a priority (an `agents.message.Priority`) with
+`llm_priority(...)`. It is a context variable, so it reaches the provider
+without threading a parameter through every `analyze` call.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from src.asoc.core.api_pacing import is_throttling_error
+from src.asoc.core.logging import get_logger
+from src.asoc.core.metrics import get_metrics
+from src.asoc.middleware.rate_limiter import TokenBucket
+
+logger = get_logger("asoc.llm.scheduler")
+
+T = TypeVar("T")
+
+# Values of agents.message.Priority; the enum is not imported so that the
+# llm package stays free of agent imports.
+PRIORITY_NAMES = {1: "low", 2: "medium", 3: "high", 4: "critical"}
+DEFAULT_PRIORITY = 2
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("llm_priority", default=DEFAULT_PRIORITY)
+
+
+@contextlib.contextmanager
+def llm_priority(priority: int) -> Iterator[None]:
+    """Run the enclosed LLM calls at `priority`."""
+    token = _priority.set(int(priority))
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_llm_priority() -> int:
+    return _priority.get()
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    """True for SDK rate-limit errors (OpenAI, Anthropic) and throttled cloud responses."""
+    return getattr(exc, "status_code", None) == 429 or is_throttling_error(exc)
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    try:
+        return float(headers.get("retry-after")) if headers else None
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMScheduler:
+    def __init__(
+        self,
+        name: str,
+        max_in_flight: int = 8,
+        tokens_per_minute: int = 0,
+        max_retries: int = 5,
+        max_backoff: float = 30.0,
+        base_backoff: float = 1.0,
+    ):
+        self.name = name
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.base_backoff = base_backoff
+        self.in_flight = 0
+        self.throttles = 0
+        self._bucket = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0) if tokens_per_minute > 0 else None
+        self._capacity = float(tokens_per_minute)
+        self._waiters: List[Tuple[int, int, float, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for *_, fut in self._waiters if not fut.done())
+
+    async def run(self, call: Callable[[], Awaitable[T]], tokens: float = 0.0, priority: Optional[int] = None) -> T:
+        """Run `call` once admitted; retry it while the provider rate-limits."""
+        priority = int(priority if priority is not None else current_llm_priority())
+        attempt = 0
+        while True:
+            await self._acquire(priority, tokens)
+            try:
+                return await call()
+            except Exception as e:
+                if not is_rate_limited(e) or attempt >= self.max_retries:
+                    raise
+                delay = self._on_throttle(attempt, _retry_after(e))
+                logger.warning("llm_rate_limited", provider=self.name, attempt=attempt + 1, backoff=round(delay, 3))
+                attempt += 1
+            finally:
+                self._release()
+
+    async def _acquire(self, priority: int, tokens: float) -> None:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        # Highest priority first; a single request larger than the bucket
+        # waits for a full bucket rather than forever.
+        heapq.heappush(self._waiters, (-priority, next(self._seq), min(tokens, self._capacity), fut))
+        started = time.monotonic()
+        self._dispatch()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self._release()
+            raise
+        finally:
+            metrics = get_metrics()
+            metrics.observe_histogram("llm_scheduler_wait_seconds", time.monotonic() - started, provider=self.name, priority=PRIORITY_NAMES.get(priority, str(priority)))
+            metrics.set_gauge("llm_scheduler_queue_depth", self.queue_depth, provider=self.name)
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        get_metrics().set_gauge("llm_scheduler_in_flight", self.in_flight, provider=self.name)
+        self._dispatch()
+
+    def _on_throttle(self, attempt: int, retry_after: Optional[float]) -> float:
+        self.throttles += 1
+        get_metrics().inc_counter("llm_scheduler_throttles_total", provider=self.name)
+        delay = retry_after if retry_after is not None else min(self.max_backoff, self.base_backoff * 2**attempt) * random.uniform(0.5, 1.0)
+        # The pause is shared: nothing else is sent to this provider until it ends.
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        return delay
+
+    def _schedule(self, delay: float) -> None:
+        loop = asyncio.get_running_loop()
+        if self._timer is None or self._timer_loop is not loop:
+            self._timer = loop.call_later(delay, self._wake)
+            self._timer_loop = loop
+
+    def _wake(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._waiters and self.in_flight < self.max_in_flight:
+            _, _, tokens, fut = self._waiters[0]
+            if fut.done():
+                heapq.heappop(self._waiters)
+                continue
+            paused = self._paused_until - time.monotonic()
+            if paused > 0:
+                self._schedule(paused)
+                return
+            if self._bucket is not None and tokens and not self._bucket.consume(tokens):
+                self._schedule(max(0.001, (tokens - self._bucket.available) / self._bucket.refill_rate))
+                return
+            heapq.heappop(self._waiters)
+            self.in_flight += 1
+            fut.set_result(None)
+        get_metrics().set_gauge("llm_scheduler_in_flight", self.in_flight, provider=self.name)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "throttles": self.throttles,
+            "paused_for": max(0.0, self._paused_until - time.monotonic()),
+        }
+
+
+_schedulers: Dict[str, LLMScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_llm_scheduler(name: str) -> LLMScheduler:
+    """Return the process-wide scheduler for provider `name`, creating it on first use."""
+    with _schedulers_lock:
+        scheduler = _schedulers.get(name)
+        if scheduler is None:
+            from src.asoc.core.config import settings
+
+            scheduler = _schedulers[name] = LLMScheduler(
+                name,
+                max_in_flight=settings.LLM_MAX_IN_FLIGHT,
+                tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+                max_retries=settings.LLM_MAX_RETRIES,
+                max_backoff=settings.LLM_MAX_BACKOFF_SECONDS,
+            )
+        return scheduler
+
+
+def reset_llm_schedulers() -> None:
+    """Drop registered schedulers. Intended for tests."""
+    with _schedulers_lock:
+        _schedulers.clear()
@@ -0,0 +1,49 @@
+"""Incremental parsing of a streamed verdict.
+
+The verdict prompt asks for a flat JSON object with the decision fields
+first and the prose `reasoning` last. `VerdictStreamParser` is fed the
+completion as it streams and picks out each top-level field as soon as its
+value is complete. Providers use it to report the verdict before the
+explanation arrives, and to stop generating once every field is in.
+"""
+
+import json
+import re
+from typing import Any, Dict, Optional
+
+# A key and a complete scalar value. A number only counts once something
+# follows it, so "0.8" is not taken from a stream that goes on to "0.85".
+_FIELD = re.compile(
+    r'"(?P<key>\w+)"\s*:\s*(?P<value>true|false|null|"(?:[^"\\]|\\.)*"|-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?(?=\s*[,}\n]))'
+)
+
+
+class VerdictStreamParser:
+    def __init__(self) -> None:
+        self.text = ""
+        self.fields: Dict[str, Any] = {}
+        self._scan = 0
+
+    def feed(self, chunk: str) -> None:
+        self.text += chunk
+        for match in _FIELD.finditer(self.text, self._scan):
+            self.fields.setdefault(match["key"], json.loads(match["value"]))
+            self._scan = match.end()
+
+    def has(self, *keys: str) -> bool:
+        return all(key in self.fields for key in keys)
+
+    def partial(self, key: str) -> Optional[str]:
+        """The text received so far of string field `key`, while it is still open."""
+        if key in self.fields:
+            return None
+        opened = re.search(rf'"{re.escape(key)}"\s*:\s*"', self.text[self._scan:])
+        if opened is None:
+            return None
+        raw = self.text[self._scan + opened.end():]
+        if raw.endswith("\\"):
+            raw = raw[:-1]
+        try:
+            return json.loads(f'"{raw}"')
+        except ValueError:
+            return raw
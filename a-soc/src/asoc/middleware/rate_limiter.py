@@ -46,6 +46,15 @@ class TokenBucket:
         self._refill()
         return self._tokens
 
+    @property
+    def refill_rate(self) -> float:
+        return self._refill_rate
+
+    @refill_rate.setter
+    def refill_rate(self, value: float) -> None:
+        self._refill()  # settle tokens accrued at the old rate first
+        self._refill_rate = value
+
 
 # ── Agent Rate Limits ─────────────────────────────────────────────────────
 # Tuned by risk level: destructive agents get lower limits.
@@ -51,13 +51,9 @@ def _make_agent_node(agent_cls: Callable, **kwargs) -> Callable:
 
 
 def _telemetry_node(state: AgentState) -> dict:
-    from src.asoc.agents.telemetry import AWSCloudTrailProvider, TelemetryAgent
-    from src.asoc.core.config import settings
+    from src.asoc.agents.telemetry import TelemetryAgent, create_cloud_provider
 
-    aws_key = settings.AWS_ACCESS_KEY_ID.get_secret_value() if settings.AWS_ACCESS_KEY_ID else None
-    aws_secret = settings.AWS_SECRET_ACCESS_KEY.get_secret_value() if settings.AWS_SECRET_ACCESS_KEY else None
-    provider = AWSCloudTrailProvider(region=settings.AWS_REGION, access_key_id=aws_key, secret_access_key=aws_secret)
-    agent = TelemetryAgent(provider=provider)
+    agent = TelemetryAgent(provider=create_cloud_provider())
     result = _run_async(agent.run_cycle(state))
 
     updates = {k: v for k, v in result.items() if k != "messages"}
@@ -0,0 +1,3 @@
+from src.asoc.rules.engine import RuleEngine, RuleError, RuleHit, RuleSet, compile_rules
+
+__all__ = ["RuleEngine", "RuleError", "RuleHit", "RuleSet", "compile_rules"]
@@ -0,0 +1,419 @@
+"""Declarative detection rules.
+
+Rules are written in a Sigma-like YAML format:
+
+    - id: console-login-failures
+      title: Repeated failed console logins
+      event_name: ConsoleLogin            # name, wildcard or list; omit to match any event
+      match:                              # every field must match; a list means any of
+        responseElements.ConsoleLogin: Failure
+        sourceIPAddress|cidr: [10.0.0.0/8, 192.168.0.0/16]
+        userAgent: "*python*"             # * and ? are wildcards
+      keywords: [brute force]             # substrings anywhere in the event
+      count: {by: sourceIPAddress, window_seconds: 300, threshold: 5}
+      risk_boost: 0.25
+      technique: T1110
+
+Field paths are dotted and fan out over lists. Field modifiers: `contains`,
+`startswith`, `endswith`, `re`, `cidr`, `exists`, `gt`, `gte`, `lt`,
+`lte`, and `not` (negates the rest, e.g. `field|not|contains`). String
+comparisons ignore case, as in Sigma.
+
+`compile_rules` turns rule documents into a `RuleSet`. Each condition becomes
+a closure built once. Rules are indexed by event name, and the rules that
+apply to a given name are resolved once and cached. An event is then checked
+only against the rules that can match it, in one pass, so adding a rule for
+other events costs nothing. Only rules with no `event_name` run on every
+event. `RuleEngine` reloads its files when they change and keeps the running
+counts of rules that survive a reload.
+"""
+
+import fnmatch
+import ipaddress
+import json
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import yaml
+
+from src.asoc.core.logging import get_logger
+from src.asoc.core.watermarks import event_timestamp
+
+logger = get_logger("asoc.rules")
+
+BUILTIN_RULES = Path(__file__).with_name("builtin.yml")
+_RESOLVED_CACHE_SIZE = 10_000
+_SWEEP_EVERY = 10_000
+
+Predicate = Callable[[Dict[str, Any]], bool]
+
+
+class RuleError(ValueError):
+    """A rule document that cannot be compiled."""
+
+
+@dataclass(frozen=True)
+class CountSpec:
+    by: Tuple[Callable[[Dict[str, Any]], List[Any]], ...]
+    window_seconds: float
+    threshold: int
+
+
+@dataclass(frozen=True)
+class Rule:
+    id: str
+    title: str
+    conditions: Tuple[Predicate, ...] = field(repr=False)
+    count: Optional[CountSpec] = field(default=None, repr=False)
+    risk_boost: float = 0.0
+    technique: Optional[str] = None
+    severity: str = "medium"
+    tags: Tuple[str, ...] = ()
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        for condition in self.conditions:
+            if not condition(event):
+                return False
+        return True
+
+
+@dataclass
+class RuleHit:
+    rule_id: str
+    title: str
+    risk_boost: float
+    technique: Optional[str]
+    severity: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rule_id": self.rule_id,
+            "title": self.title,
+            "risk_boost": self.risk_boost,
+            "technique": self.technique,
+            "severity": self.severity,
+        }
+
+
+def _getter(path: str) -> Callable[[Dict[str, Any]], List[Any]]:
+    """Values at a dotted `path`, fanning out over lists; empty when absent."""
+    keys = tuple(path.split("."))
+    if len(keys) == 1:
+        key = keys[0]
+
+        def get_one(event: Dict[str, Any]) -> List[Any]:
+            value = event.get(key)
+            if value is None:
+                return []
+            return value if isinstance(value, list) else [value]
+
+        return get_one
+
+    def get_path(event: Dict[str, Any]) -> List[Any]:
+        values: List[Any] = [event]
+        for key in keys:
+            found = []
+            for value in values:
+                if isinstance(value, dict):
+                    if value.get(key) is not None:
+                        found.append(value[key])
+                elif isinstance(value, list):
+                    found.extend(item[key] for item in value if isinstance(item, dict) and item.get(key) is not None)
+            if not found:
+                return []
+            values = found
+        flat: List[Any] = []
+        for value in values:
+            if isinstance(value, list):
+                flat.extend(value)
+            else:
+                flat.append(value)
+        return flat
+
+    return get_path
+
+
+def _wildcard(pattern: str) -> "re.Pattern[str]":
+    return re.compile(fnmatch.translate(pattern), re.IGNORECASE | re.DOTALL)
+
+
+def _as_list(value: Any) -> List[Any]:
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _value_test(op: str, expected: List[Any]) -> Callable[[Any], bool]:
+    """A test of one event value against any of `expected`, under modifier `op`."""
+    if op == "eq":
+        exact = {str(v).lower() for v in expected if not (isinstance(v, str) and ("*" in v or "?" in v))}
+        globs = [_wildcard(v) for v in expected if isinstance(v, str) and ("*" in v or "?" in v)]
+        if not globs:
+            return lambda value: str(value).lower() in exact
+        return lambda value: str(value).lower() in exact or any(g.match(str(value)) for g in globs)
+    if op in ("contains", "startswith", "endswith"):
+        escaped = "|".join(re.escape(str(v)) for v in expected)
+        pattern = {"contains": f"(?:{escaped})", "startswith": f"^(?:{escaped})", "endswith": f"(?:{escaped})$"}[op]
+        regex = re.compile(pattern, re.IGNORECASE)
+        return lambda value: regex.search(str(value)) is not None
+    if op == "re":
+        regexes = [re.compile(str(v)) for v in expected]
+        return lambda value: any(r.search(str(value)) for r in regexes)
+    if op == "cidr":
+        networks = tuple(ipaddress.ip_network(str(v), strict=False) for v in expected)
+
+        def in_networks(value: Any) -> bool:
+            try:
+                address = ipaddress.ip_address(str(value))
+            except ValueError:
+                return False
+            return any(address in network for network in networks)
+
+        return in_networks
+    if op in ("gt", "gte", "lt", "lte"):
+        if len(expected) != 1 or _number(expected[0]) is None:
+            raise RuleError(f"'{op}' needs a single number")
+        bound = float(expected[0])
+        compare = {
+            "gt": lambda n: n > bound,
+            "gte": lambda n: n >= bound,
+            "lt": lambda n: n < bound,
+            "lte": lambda n: n <= bound,
+        }[op]
+
+        def numeric(value: Any) -> bool:
+            number = _number(value)
+            return number is not None and compare(number)
+
+        return numeric
+    raise RuleError(f"unknown modifier '{op}'")
+
+
+def _condition(key: str, expected: Any) -> Predicate:
+    path, *modifiers = key.split("|")
+    get = _getter(path)
+    negate = "not" in modifiers
+    modifiers = [m for m in modifiers if m != "not"]
+    if len(modifiers) > 1:
+        raise RuleError(f"field '{key}' has more than one modifier")
+    op = modifiers[0] if modifiers else "eq"
+    if op == "exists":
+        want = bool(expected)
+        return lambda event: (len(get(event)) > 0) is (want is not negate)
+    if expected is None:
+        return lambda event: (len(get(event)) == 0) is not negate
+    test = _value_test(op, _as_list(expected))
+    if negate:
+        return lambda event: not any(test(value) for value in get(event))
+    return lambda event: any(test(value) for value in get(event))
+
+
+def _keywords(words: Sequence[str]) -> Predicate:
+    regex = re.compile("|".join(re.escape(str(w)) for w in words), re.IGNORECASE)
+    return lambda event: regex.search(json.dumps(event, default=str)) is not None
+
+
+def compile_rule(doc: Dict[str, Any]) -> Tuple[Rule, List[str]]:
+    """Compile one rule document; also return its `event_name` patterns."""
+    if not isinstance(doc, dict) or not doc.get("id"):
+        raise RuleError(f"rule without an id: {doc!r}")
+    rule_id = str(doc["id"])
+    try:
+        conditions: List[Predicate] = [_condition(str(k), v) for k, v in (doc.get("match") or {}).items()]
+        if doc.get("keywords"):
+            conditions.append(_keywords(_as_list(doc["keywords"])))
+        count = None
+        if doc.get("count"):
+            spec = doc["count"]
+            count = CountSpec(
+                by=tuple(_getter(str(p)) for p in _as_list(spec.get("by") or [])),
+                window_seconds=float(spec["window_seconds"]),
+                threshold=int(spec["threshold"]),
+            )
+            if count.window_seconds <= 0 or count.threshold < 1:
+                raise RuleError("count needs a positive window_seconds and threshold")
+        rule = Rule(
+            id=rule_id,
+            title=str(doc.get("title") or rule_id),
+            conditions=tuple(conditions),
+            count=count,
+            risk_boost=float(doc.get("risk_boost", 0.0)),
+            technique=doc.get("technique"),
+            severity=str(doc.get("severity", "medium")),
+            tags=tuple(_as_list(doc.get("tags") or [])),
+        )
+    except RuleError as e:
+        raise RuleError(f"rule '{rule_id}': {e}") from None
+    except (KeyError, TypeError, ValueError, re.error) as e:
+        raise RuleError(f"rule '{rule_id}': {e}") from e
+    names = [str(n) for n in _as_list(doc.get("event_name") or [])]
+    return rule, names
+
+
+class RuleSet:
+    def __init__(self, rules: Iterable[Tuple[Rule, List[str]]] = ()):
+        self.rules: Dict[str, Rule] = {}
+        self._by_name: Dict[str, List[Rule]] = {}
+        self._patterned: List[Tuple["re.Pattern[str]", Rule]] = []
+        self._unnamed: List[Rule] = []
+        self._resolved: Dict[str, Tuple[Rule, ...]] = {}
+        self._counts: Dict[Tuple[str, Tuple[str, ...]], Deque[float]] = {}
+        self._since_sweep = 0
+        for rule, names in rules:
+            if rule.id in self.rules:
+                raise RuleError(f"duplicate rule id '{rule.id}'")
+            self.rules[rule.id] = rule
+            if not names:
+                self._unnamed.append(rule)
+            for name in names:
+                if "*" in name or "?" in name:
+                    self._patterned.append((_wildcard(name), rule))
+                else:
+                    self._by_name.setdefault(name, []).append(rule)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def candidates(self, event_name: str) -> Tuple[Rule, ...]:
+        """The rules that can match an event called `event_name`."""
+        resolved = self._resolved.get(event_name)
+        if resolved is None:
+            rules = list(self._by_name.get(event_name, ()))
+            rules += [rule for pattern, rule in self._patterned if pattern.match(event_name) and rule not in rules]
+            rules += self._unnamed
+            if len(self._resolved) >= _RESOLVED_CACHE_SIZE:
+                self._resolved.clear()
+            resolved = self._resolved[event_name] = tuple(rules)
+        return resolved
+
+    def evaluate(self, event: Dict[str, Any], now: Optional[float] = None, stateful: bool = True) -> List[RuleHit]:
+        """The rules `event` matches. With `stateful=False`, `count` rules are skipped and their counts left alone."""
+        name = event.get("eventName") or event.get("EventName") or event.get("event_name") or ""
+        hits: List[RuleHit] = []
+        for rule in self.candidates(name):
+            if rule.count is not None and not stateful:
+                continue
+            if rule.matches(event) and (rule.count is None or self._counted(rule, event, now)):
+                hits.append(RuleHit(rule.id, rule.title, rule.risk_boost, rule.technique, rule.severity))
+        return hits
+
+    def _counted(self, rule: Rule, event: Dict[str, Any], now: Optional[float]) -> bool:
+        spec = rule.count
+        t = event_timestamp(event, now if now is not None else time.time())
+        key = (rule.id, tuple(",".join(sorted(map(str, get(event)))) for get in spec.by))
+        window = self._counts.get(key)
+        if window is None:
+            window = self._counts[key] = deque()
+        window.append(t)
+        while window and window[0] < t - spec.window_seconds:
+            window.popleft()
+        self._since_sweep += 1
+        if self._since_sweep >= _SWEEP_EVERY:
+            self._sweep(t)
+        if len(window) >= spec.threshold:
+            # One hit per burst: the count starts again after firing.
+            window.clear()
+            return True
+        return False
+
+    def _sweep(self, now: float) -> None:
+        self._since_sweep = 0
+        for key in [k for k, w in self._counts.items() if not w or w[-1] < now - self.rules[k[0]].count.window_seconds]:
+            del self._counts[key]
+
+    def adopt_counts(self, previous: "RuleSet") -> None:
+        """Carry over running counts for rules that are still defined."""
+        self._counts = {k: w for k, w in previous._counts.items() if k[0] in self.rules and self.rules[k[0]].count}
+
+
+def load_rule_documents(path: Path) -> List[Dict[str, Any]]:
+    docs: List[Dict[str, Any]] = []
+    for doc in yaml.safe_load_all(path.read_text()):
+        if doc is None:
+            continue
+        if isinstance(doc, dict) and "rules" in doc:
+            doc = doc["rules"]
+        docs.extend(doc if isinstance(doc, list) else [doc])
+    return docs
+
+
+def compile_rules(docs: Iterable[Dict[str, Any]]) -> RuleSet:
+    return RuleSet(compile_rule(doc) for doc in docs if not (isinstance(doc, dict) and doc.get("enabled") is False))
+
+
+def _rule_files(paths: Iterable[Path]) -> List[Path]:
+    files: List[Path] = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(sorted(p for p in path.iterdir() if p.suffix in (".yml", ".yaml")))
+        elif path.exists():
+            files.append(path)
+    return files
+
+
+class RuleEngine:
+    """A `RuleSet` loaded from files and reloaded when they change."""
+
+    def __init__(self, paths: Sequence[str] = (str(BUILTIN_RULES),), reload_seconds: float = 10.0):
+        self.paths = [Path(p) for p in paths]
+        self.reload_seconds = reload_seconds
+        self._mtimes: Dict[Path, float] = {}
+        self._checked = 0.0
+        self.rules = RuleSet()
+        self.reload()
+
+    @classmethod
+    def from_settings(cls, config=None) -> "RuleEngine":
+        from src.asoc.core.config import settings
+
+        config = config or settings
+        paths = [str(BUILTIN_RULES)] if config.DETECTION_RULES_BUILTIN else []
+        paths += [p.strip() for p in (config.DETECTION_RULES_PATHS or "").split(",") if p.strip()]
+        return cls(paths, reload_seconds=config.DETECTION_RULES_RELOAD_SECONDS)
+
+    def _current_mtimes(self) -> Dict[Path, float]:
+        mtimes = {}
+        for path in _rule_files(self.paths):
+            try:
+                mtimes[path] = path.stat().st_mtime
+            except OSError:
+                continue
+        return mtimes
+
+    def reload(self) -> bool:
+        """Recompile every rule file. A broken file leaves the current rules in place."""
+        mtimes = self._current_mtimes()
+        try:
+            docs = [doc for path in mtimes for doc in load_rule_documents(path)]
+            rules = compile_rules(docs)
+        except (OSError, yaml.YAMLError, RuleError) as e:
+            logger.error("detection_rules_reload_failed", error=str(e))
+            self._mtimes = mtimes
+            return False
+        rules.adopt_counts(self.rules)
+        self.rules = rules
+        self._mtimes = mtimes
+        logger.info("detection_rules_loaded", rules=len(rules), files=len(mtimes))
+        return True
+
+    def maybe_reload(self) -> bool:
+        """Reload if `reload_seconds` have passed and a rule file changed."""
+        now = time.monotonic()
+        if now - self._checked < self.reload_seconds:
+            return False
+        self._checked = now
+        if self._current_mtimes() == self._mtimes:
+            return False
+        return self.reload()
+
+    def evaluate(self, event: Dict[str, Any], now: Optional[float] = None, stateful: bool = True) -> List[RuleHit]:
+        return self.rules.evaluate(event, now, stateful)
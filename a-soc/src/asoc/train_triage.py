@@ -0,0 +1,35 @@
+"""Train a new version of the detection triage model from the event store.
+
+    python -m src.asoc.train_triage [--dir data/triage_models] [--events-file data/events.jsonl]
+"""
+import argparse
+import asyncio
+import json
+import os
+from typing import Optional, Sequence
+
+from src.asoc.agents.triage_model import examples_from_records, load_records, train
+from src.asoc.core.config import settings
+from src.asoc.core.event_store import EventStore, PostgresEventStore
+
+
+async def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Train the detection triage model from the event store")
+    parser.add_argument("--dir", default=settings.DETECTION_TRIAGE_MODEL_DIR)
+    parser.add_argument("--events-file", help="JSONL event store file; default is Postgres when DATABASE_URL is set")
+    parser.add_argument("--limit", type=int, default=100_000)
+    parser.add_argument("--epochs", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    if args.events_file:
+        store = EventStore(args.events_file)
+    else:
+        store = PostgresEventStore() if os.getenv("DATABASE_URL") else EventStore()
+    events, labels, baselines = examples_from_records(await load_records(store, limit=args.limit))
+    model = train(events, labels, baselines, epochs=args.epochs)
+    path = model.save(args.dir)
+    print(f"wrote {path} (version {model.version}): {json.dumps(model.metrics)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
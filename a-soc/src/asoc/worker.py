@@ -3,6 +3,7 @@ import asyncio
 import os
 import signal
 import sys
+from typing import Optional
 
 from src.asoc.core.logging import get_logger
 
@@ -18,7 +19,7 @@ def _handle_signal(sig: signal.Signals) -> None:
 
 async def _process_incidents() -> None:
     """Poll for pending incidents and run them through the workflow graph."""
-    from src.asoc.core.checkpoint import get_or_create_checkpointer
+    from src.asoc.core.checkpoint_config import get_or_create_checkpointer
     from src.asoc.orchestration.workflow import build_graph
 
     logger.info("worker_initializing")
@@ -27,15 +28,61 @@ async def _process_incidents() -> None:
 
     logger.info("worker_ready", graph_nodes=list(graph.nodes.keys()) if hasattr(graph, "nodes") else "unknown")
 
+    compaction_task = _start_checkpoint_compaction(checkpointer)
+    ingest = await _start_syslog_ingest()
+
     while not _shutdown.is_set():
         try:
             await asyncio.sleep(float(os.getenv("WORKER_POLL_INTERVAL", "5")))
         except asyncio.CancelledError:
             break
 
+    if ingest is not None:
+        await ingest.stop()
+    if compaction_task is not None:
+        await asyncio.gather(compaction_task, return_exceptions=True)
     logger.info("worker_stopped")
 
 
+def _start_checkpoint_compaction(checkpointer) -> Optional[asyncio.Task]:
+    """Start background checkpoint compaction for durable checkpointers."""
+    from src.asoc.core.checkpoint_compaction import CheckpointCompactor, PostgresCheckpointStore
+    from src.asoc.core.config import settings
+    from src.asoc.core.sqlite_checkpoint import SQLiteCheckpointSaver, SQLiteCheckpointStore
+
+    if isinstance(checkpointer, SQLiteCheckpointSaver):
+        store = SQLiteCheckpointStore(checkpointer)
+    elif type(checkpointer).__name__ == "AsyncPostgresSaver":
+        store = PostgresCheckpointStore()
+    else:
+        logger.info("checkpoint_compaction_skipped", checkpointer=type(checkpointer).__name__)
+        return None
+    compactor = CheckpointCompactor(store)
+    return asyncio.create_task(compactor.run_forever(settings.CHECKPOINT_COMPACTION_INTERVAL_SECONDS, stop=_shutdown))
+
+
+async def _start_syslog_ingest():
+    """Start the push ingestion listener when a syslog port is configured."""
+    from src.asoc.core.config import settings
+
+    if not (settings.SYSLOG_UDP_PORT or settings.SYSLOG_TCP_PORT):
+        return None
+    from src.asoc.agents.syslog_ingest import SyslogIngestServer
+    from src.asoc.agents.telemetry import TelemetryAgent
+
+    server = SyslogIngestServer(
+        TelemetryAgent(),
+        host=settings.SYSLOG_INGEST_HOST,
+        udp_port=settings.SYSLOG_UDP_PORT or None,
+        tcp_port=settings.SYSLOG_TCP_PORT or None,
+        batch_size=settings.SYSLOG_BATCH_SIZE,
+        batch_ms=settings.SYSLOG_BATCH_MS,
+        queue_size=settings.SYSLOG_QUEUE_SIZE,
+    )
+    await server.start()
+    return server
+
+
 async def main() -> None:
     loop = asyncio.get_running_loop()
     for sig in (signal.SIGINT, signal.SIGTERM):
@@ -2,6 +2,8 @@ import os
 import sys
 from pathlib import Path
 
+import pytest
+
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 # Suppress deprecation warnings during tests
@@ -10,3 +12,12 @@ os.environ["PYTHONWARNINGS"] = "ignore::DeprecationWarning"
 # Set test environment variables
 os.environ["WS_API_TOKEN"] = "test-token"
 os.environ["HMAC_SECRET"] = "test-hmac-secret-for-integration-tests"
+
+
+@pytest.fixture(autouse=True)
+def _reset_api_pacers():
+    """API pacers are process-wide; give every test fresh quotas."""
+    from src.asoc.core.api_pacing import reset_api_pacers
+
+    reset_api_pacers()
+    yield
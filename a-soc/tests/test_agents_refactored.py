@@ -4,7 +4,7 @@ from unittest.mock import AsyncMock, MagicMock, patch
 from src.asoc.agents.message import ASOCMessage, MessageType, Priority
 from src.asoc.agents.observation import AgentObservation, ObservationNextState
 from src.asoc.agents.state import AgentState, create_initial_state
-from src.asoc.agents.tools import ToolRegistry
+from src.asoc.agents.tools import ToolArgumentError, ToolRegistry
 from src.asoc.agents.detection import DetectionAgent
 from src.asoc.agents.supervisor import SupervisorAgent
 from src.asoc.agents.forensics import ForensicsAgent
@@ -79,6 +79,33 @@ class TestToolRegistry:
         assert registry.validate_tool_call("unknown_tool") is False
         assert registry.validate_tool_call("safe_tool", rate_limited=True) is False
 
+    @pytest.mark.asyncio
+    async def test_execute_validates_arguments(self):
+        async def block_ip(ip: str, reason: str = "", retries: int = 0) -> bool:
+            return True
+
+        registry = ToolRegistry()
+        registry.register(
+            "block_ip", block_ip, "desc", input_schema={"ip": {"type": "string"}, "retries": {"type": "integer"}}
+        )
+        assert await registry.execute("block_ip", ip="1.2.3.4", reason=None) is True
+        with pytest.raises(ToolArgumentError, match=r"missing argument\(s\) \['ip'\]"):
+            await registry.execute("block_ip", target="1.2.3.4")
+        with pytest.raises(ToolArgumentError, match="unexpected"):
+            await registry.execute("block_ip", ip="1.2.3.4", target="x")
+        with pytest.raises(ToolArgumentError, match="must be string"):
+            await registry.execute("block_ip", ip=1234)
+        with pytest.raises(ToolArgumentError, match="must be integer"):
+            await registry.execute("block_ip", ip="1.2.3.4", retries=True)
+
+    @pytest.mark.asyncio
+    async def test_validator_is_compiled_at_registration(self):
+        registry = ToolRegistry()
+        registry.register("test_tool", AsyncMock(return_value=1), "desc", input_schema={"n": {"type": "number"}})
+        validate = registry.get("test_tool").validate
+        assert await registry.execute("test_tool", n=2.5, anything="goes") == 1
+        assert registry.get("test_tool").validate is validate
+
 
 # ── Observation Tests ────────────────────────────────────────────────────────
 
@@ -0,0 +1,115 @@
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from src.asoc.agents.telemetry import AWSCloudTrailProvider
+from src.asoc.core.api_pacing import AdaptivePacer, get_api_pacer, is_throttling_error
+
+
+def _throttle() -> ClientError:
+    return ClientError({"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}}, "LookupEvents")
+
+
+class TestAdaptivePacer:
+    def test_detects_throttling_errors(self):
+        assert is_throttling_error(_throttle())
+        assert not is_throttling_error(ClientError({"Error": {"Code": "AccessDenied"}}, "LookupEvents"))
+        assert not is_throttling_error(ValueError("boom"))
+
+    def test_paces_calls_to_rate(self):
+        pacer = AdaptivePacer("test", rate=20.0, burst=1)
+        start = time.perf_counter()
+        for _ in range(5):
+            pacer.call(lambda: None)
+        assert time.perf_counter() - start >= 0.18
+
+    def test_throttle_halves_rate_and_success_recovers(self):
+        pacer = AdaptivePacer("test", rate=1000.0, burst=1)
+        outcomes = iter([_throttle(), _throttle(), "ok"])
+
+        def _fn():
+            outcome = next(outcomes)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        assert pacer.call(_fn) == "ok"
+        assert pacer.throttles == 2
+        assert pacer.rate == pytest.approx(250.0 + 100.0)
+        for _ in range(10):
+            pacer.call(lambda: None)
+        assert pacer.rate == 1000.0
+
+    def test_non_throttling_errors_are_not_retried(self):
+        pacer = AdaptivePacer("test", rate=1000.0)
+        fn = MagicMock(side_effect=ClientError({"Error": {"Code": "AccessDenied"}}, "LookupEvents"))
+        with pytest.raises(ClientError):
+            pacer.call(fn)
+        assert fn.call_count == 1
+
+    def test_gives_up_after_max_retries(self):
+        pacer = AdaptivePacer("test", rate=1000.0, max_retries=2)
+        fn = MagicMock(side_effect=_throttle())
+        with pytest.raises(ClientError):
+            pacer.call(fn)
+        assert fn.call_count == 3
+
+    def test_stats_report_achieved_vs_allowed(self):
+        pacer = AdaptivePacer("test", rate=10.0, burst=1)
+        for _ in range(4):
+            pacer.call(lambda: None)
+        stats = pacer.stats()
+        assert stats["allowed_rps"] == 10.0
+        assert 0 < stats["achieved_rps"] <= 14.0
+        assert stats["calls"] == 4
+
+    def test_registry_shares_pacer_per_name(self):
+        assert get_api_pacer("cloudtrail:a", 2.0) is get_api_pacer("cloudtrail:a", 2.0)
+        assert get_api_pacer("cloudtrail:a", 2.0) is not get_api_pacer("cloudtrail:b", 2.0)
+
+
+@pytest.mark.asyncio
+class TestCloudTrailPacing:
+    def _event(self):
+        return {"EventId": "e1", "EventName": "StopLogging", "EventTime": datetime.now(timezone.utc) - timedelta(minutes=1)}
+
+    def _client(self, *page_streams):
+        client = MagicMock()
+        client.get_paginator.return_value.paginate.side_effect = page_streams
+        return client
+
+    def _throttled_pages(self, pages=()):
+        yield from pages
+        raise _throttle()
+
+    async def test_throttled_lookup_is_retried_not_mocked(self):
+        provider = AWSCloudTrailProvider(region="eu-west-1", lookup_rate=1000)
+        provider._client = self._client(self._throttled_pages(), iter([{"Events": [self._event()]}]))
+        events = await provider.fetch_events(max_results=5)
+        assert [e.event_id for e in events] == ["e1"]
+        assert provider.pacing_stats()["throttles"] == 1
+
+    async def test_throttled_page_resumes_from_last_token(self):
+        provider = AWSCloudTrailProvider(region="eu-west-3", lookup_rate=1000)
+        first = {"Events": [self._event()], "NextToken": "page-2"}
+        provider._client = self._client(self._throttled_pages([first]), iter([{"Events": [dict(self._event(), EventId="e2")]}]))
+        events = await provider.fetch_events(max_results=5)
+        assert [e.event_id for e in events] == ["e1", "e2"]
+        resumed = provider._client.get_paginator.return_value.paginate.call_args_list[1]
+        assert resumed.kwargs["PaginationConfig"]["StartingToken"] == "page-2"
+
+    async def test_exhausted_retries_return_no_events(self):
+        provider = AWSCloudTrailProvider(region="eu-west-2", lookup_rate=1000)
+        provider.pacer.max_retries = 1
+        provider._client = self._client(self._throttled_pages(), self._throttled_pages())
+        assert await provider.fetch_events(max_results=5) == []
+
+    async def test_providers_for_same_account_region_share_quota(self):
+        a = AWSCloudTrailProvider(region="us-west-2", account_id="1", event_names=["StopLogging"])
+        b = AWSCloudTrailProvider(region="us-west-2", account_id="1")
+        c = AWSCloudTrailProvider(region="us-east-2", account_id="1")
+        assert a.pacer is b.pacer
+        assert a.pacer is not c.pacer
@@ -0,0 +1,118 @@
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from src.asoc.agents.baseline import BaselineStore, entity_keys
+from src.asoc.agents.detection import DetectionAgent
+from src.asoc.core.config import settings
+from src.asoc.core.metrics import get_metrics
+from src.asoc.llm.providers import MockProvider
+
+BASE = 1_700_000_000
+
+
+def _event(i, name="GetObject", region="us-east-1", ip="10.0.0.1", user="arn:aws:iam::1:user/alice", at=None):
+    return {
+        "eventName": name,
+        "awsRegion": region,
+        "sourceIPAddress": ip,
+        "userIdentity": {"arn": user},
+        "eventTime": BASE + 60 * i if at is None else at,
+    }
+
+
+def _history(n=100, **kwargs):
+    return [_event(i, name="GetObject" if i % 3 else "PutObject", **kwargs) for i in range(n)]
+
+
+class TestBaselineStore:
+    def test_entity_keys(self):
+        event = {"userIdentity": {"userName": "bob"}, "resources": [{"ARN": "arn:aws:s3:::logs"}]}
+        assert entity_keys(event) == ["principal:bob", "resource:arn:aws:s3:::logs"]
+        assert entity_keys({"eventName": "x"}) == []
+
+    def test_scored_only_after_warm_up(self):
+        store = BaselineStore(min_observations=20)
+        scores = store.observe(_history(20) + [_event(20, region="ap-south-1")])
+        assert all(s.zscore == 0.0 for s in scores[:20])
+        assert scores[-1].observations == 20
+        assert scores[-1].zscore > 5
+
+    def test_new_region_and_api_stand_out(self):
+        store = BaselineStore(min_observations=10)
+        usual = store.observe(_history())[-1]
+        odd = store.observe([_event(100, name="CreateAccessKey", region="ap-south-1")])[0]
+        assert usual.zscore < 2
+        assert odd.features["region"] > 5 and odd.features["api"] > 5
+        assert odd.features["source_ip"] < 1
+        assert odd.entity == "principal:arn:aws:iam::1:user/alice"
+
+    def test_burst_raises_rate_score(self):
+        store = BaselineStore(min_observations=10)
+        store.observe(_history())
+        burst = store.observe([_event(0, at=BASE + 60 * 105 + i) for i in range(40)])
+        assert burst[-1].features["rate"] > 3
+        assert burst[-1].features["rate"] > burst[0].features["rate"]
+
+    def test_batch_matches_one_at_a_time(self):
+        events = _history(60) + _history(60, user="arn:aws:iam::1:user/bob", ip="10.0.0.2")
+        events.sort(key=lambda e: e["eventTime"])
+        batched, single = BaselineStore(min_observations=5), BaselineStore(min_observations=5)
+        together = batched.observe(events)
+        apart = [single.observe([e])[0] for e in events]
+        assert [s.features for s in together] == [s.features for s in apart]
+        np.testing.assert_allclose(batched._mean[:2], single._mean[:2])
+
+    def test_snapshot_round_trip(self, tmp_path):
+        path = tmp_path / "baselines.npz"
+        store = BaselineStore(min_observations=10, path=str(path))
+        store.observe(_history())
+        store.snapshot()
+        restored = BaselineStore(min_observations=10, path=str(path))
+        assert len(restored) == 1
+        odd = _event(100, region="ap-south-1")
+        assert restored.observe([odd])[0].features == store.observe([odd])[0].features
+
+    def test_unreadable_snapshot_starts_empty(self, tmp_path):
+        path = tmp_path / "baselines.npz"
+        path.write_bytes(b"not a snapshot")
+        assert len(BaselineStore(path=str(path))) == 0
+
+    def test_entity_cap(self):
+        store = BaselineStore(max_entities=1)
+        scores = store.observe([_event(0), _event(1, user="arn:aws:iam::1:user/bob")])
+        assert len(store) == 1
+        assert scores[1].entity is None
+
+    def test_least_recently_seen_entity_is_evicted_at_the_cap(self):
+        store = BaselineStore(max_entities=2)
+        alice, bob, carol = (f"arn:aws:iam::1:user/{name}" for name in ("alice", "bob", "carol"))
+        store.observe([_event(0), _event(1, user=bob)])
+        store.observe([_event(2, user=alice)])
+        evictions = get_metrics().get_counter("detection_baseline_evictions_total")
+        score = store.observe([_event(3, user=carol)])[0]
+        assert score.entity == f"principal:{carol}" and score.observations == 0
+        assert set(store._index) == {f"principal:{alice}", f"principal:{carol}"}
+        assert store.observe([_event(4, user=alice)])[0].observations == 2
+        assert get_metrics().get_counter("detection_baseline_evictions_total") - evictions == 1
+
+
+@pytest.mark.asyncio
+class TestDetectionBaseline:
+    async def test_anomaly_raises_risk_score(self, tmp_path):
+        with patch.multiple(settings, DETECTION_BASELINE_MIN_OBSERVATIONS=10, DETECTION_BASELINE_PATH=str(tmp_path / "b.npz")):
+            agent = DetectionAgent(provider=MockProvider())
+        agent._baselines.observe(_history())
+        usual, odd = await agent.analyze_threats([
+            _event(100),
+            _event(101, region="ap-south-1", ip="203.0.113.7"),
+        ])
+        assert odd.payload["baseline"]["zscore"] >= settings.DETECTION_BASELINE_ZSCORE
+        assert odd.payload["risk_score"] > usual.payload["risk_score"]
+
+    async def test_disabled(self):
+        with patch.object(settings, "DETECTION_BASELINE_ENABLED", False):
+            agent = DetectionAgent(provider=MockProvider())
+        alert = await agent.analyze_threat(_event(0))
+        assert alert.payload["baseline"] is None
@@ -0,0 +1,125 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.asoc.agents.message import ASOCMessage, MessageType, Priority
+from src.asoc.agents.telemetry import CloudEvent, TelemetryAgent
+from src.asoc.core.event_store import PostgresEventStore
+from src.asoc.core.message_bus import STREAM_PREFIX, MessageBus
+from src.asoc.core.metrics import get_metrics
+
+
+def _event(i: int) -> CloudEvent:
+    return CloudEvent(
+        event_id=f"e{i}",
+        event_name="ConsoleLogin",
+        event_time="2026-01-01T00:00:00Z",
+        source_ip="1.2.3.4",
+        user_identity={"type": "IAMUser", "userName": "alice"},
+        resources=[],
+        raw={},
+    )
+
+
+def _pipelined_redis():
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[])
+    pipe.__aenter__ = AsyncMock(return_value=pipe)
+    pipe.__aexit__ = AsyncMock(return_value=False)
+    redis = MagicMock()
+    redis.pipeline.return_value = pipe
+    redis.xadd = AsyncMock()
+    return redis, pipe
+
+
+@pytest.mark.asyncio
+class TestBatchPublish:
+    async def test_publish_batch_uses_one_pipeline(self):
+        bus = MessageBus()
+        bus._redis, pipe = _pipelined_redis()
+        ids = await bus.publish_batch("broadcast", [{"n": 1}, {"n": 2}, {"n": 3}])
+        assert len(set(ids)) == 3
+        bus._redis.pipeline.assert_called_once_with(transaction=False)
+        assert pipe.xadd.call_count == 3
+        assert pipe.xadd.call_args.args[0] == f"{STREAM_PREFIX}broadcast"
+        pipe.execute.assert_awaited_once()
+        bus._redis.xadd.assert_not_called()
+
+    async def test_empty_batch_is_a_noop(self):
+        bus = MessageBus()
+        bus._redis, _ = _pipelined_redis()
+        assert await bus.publish_batch("broadcast", []) == []
+        bus._redis.pipeline.assert_not_called()
+
+    async def test_send_messages_groups_by_topic(self):
+        agent = TelemetryAgent(provider=AsyncMock())
+        bus = MagicMock()
+        bus.publish_batch = AsyncMock()
+        messages = [
+            ASOCMessage(message_type=MessageType.ALERT, source_agent="t", target_agent=target, payload={}, priority=Priority.HIGH)
+            for target in ("detection", None, "detection")
+        ]
+        with patch("src.asoc.core.message_bus.get_message_bus", AsyncMock(return_value=bus)):
+            await agent.send_messages(messages)
+        calls = {c.args[0]: c.args[1] for c in bus.publish_batch.call_args_list}
+        assert {topic: len(payloads) for topic, payloads in calls.items()} == {"detection": 2, "broadcast": 1}
+        assert calls["detection"][0]["message_type"] == "alert"
+        assert calls["detection"][0]["priority"] == 3
+
+
+@pytest.mark.asyncio
+async def test_append_events_is_one_bulk_write():
+    conn = MagicMock()
+    conn.executemany = AsyncMock()
+    pool = MagicMock()
+    pool.pool.acquire.return_value.__aenter__ = AsyncMock(return_value=conn)
+    pool.pool.acquire.return_value.__aexit__ = AsyncMock(return_value=False)
+    with patch("src.asoc.core.event_store.get_db_pool", AsyncMock(return_value=pool)):
+        records = await PostgresEventStore().append_events("log_ingestion", [{"event_id": "a"}, {"event_id": "b"}], "telemetry")
+    assert [r["payload"]["event_id"] for r in records] == ["a", "b"]
+    conn.executemany.assert_awaited_once()
+    rows = conn.executemany.call_args.args[1]
+    assert [row[4] for row in rows] == ['{"event_id": "a"}', '{"event_id": "b"}']
+
+
+@pytest.mark.asyncio
+class TestBatchedPoll:
+    async def test_poll_emits_one_batch_and_records_rate(self):
+        provider = AsyncMock()
+        provider.fetch_events.return_value = [_event(i) for i in range(25)]
+        agent = TelemetryAgent(provider=provider)
+        agent.send_messages = AsyncMock()
+        agent.log_events = AsyncMock()
+        metrics = get_metrics()
+        before = metrics._counters.get(metrics._key("telemetry_events_ingested_total", {"provider": "aws_cloudtrail"}), 0)
+
+        result = await agent.poll_cloudtrail()
+
+        messages = agent.send_messages.call_args.args[0]
+        assert [m.payload["event"]["eventID"] for m in messages] == [f"e{i}" for i in range(25)]
+        assert messages[0].message_type == MessageType.ALERT
+        assert agent.log_events.await_count == 1
+        assert len(agent.log_events.call_args.args[1]) == 25
+        provider.commit_cursor.assert_awaited_once()
+        assert len(result.payload["events"]) == 25
+        after = metrics._counters[metrics._key("telemetry_events_ingested_total", {"provider": "aws_cloudtrail"})]
+        assert after - before == 25
+
+    async def test_publish_failure_does_not_commit_twice(self):
+        provider = AsyncMock()
+        provider.fetch_events.return_value = [_event(0)]
+        agent = TelemetryAgent(provider=provider)
+        agent.send_messages = AsyncMock(side_effect=RuntimeError("redis down"))
+        agent.log_events = AsyncMock()
+        assert await agent.poll_cloudtrail() is None
+        provider.commit_cursor.assert_not_awaited()
+
+    async def test_emit_events_labels_pushed_source(self):
+        agent = TelemetryAgent(provider=AsyncMock())
+        agent.send_messages = AsyncMock()
+        agent.log_events = AsyncMock()
+        await agent.emit_events([_event(0), _event(1)], provider="syslog")
+        messages = agent.send_messages.call_args.args[0]
+        assert [m.payload["provider"] for m in messages] == ["syslog", "syslog"]
+        assert agent.log_events.call_args.args[1][0]["source"] == "syslog"
+        assert get_metrics().get_counter("telemetry_events_ingested_total", provider="syslog") >= 2
@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+import pytest
+
+from src.asoc.core.checkpoint_compaction import (
+    CheckpointCompactor,
+    CheckpointStore,
+    RetentionPolicy,
+    default_retention_policies,
+)
+
+
+class InMemoryCheckpointStore(CheckpointStore):
+    def __init__(self) -> None:
+        # (namespace, thread_id) -> list of (checkpoint_id, ts), oldest first
+        self.threads: Dict[Tuple[str, str], List[Tuple[str, datetime]]] = {}
+        self.delete_calls = 0
+
+    def add(self, namespace: str, thread_id: str, count: int, last_ts: datetime) -> None:
+        self.threads[(namespace, thread_id)] = [
+            (f"{i:06d}", last_ts - timedelta(seconds=count - 1 - i)) for i in range(count)
+        ]
+
+    async def list_compactable_threads(self, namespace, keep_last, idle_before, limit):
+        result = []
+        for (ns, thread_id), cps in self.threads.items():
+            if ns == namespace and len(cps) > keep_last and cps[-1][1] < idle_before:
+                result.append(thread_id)
+        return result[:limit]
+
+    async def delete_intermediate(self, thread_id, namespace, keep_last, batch_size):
+        self.delete_calls += 1
+        cps = self.threads[(namespace, thread_id)]
+        doomed = max(0, min(batch_size, len(cps) - keep_last))
+        self.threads[(namespace, thread_id)] = cps[doomed:]
+        return doomed
+
+
+NOW = datetime(2026, 7, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class TestRetentionPolicy:
+    def test_keep_last_must_retain_final_checkpoint(self):
+        with pytest.raises(ValueError):
+            RetentionPolicy(namespace="a-soc-incidents", keep_last=0)
+
+    def test_defaults_cover_both_namespaces(self):
+        policies = default_retention_policies()
+        assert set(policies) == {"a-soc-incidents", "a-soc-agents"}
+        assert all(p.keep_last >= 1 for p in policies.values())
+
+
+@pytest.mark.asyncio
+class TestCheckpointCompactor:
+    async def test_keeps_only_final_checkpoint(self):
+        store = InMemoryCheckpointStore()
+        store.add("a-soc-incidents", "incident-1", 12, NOW - timedelta(hours=2))
+        compactor = CheckpointCompactor(
+            store, {"a-soc-incidents": RetentionPolicy("a-soc-incidents", keep_last=1, idle_seconds=3600)}, pause_seconds=0
+        )
+        stats = await compactor.run_once(now=NOW)
+        remaining = store.threads[("a-soc-incidents", "incident-1")]
+        assert [cp for cp, _ in remaining] == ["000011"]
+        assert stats.checkpoints_deleted == 11
+        assert stats.threads_compacted == 1
+
+    async def test_active_threads_are_left_alone(self):
+        store = InMemoryCheckpointStore()
+        store.add("a-soc-incidents", "incident-live", 5, NOW - timedelta(minutes=1))
+        compactor = CheckpointCompactor(
+            store, {"a-soc-incidents": RetentionPolicy("a-soc-incidents", idle_seconds=3600)}, pause_seconds=0
+        )
+        stats = await compactor.run_once(now=NOW)
+        assert len(store.threads[("a-soc-incidents", "incident-live")]) == 5
+        assert stats.checkpoints_deleted == 0
+
+    async def test_deletes_in_bounded_batches(self):
+        store = InMemoryCheckpointStore()
+        store.add("a-soc-agents", "agent-x", 25, NOW - timedelta(hours=3))
+        compactor = CheckpointCompactor(
+            store,
+            {"a-soc-agents": RetentionPolicy("a-soc-agents", keep_last=3, idle_seconds=60)},
+            batch_size=10,
+            pause_seconds=0,
+        )
+        stats = await compactor.run_once(now=NOW)
+        assert len(store.threads[("a-soc-agents", "agent-x")]) == 3
+        assert stats.batches == 3
+        assert stats.checkpoints_deleted == 22
+
+    async def test_policies_apply_per_namespace(self):
+        store = InMemoryCheckpointStore()
+        store.add("a-soc-incidents", "incident-1", 6, NOW - timedelta(hours=2))
+        store.add("a-soc-agents", "agent-1", 6, NOW - timedelta(hours=2))
+        compactor = CheckpointCompactor(
+            store,
+            {
+                "a-soc-incidents": RetentionPolicy("a-soc-incidents", keep_last=2, idle_seconds=60),
+                "a-soc-agents": RetentionPolicy("a-soc-agents", keep_last=1, idle_seconds=60),
+            },
+            pause_seconds=0,
+        )
+        stats = await compactor.run_once(now=NOW)
+        assert len(store.threads[("a-soc-incidents", "incident-1")]) == 2
+        assert len(store.threads[("a-soc-agents", "agent-1")]) == 1
+        assert stats.by_namespace == {"a-soc-incidents": 4, "a-soc-agents": 5}
+
+    async def test_store_failure_does_not_abort_other_namespaces(self):
+        store = InMemoryCheckpointStore()
+        store.add("a-soc-agents", "agent-1", 4, NOW - timedelta(hours=2))
+
+        original = store.list_compactable_threads
+
+        async def flaky(namespace, *args):
+            if namespace == "a-soc-incidents":
+                raise ConnectionError("db down")
+            return await original(namespace, *args)
+
+        store.list_compactable_threads = flaky
+        compactor = CheckpointCompactor(
+            store,
+            {
+                "a-soc-incidents": RetentionPolicy("a-soc-incidents", idle_seconds=60),
+                "a-soc-agents": RetentionPolicy("a-soc-agents", idle_seconds=60),
+            },
+            pause_seconds=0,
+        )
+        stats = await compactor.run_once(now=NOW)
+        assert stats.by_namespace == {"a-soc-agents": 3}
@@ -0,0 +1,53 @@
+import pickle
+from datetime import datetime, timezone
+
+from src.asoc.agents.telemetry import CloudEvent
+
+
+def _lookup_event(**overrides) -> dict:
+    event = {
+        "EventId": "e1",
+        "EventName": "".join(["Console", "Login"]),
+        "EventTime": datetime(2026, 1, 1, tzinfo=timezone.utc),
+        "UserIdentity": {"userName": "alice"},
+        "CloudTrailEvent": "{...large json...}",
+    }
+    event.update(overrides)
+    return event
+
+
+class TestCloudEvent:
+    def test_is_slotted(self):
+        event = CloudEvent.from_cloudtrail(_lookup_event())
+        assert not hasattr(event, "__dict__")
+
+    def test_event_names_are_interned(self):
+        a = CloudEvent.from_cloudtrail(_lookup_event())
+        b = CloudEvent.from_cloudtrail(_lookup_event(EventId="e2"))
+        assert a.event_name is b.event_name
+
+    def test_to_dict_is_computed_once(self):
+        event = CloudEvent.from_cloudtrail(_lookup_event())
+        assert event.to_dict() is event.to_dict()
+        assert event.to_dict()["eventTime"] == "2026-01-01T00:00:00+00:00"
+
+    def test_raw_dropped_unless_requested(self):
+        assert CloudEvent.from_cloudtrail(_lookup_event()).raw == {}
+        assert CloudEvent.from_cloudtrail(_lookup_event(), keep_raw=True).raw["CloudTrailEvent"] == "{...large json...}"
+
+    def test_raw_reference_resolves_lazily(self):
+        calls = []
+
+        def _load():
+            calls.append(1)
+            return {"eventID": "e1"}
+
+        event = CloudEvent("e1", "StopLogging", "2026-01-01T00:00:00Z", None, {}, [], raw=_load, keep_raw=False)
+        assert calls == []
+        assert event.raw == {"eventID": "e1"}
+
+    def test_round_trips_through_pickle(self):
+        event = CloudEvent.from_cloudtrail(_lookup_event(), keep_raw=True)
+        clone = pickle.loads(pickle.dumps(event))
+        assert clone.to_dict() == event.to_dict()
+        assert clone.raw == event.raw
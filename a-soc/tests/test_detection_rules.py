@@ -0,0 +1,157 @@
+import os
+import time
+
+import pytest
+
+from src.asoc.agents.detection import DetectionAgent
+from src.asoc.llm.providers import MockProvider
+from src.asoc.rules import RuleEngine, RuleError, compile_rules
+from src.asoc.rules.engine import BUILTIN_RULES
+
+T0 = 1_700_000_000
+
+
+def _rules(*docs):
+    return compile_rules(list(docs))
+
+
+def _ids(rules, event, now=T0):
+    return [hit.rule_id for hit in rules.evaluate(event, now)]
+
+
+class TestRuleCompilation:
+    def test_field_modifiers(self):
+        rules = _rules(
+            {"id": "eq", "match": {"userIdentity.type": "root"}},
+            {"id": "wild", "match": {"userAgent": "*Boto3*"}},
+            {"id": "contains", "match": {"requestParameters.policyArn|contains": "admin"}},
+            {"id": "cidr", "match": {"sourceIPAddress|cidr": ["10.0.0.0/8"]}},
+            {"id": "absent", "match": {"errorCode|exists": False}},
+            {"id": "gte", "match": {"requestParameters.maxCount|gte": 10}},
+            {"id": "not", "match": {"awsRegion|not": ["us-east-1", "eu-west-1"]}},
+            {"id": "re", "match": {"eventSource|re": r"^iam\."}},
+        )
+        event = {
+            "userIdentity": {"type": "Root"},
+            "userAgent": "aws-cli boto3/1.34",
+            "requestParameters": {"policyArn": "arn:aws:iam::aws:policy/AdministratorAccess", "maxCount": "12"},
+            "sourceIPAddress": "10.1.2.3",
+            "awsRegion": "ap-south-1",
+            "eventSource": "iam.amazonaws.com",
+        }
+        assert sorted(_ids(rules, event)) == sorted(["eq", "wild", "contains", "cidr", "absent", "gte", "not", "re"])
+        quiet = {"sourceIPAddress": "not-an-ip", "errorCode": "AccessDenied", "awsRegion": "us-east-1"}
+        assert _ids(rules, quiet) == []
+
+    def test_lists_fan_out_and_keywords(self):
+        rules = _rules(
+            {"id": "open", "match": {"requestParameters.ipPermissions.items.ipRanges.items.cidrIp": "0.0.0.0/0"}},
+            {"id": "kw", "keywords": ["cryptominer"]},
+        )
+        event = {
+            "requestParameters": {"ipPermissions": {"items": [{"ipRanges": {"items": [{"cidrIp": "10.0.0.0/8"}, {"cidrIp": "0.0.0.0/0"}]}}]}},
+            "userAgent": "xmrig CryptoMiner/6.0",
+        }
+        assert _ids(rules, event) == ["open", "kw"]
+
+    @pytest.mark.parametrize(
+        "doc, message",
+        [
+            ({"match": {}}, "without an id"),
+            ({"id": "x", "match": {"a|bogus": 1}}, "unknown modifier"),
+            ({"id": "x", "match": {"a|gt": "many"}}, "single number"),
+            ({"id": "x", "match": {"a|cidr": "not-a-net"}}, "rule 'x'"),
+            ({"id": "x", "count": {"by": "a", "window_seconds": 0, "threshold": 2}}, "positive"),
+        ],
+    )
+    def test_invalid_rules(self, doc, message):
+        with pytest.raises(RuleError, match=message):
+            _rules(doc)
+
+    def test_duplicate_ids_and_disabled_rules(self):
+        with pytest.raises(RuleError, match="duplicate"):
+            _rules({"id": "a"}, {"id": "a"})
+        assert len(_rules({"id": "a", "enabled": False})) == 0
+
+
+class TestDispatch:
+    def test_only_rules_for_the_event_name_are_evaluated(self):
+        calls = []
+        docs = [{"id": f"r{i}", "event_name": f"Op{i}", "match": {"x": i}} for i in range(1000)]
+        rules = _rules(*docs)
+        for rule in rules.rules.values():
+            original = rule.conditions[0]
+            object.__setattr__(rule, "conditions", (lambda e, c=original, r=rule.id: calls.append(r) or c(e),))
+        assert _ids(rules, {"eventName": "Op7", "x": 7}) == ["r7"]
+        assert calls == ["r7"]
+
+    def test_wildcard_names_and_unnamed_rules(self):
+        rules = _rules(
+            {"id": "deletes", "event_name": "Delete*"},
+            {"id": "exact", "event_name": ["DeleteTrail", "StopLogging"]},
+            {"id": "any"},
+        )
+        assert _ids(rules, {"eventName": "DeleteTrail"}) == ["exact", "deletes", "any"]
+        assert _ids(rules, {"eventName": "DeleteBucket"}) == ["deletes", "any"]
+        assert _ids(rules, {"eventName": "GetObject"}) == ["any"]
+
+    def test_count_over_window_fires_once_per_burst(self):
+        rules = _rules({"id": "burst", "count": {"by": "sourceIPAddress", "window_seconds": 60, "threshold": 3}})
+        fired = [bool(_ids(rules, {"sourceIPAddress": "1.1.1.1", "eventTime": T0 + i})) for i in range(6)]
+        assert fired == [False, False, True, False, False, True]
+        assert not _ids(rules, {"sourceIPAddress": "2.2.2.2", "eventTime": T0 + 7})
+        spaced = [bool(_ids(rules, {"sourceIPAddress": "3.3.3.3", "eventTime": T0 + 100 * i})) for i in range(5)]
+        assert not any(spaced)
+
+
+class TestRuleEngine:
+    def test_builtin_rules_load(self):
+        engine = RuleEngine()
+        assert "high-risk-control-plane" in engine.rules.rules
+        login = {"eventName": "ConsoleLogin", "userIdentity": {"type": "Root"}, "responseElements": {"ConsoleLogin": "Success"}}
+        assert {h.rule_id for h in engine.evaluate(login)} == {"high-risk-control-plane", "root-console-login"}
+
+    def test_hot_reload_keeps_counts_and_survives_bad_files(self, tmp_path):
+        path = tmp_path / "rules.yml"
+        path.write_text("- id: burst\n  count: {by: sourceIPAddress, window_seconds: 60, threshold: 2}\n")
+        engine = RuleEngine([str(tmp_path)], reload_seconds=0)
+        assert not engine.evaluate({"sourceIPAddress": "1.1.1.1", "eventTime": T0})
+
+        path.write_text(path.read_text() + "- id: extra\n  event_name: StopLogging\n")
+        os.utime(path, (time.time() + 5, time.time() + 5))
+        assert engine.maybe_reload()
+        assert set(engine.rules.rules) == {"burst", "extra"}
+        assert [h.rule_id for h in engine.evaluate({"sourceIPAddress": "1.1.1.1", "eventTime": T0 + 1})] == ["burst"]
+
+        path.write_text("- id: broken\n  match: {a|bogus: 1}\n")
+        os.utime(path, (time.time() + 10, time.time() + 10))
+        assert not engine.maybe_reload()
+        assert set(engine.rules.rules) == {"burst", "extra"}
+
+
+@pytest.mark.asyncio
+class TestDetectionRules:
+    async def test_rule_boost_replaces_hardcoded_events(self):
+        agent = DetectionAgent(provider=MockProvider())
+        event = {"eventName": "ConsoleLogin", "sourceIPAddress": "198.51.100.4"}
+        risk = await agent.tool_registry.execute(
+            "calculate_risk_score", llm_result={"risk_score": 0.5}, mitre=None, event_data=event, rule_hits=None
+        )
+        assert risk["final_risk_score"] == 0.65
+        alert = await agent.analyze_threat(event)
+        assert [hit["rule_id"] for hit in alert.payload["rules"]] == ["high-risk-control-plane"]
+
+    async def test_risk_without_hits_leaves_counts_alone(self, tmp_path):
+        (tmp_path / "rules.yml").write_text("- id: burst\n  count: {by: sourceIPAddress, window_seconds: 60, threshold: 2}\n")
+        agent = DetectionAgent(provider=MockProvider())
+        agent._rules = RuleEngine([str(tmp_path)])
+        event = {"eventName": "GetObject", "sourceIPAddress": "1.1.1.1", "eventTime": T0}
+        risk = await agent.tool_registry.execute(
+            "calculate_risk_score", llm_result={"risk_score": 0.5}, mitre=None, event_data=event, rule_hits=None
+        )
+        assert risk["final_risk_score"] == 0.5
+        # The first counted sighting of this address, not the second.
+        assert not agent._match_rules([{**event, "eventTime": T0 + 1}])[0]
+
+    async def test_builtin_file_is_packaged(self):
+        assert BUILTIN_RULES.exists()
@@ -0,0 +1,163 @@
+import gzip
+import io
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.asoc.agents.replay import FileReplayProvider, _export_records, iter_json_records, parse_export_file
+from src.asoc.agents.telemetry import TelemetryAgent, create_cloud_provider
+from src.asoc.core.config import Settings
+
+T0 = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _ct(i: int, seconds: float = 0.0, name: str = "ConsoleLogin") -> dict:
+    return {
+        "eventVersion": "1.08",
+        "eventID": f"ct-{i}",
+        "eventName": name,
+        "eventTime": (T0 + timedelta(seconds=seconds)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "sourceIPAddress": "203.0.113.7",
+        "userIdentity": {"type": "IAMUser", "userName": "alice"},
+        "resources": [{"ARN": "arn:aws:s3:::bucket"}],
+        "requestParameters": {"nested": {"text": "has ] and } and \\\" inside"}},
+    }
+
+
+def _write_cloudtrail(path, records):
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump({"Records": records}, f)
+
+
+class TestJsonRecordReader:
+    @pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 16])
+    def test_records_wrapper_across_chunk_boundaries(self, chunk_size):
+        records = [_ct(i) for i in range(5)]
+        stream = io.StringIO(json.dumps({"Records": records}, indent=2))
+        assert list(iter_json_records(stream, chunk_size=chunk_size)) == records
+
+    @pytest.mark.parametrize("chunk_size", [3, 1 << 16])
+    def test_ndjson_and_bare_array(self, chunk_size):
+        records = [{"insertId": str(i), "n": i * 1.5} for i in range(4)]
+        ndjson = "\n".join(json.dumps(r) for r in records) + "\n"
+        assert list(iter_json_records(io.StringIO(ndjson), chunk_size=chunk_size)) == records
+        assert list(iter_json_records(io.StringIO(json.dumps(records)), chunk_size=chunk_size)) == records
+
+    def test_non_wrapper_object_is_treated_as_a_record(self):
+        assert list(iter_json_records(io.StringIO('{"operationName": "x"}'), chunk_size=4)) == [{"operationName": "x"}]
+
+    def test_empty_input(self):
+        assert list(iter_json_records(io.StringIO(""))) == []
+
+
+class TestParseExportFile:
+    def test_cloudtrail_gzip_sorted_with_lazy_raw(self, tmp_path):
+        path = tmp_path / "ct.json.gz"
+        _write_cloudtrail(path, [_ct(1, 60), _ct(0, 0)])
+        events = parse_export_file(str(path))
+        assert [e.event_id for e in events] == ["ct-0", "ct-1"]
+        assert events[0].user_identity["userName"] == "alice"
+        assert not isinstance(events[0]._raw, dict)
+        assert events[0].raw == _ct(0, 0)
+        assert isinstance(parse_export_file(str(path), keep_raw=True)[0]._raw, dict)
+
+    def test_lazy_raws_parse_the_file_once(self, tmp_path):
+        path = tmp_path / "ct.json.gz"
+        _write_cloudtrail(path, [_ct(i, i) for i in range(50)])
+        events = parse_export_file(str(path))
+        _export_records.cache_clear()
+        assert [e.raw for e in events] == [_ct(i, i) for i in range(50)]
+        assert _export_records.cache_info().misses == 1
+
+    def test_gcp_ndjson(self, tmp_path):
+        path = tmp_path / "gcp.jsonl"
+        entry = {
+            "insertId": "g1",
+            "timestamp": T0.isoformat(),
+            "protoPayload": {
+                "methodName": "SetIamPolicy",
+                "authenticationInfo": {"principalEmail": "bob@example.com"},
+                "requestMetadata": {"callerIp": "198.51.100.1"},
+                "resourceName": "projects/p",
+            },
+        }
+        path.write_text(json.dumps(entry) + "\n")
+        [event] = parse_export_file(str(path))
+        assert (event.event_id, event.event_name, event.source_ip) == ("g1", "SetIamPolicy", "198.51.100.1")
+
+    def test_azure_records(self, tmp_path):
+        path = tmp_path / "azure.json"
+        record = {
+            "time": T0.isoformat(),
+            "operationName": "MICROSOFT.INSIGHTS/DIAGNOSTICSETTINGS/DELETE",
+            "resourceId": "/subscriptions/s/rg",
+            "callerIpAddress": "192.0.2.9",
+        }
+        path.write_text(json.dumps({"records": [record]}))
+        [event] = parse_export_file(str(path))
+        assert event.event_name == "MICROSOFT.INSIGHTS/DIAGNOSTICSETTINGS/DELETE"
+        assert event.event_id.startswith("azure-")
+        assert parse_export_file(str(path))[0].event_id == event.event_id
+
+
+@pytest.mark.asyncio
+class TestFileReplayProvider:
+    def _export(self, tmp_path, files=3, per_file=4):
+        for f in range(files):
+            day = tmp_path / "AWSLogs" / f"day{f}"
+            day.mkdir(parents=True)
+            _write_cloudtrail(day / f"ct_{f}.json.gz", [_ct(f * 100 + i, f * 100 + i) for i in range(per_file)])
+        (tmp_path / "README.txt").write_text("ignored")
+        return tmp_path
+
+    async def test_streams_files_in_order(self, tmp_path):
+        provider = FileReplayProvider(str(self._export(tmp_path)), workers=0)
+        pages = [page async for page in provider.stream_events()]
+        ids = [e.event_id for page in pages for e in page]
+        assert len(pages) == 3
+        assert ids == [f"ct-{f * 100 + i}" for f in range(3) for i in range(4)]
+        assert provider.files_done == 3
+
+    async def test_fetch_events_batches_then_exhausts(self, tmp_path):
+        provider = FileReplayProvider(str(self._export(tmp_path)), workers=0)
+        sizes = [len(await provider.fetch_events(max_results=5)) for _ in range(4)]
+        assert sizes == [5, 5, 2, 0]
+
+    async def test_speed_paces_by_event_time(self, tmp_path):
+        _write_cloudtrail(tmp_path / "ct.json.gz", [_ct(0, 0), _ct(1, 2), _ct(2, 4)])
+        provider = FileReplayProvider(str(tmp_path), speed=20.0, workers=0)
+        start = time.monotonic()
+        pages = [page async for page in provider.stream_events()]
+        assert time.monotonic() - start >= 0.18
+        assert [len(p) for p in pages] == [1, 1, 1]
+
+    async def test_process_pool_parsing(self, tmp_path):
+        provider = FileReplayProvider(str(self._export(tmp_path)), workers=2)
+        try:
+            events = [e async for page in provider.stream_events(max_results=6) for e in page]
+        finally:
+            provider.close()
+        assert [e.event_id for e in events] == ["ct-0", "ct-1", "ct-2", "ct-3", "ct-100", "ct-101"]
+
+    async def test_health_check(self, tmp_path):
+        assert not await FileReplayProvider(str(tmp_path / "missing"), workers=0).health_check()
+        assert await FileReplayProvider(str(self._export(tmp_path)), workers=0).health_check()
+
+    async def test_drives_telemetry_agent(self, tmp_path):
+        provider = FileReplayProvider(str(self._export(tmp_path, files=1, per_file=2)), workers=0)
+        agent = TelemetryAgent(provider=provider)
+        agent.send_messages = AsyncMock()
+        agent.log_events = AsyncMock()
+        await agent.poll_cloudtrail()
+        assert len(agent.send_messages.call_args.args[0]) == 2
+
+
+def test_factory_returns_replay_provider(tmp_path):
+    provider = create_cloud_provider(
+        Settings(TELEMETRY_REPLAY_PATH=str(tmp_path), TELEMETRY_REPLAY_SPEED=5.0, TELEMETRY_WATERMARK_PATH=str(tmp_path / "wm.json"))
+    )
+    assert isinstance(provider, FileReplayProvider)
+    assert provider.speed == 5.0 and provider.workers == 0
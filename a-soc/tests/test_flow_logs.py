@@ -0,0 +1,150 @@
+import gzip
+
+import pytest
+
+from src.asoc.agents.flow_logs import (
+    DEFAULT_FIELDS,
+    VPCFlowLogProvider,
+    aggregate_flows,
+    merge_aggregates,
+    outlier_mask,
+    parse_flow_file,
+    parse_flow_records,
+)
+from src.asoc.agents.telemetry import CompositeCloudProvider, create_cloud_provider
+from src.asoc.core.config import Settings
+
+T0 = 1772366400  # 2026-03-01T12:00:00Z
+HEADER = " ".join(DEFAULT_FIELDS) + "\n"
+
+
+def _flow(src="10.0.0.1", dst="10.0.0.2", port=443, bytes_=1000, packets=10, start=T0, action="ACCEPT", status="OK"):
+    return f"2 123456789012 eni-abc {src} {dst} 50000 {port} 6 {packets} {bytes_} {start} {start + 60} {action} {status}\n"
+
+
+def _nodata(start=T0):
+    return f"2 123456789012 eni-abc - - - - - - - {start} {start + 60} - NODATA\n"
+
+
+class TestParseFlowRecords:
+    def test_structured_columns_and_nodata_dropped(self):
+        records = parse_flow_records([_flow(), _nodata(), _flow(action="REJECT", bytes_=40)])
+        assert records.dtype.names[:2] == ("srcaddr", "dstaddr")
+        assert len(records) == 2
+        assert records["bytes"].tolist() == [1000, 40]
+        assert records["rejected"].tolist() == [False, True]
+
+    def test_malformed_lines_fall_back_to_per_line_split(self):
+        records = parse_flow_records([_flow(), "garbage line\n", "\n", _flow(port=22)])
+        assert records["dstport"].tolist() == [443, 22]
+
+    def test_custom_field_order(self):
+        fields = ("srcaddr", "dstaddr", "dstport", "protocol", "packets", "bytes", "start", "action", "log-status")
+        records = parse_flow_records([f"10.0.0.9 10.0.0.8 53 17 1 80 {T0} ACCEPT OK\n"], fields)
+        assert records[0]["protocol"] == 17
+        assert records[0]["srcaddr"] == "10.0.0.9"
+
+    def test_format_without_required_fields_is_rejected(self):
+        with pytest.raises(ValueError):
+            parse_flow_records([], ("srcaddr", "dstaddr", "log-status"))
+
+
+class TestAggregation:
+    def test_sums_per_window_and_key(self):
+        lines = [_flow(bytes_=100, start=T0), _flow(bytes_=200, start=T0 + 30), _flow(bytes_=5, start=T0 + 300)]
+        lines.append(_flow(port=22, action="REJECT"))
+        agg = aggregate_flows(parse_flow_records(lines), window_seconds=300)
+        by_key = {(int(a["window"]), int(a["dstport"])): a for a in agg}
+        assert by_key[(T0, 443)]["bytes"] == 300
+        assert by_key[(T0, 443)]["flows"] == 2
+        assert by_key[(T0, 443)]["packets"] == 20
+        assert by_key[(T0 + 300, 443)]["bytes"] == 5
+        assert by_key[(T0, 22)]["rejected"] == 1
+
+    def test_merge_combines_partial_windows(self):
+        first = aggregate_flows(parse_flow_records([_flow(bytes_=100)]))
+        second = aggregate_flows(parse_flow_records([_flow(bytes_=50), _flow(dst="10.0.0.3")]))
+        merged = merge_aggregates([first, second])
+        assert len(merged) == 2
+        assert merged[merged["dstaddr"] == "10.0.0.2"]["bytes"].tolist() == [150]
+        assert merge_aggregates([]).size == 0
+
+    def test_outliers_by_volume_and_rejects(self):
+        lines = [_flow(dst=f"10.0.1.{i}", bytes_=1000) for i in range(20)]
+        lines.append(_flow(dst="198.51.100.9", bytes_=10_000_000))
+        lines += [_flow(dst="10.0.2.1", port=22, bytes_=1000, action="REJECT")] * 10
+        agg = aggregate_flows(parse_flow_records(lines))
+        flagged = set(agg[outlier_mask(agg, sigma=3.0, reject_threshold=10)]["dstaddr"].tolist())
+        assert flagged == {"198.51.100.9", "10.0.2.1"}
+
+    def test_parse_file_with_header_in_small_chunks(self, tmp_path):
+        path = tmp_path / "flows.log.gz"
+        with gzip.open(path, "wt") as f:
+            f.write(HEADER)
+            f.writelines(_flow(bytes_=10) for _ in range(500))
+        agg = parse_flow_file(str(path), chunk_bytes=1024)
+        assert len(agg) == 1
+        assert agg[0]["bytes"] == 5000
+        assert agg[0]["flows"] == 500
+
+
+class TestVPCFlowLogProvider:
+    async def test_emits_aggregates_and_outliers_once_per_file(self, tmp_path):
+        lines = [_flow(dst=f"10.0.1.{i}", bytes_=1000) for i in range(20)]
+        lines.append(_flow(dst="198.51.100.9", bytes_=10_000_000))
+        (tmp_path / "a.log").write_text(HEADER + "".join(lines))
+        provider = VPCFlowLogProvider(str(tmp_path))
+
+        events = await provider.fetch_events(max_results=100)
+        assert len(events) == 21
+        assert provider.records_ingested == 21
+        [outlier] = [e for e in events if e.event_name == "VPCFlowOutlier"]
+        assert outlier.source_ip == "10.0.0.1"
+        assert outlier.resources[0]["destination"] == "198.51.100.9:443"
+        assert outlier.resources[0]["bytes"] == 10_000_000
+        assert outlier.event_time.startswith("2026-03-01T12:00:00")
+        assert await provider.fetch_events(max_results=100) == []
+
+        (tmp_path / "b.log").write_text(_flow(bytes_=7))
+        [event] = await provider.fetch_events(max_results=100)
+        assert event.event_name == "VPCFlowAggregate"
+
+    async def test_events_past_max_results_are_kept_for_the_next_call(self, tmp_path):
+        (tmp_path / "a.log").write_text(HEADER + "".join(_flow(dst=f"10.0.1.{i}") for i in range(7)))
+        provider = VPCFlowLogProvider(str(tmp_path))
+        first = [e async for page in provider.stream_events(max_results=3) for e in page]
+        second = await provider.fetch_events(max_results=3)
+        rest = [e async for page in provider.stream_events() for e in page]
+        assert [len(first), len(second), len(rest)] == [3, 3, 1]
+        destinations = {e.resources[0]["destination"] for e in first + second + rest}
+        assert destinations == {f"10.0.1.{i}:443" for i in range(7)}
+        assert await provider.fetch_events(max_results=10) == []
+
+    async def test_min_bytes_keeps_outliers(self, tmp_path):
+        lines = [_flow(dst=f"10.0.1.{i}", bytes_=1000) for i in range(20)]
+        lines.append(_flow(dst="198.51.100.9", bytes_=10_000_000))
+        (tmp_path / "a.log").write_text("".join(lines))
+        provider = VPCFlowLogProvider(str(tmp_path), min_bytes=1_000_000)
+        [event] = await provider.fetch_events(max_results=100)
+        assert event.event_name == "VPCFlowOutlier"
+
+    async def test_unparseable_file_is_skipped(self, tmp_path):
+        (tmp_path / "bad.log").write_text("srcaddr dstaddr log-status\n")
+        (tmp_path / "good.log").write_text(_flow())
+        provider = VPCFlowLogProvider(str(tmp_path))
+        assert len(await provider.fetch_events(max_results=10)) == 1
+        assert await provider.health_check() is True
+
+
+class TestFactory:
+    def test_flow_logs_join_replay_source(self, tmp_path):
+        config = Settings(TELEMETRY_REPLAY_PATH=str(tmp_path), TELEMETRY_FLOW_LOG_PATH=str(tmp_path))
+        provider = create_cloud_provider(config)
+        assert isinstance(provider, CompositeCloudProvider)
+        assert [type(p).__name__ for p in provider.providers] == ["FileReplayProvider", "VPCFlowLogProvider"]
+
+    def test_flow_logs_alongside_live_sources(self, tmp_path):
+        config = Settings(TELEMETRY_FLOW_LOG_PATH=str(tmp_path), TELEMETRY_FLOW_WINDOW_SECONDS=60)
+        provider = create_cloud_provider(config)
+        flow = [p for p in provider.providers if isinstance(p, VPCFlowLogProvider)]
+        assert flow[0].window_seconds == 60
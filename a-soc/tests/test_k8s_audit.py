@@ -0,0 +1,169 @@
+import json
+import os
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.asoc.agents.k8s_audit import K8sAuditLogProvider, parse_audit_lines, to_audit_event
+from src.asoc.agents.telemetry import TelemetryAgent, create_cloud_provider
+from src.asoc.core.config import Settings
+from src.asoc.core.watermarks import OffsetStore
+
+
+def _audit(i: int, stage: str = "ResponseComplete", verb: str = "create", subresource: str = "exec") -> str:
+    record = {
+        "kind": "Event",
+        "auditID": f"a-{i}",
+        "stage": stage,
+        "verb": verb,
+        "requestURI": "/api/v1/namespaces/prod/pods/web-1/exec",
+        "user": {"username": "system:serviceaccount:prod:ci", "groups": ["system:serviceaccounts"]},
+        "sourceIPs": ["10.1.2.3"],
+        "objectRef": {"resource": "pods", "namespace": "prod", "name": "web-1", "subresource": subresource},
+        "responseStatus": {"code": 101},
+        "requestReceivedTimestamp": "2026-03-01T12:00:00.000000Z",
+    }
+    return json.dumps(record) + "\n"
+
+
+def _append(path, text: str) -> None:
+    with open(path, "a") as f:
+        f.write(text)
+
+
+def _provider(tmp_path, target=None, **kwargs) -> K8sAuditLogProvider:
+    kwargs.setdefault("from_beginning", True)
+    return K8sAuditLogProvider(
+        str(target or tmp_path / "audit.log"), offsets=OffsetStore(str(tmp_path / "offsets.json")), **kwargs
+    )
+
+
+async def _poll(provider):
+    events = await provider.fetch_events(incremental=True)
+    await provider.commit_cursor()
+    return [e.event_id for e in events]
+
+
+class TestParsing:
+    def test_block_decode_falls_back_per_line(self):
+        block = (_audit(1) + "{not json\n\n" + _audit(2)).encode()
+        assert [r["auditID"] for r in parse_audit_lines(block)] == ["a-1", "a-2"]
+
+    def test_event_mapping(self):
+        event = to_audit_event(json.loads(_audit(1)))
+        assert event.event_name == "create:pods/exec"
+        assert event.source_ip == "10.1.2.3"
+        assert event.user_identity["userName"] == "system:serviceaccount:prod:ci"
+        assert event.resources[0]["name"] == "prod/web-1"
+        assert event.resources[0]["responseCode"] == 101
+
+
+class TestTailing:
+    async def test_incremental_reads_only_complete_new_lines(self, tmp_path):
+        log = tmp_path / "audit.log"
+        _append(log, _audit(1) + _audit(1, stage="RequestReceived") + _audit(2))
+        provider = _provider(tmp_path)
+        assert await _poll(provider) == ["a-1", "a-2"]
+        assert await _poll(provider) == []
+
+        partial = _audit(3)
+        _append(log, partial[:20])
+        assert await _poll(provider) == []
+        _append(log, partial[20:])
+        assert await _poll(provider) == ["a-3"]
+
+    async def test_uncommitted_fetch_is_redelivered(self, tmp_path):
+        _append(tmp_path / "audit.log", _audit(1))
+        provider = _provider(tmp_path)
+        assert [e.event_id for e in await provider.fetch_events(incremental=True)] == ["a-1"]
+        assert await _poll(provider) == ["a-1"]
+
+    async def test_aborted_poll_does_not_commit_an_earlier_stage(self, tmp_path):
+        log = tmp_path / "audit.log"
+        _append(log, _audit(1))
+        provider = _provider(tmp_path)
+        await provider.fetch_events(incremental=True)  # staged, never published
+        _append(log, _audit(2))
+        stream = provider.stream_events(incremental=True)
+        await stream.__anext__()
+        await stream.aclose()
+        await provider.commit_cursor()
+        assert OffsetStore(str(tmp_path / "offsets.json")).get(provider.cursor_key) == {}
+        assert await _poll(provider) == ["a-1", "a-2"]
+
+    async def test_peek_respects_max_results_and_keeps_offsets(self, tmp_path):
+        _append(tmp_path / "audit.log", "".join(_audit(i) for i in range(5)))
+        provider = _provider(tmp_path)
+        assert len(await provider.fetch_events(max_results=2)) == 2
+        assert len(await _poll(provider)) == 5
+
+    async def test_rotation_finishes_old_inode_then_reads_new_file(self, tmp_path):
+        log = tmp_path / "audit.log"
+        _append(log, _audit(1))
+        provider = _provider(tmp_path)
+        assert await _poll(provider) == ["a-1"]
+
+        _append(log, _audit(2))
+        rotated = tmp_path / "audit-2026-03-01T12-05-00.000.log"
+        os.rename(log, rotated)
+        os.utime(rotated, (1, 1))
+        _append(log, _audit(3))
+        assert await _poll(provider) == ["a-2", "a-3"]
+
+    async def test_restart_resumes_from_persisted_offsets(self, tmp_path):
+        log = tmp_path / "audit.log"
+        _append(log, _audit(1))
+        assert await _poll(_provider(tmp_path)) == ["a-1"]
+        _append(log, _audit(2))
+        assert await _poll(_provider(tmp_path)) == ["a-2"]
+
+    async def test_first_run_skips_existing_content_by_default(self, tmp_path):
+        log = tmp_path / "audit.log"
+        _append(log, _audit(1))
+        provider = _provider(tmp_path, from_beginning=False)
+        assert await _poll(provider) == []
+        _append(log, _audit(2))
+        assert await _poll(_provider(tmp_path, from_beginning=False)) == ["a-2"]
+
+    async def test_truncated_file_is_reread_from_start(self, tmp_path):
+        log = tmp_path / "audit.log"
+        _append(log, _audit(1) + _audit(2))
+        provider = _provider(tmp_path)
+        await _poll(provider)
+        log.write_text(_audit(3))
+        assert await _poll(provider) == ["a-3"]
+
+    async def test_small_batches_and_directory_mode(self, tmp_path):
+        logs = tmp_path / "logs"
+        logs.mkdir()
+        _append(logs / "kube-apiserver.log", "".join(_audit(i) for i in range(20)))
+        provider = _provider(tmp_path, target=logs, batch_bytes=64)
+        pages = [page async for page in provider.stream_events(incremental=True)]
+        assert len(pages) == 20
+        assert provider.lines_read == 20
+
+    async def test_offsets_stay_put_when_publishing_fails(self, tmp_path):
+        log = tmp_path / "audit.log"
+        _append(log, _audit(1) + _audit(2))
+        provider = _provider(tmp_path)
+        agent = TelemetryAgent(provider=provider)
+        agent.log_events = AsyncMock(return_value=True)
+        bus = MagicMock()
+        bus.publish_batch = AsyncMock(side_effect=ConnectionError("redis down"))
+        with patch("src.asoc.core.message_bus.get_message_bus", AsyncMock(return_value=bus)):
+            await agent.poll_cloudtrail()
+        assert OffsetStore(str(tmp_path / "offsets.json")).get(provider.cursor_key) == {}
+
+        bus.publish_batch = AsyncMock()
+        with patch("src.asoc.core.message_bus.get_message_bus", AsyncMock(return_value=bus)):
+            result = await agent.poll_cloudtrail()
+        assert [e["eventID"] for e in result.payload["events"]] == ["a-1", "a-2"]
+        assert await _poll(provider) == []
+
+
+def test_factory_adds_k8s_provider(tmp_path):
+    config = Settings(
+        TELEMETRY_REPLAY_PATH=str(tmp_path),
+        TELEMETRY_K8S_AUDIT_PATH=str(tmp_path / "audit.log"),
+        TELEMETRY_OFFSETS_PATH=str(tmp_path / "offsets.json"),
+    )
+    provider = create_cloud_provider(config)
+    assert [type(p).__name__ for p in provider.providers] == ["FileReplayProvider", "K8sAuditLogProvider"]
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import re
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.asoc.agents.detection import DetectionAgent
+from src.asoc.agents.message import ASOCMessage, MessageType
+from src.asoc.core.config import settings
+from src.asoc.llm.providers import CompletionProvider, MockProvider, parse_batch_response, plan_batches
+
+
+class _ScriptedProvider(CompletionProvider):
+    """Answers batch prompts with one verdict per id, and single prompts with one verdict."""
+
+    def __init__(self, drop_ids=(), broken=False):
+        super().__init__()
+        self.prompts = []
+        self.drop_ids = set(drop_ids)
+        self.broken = broken
+
+    @property
+    def name(self) -> str:
+        return "scripted"
+
+    async def _complete(self, prompt: str, max_tokens: int) -> str:
+        self.prompts.append(prompt)
+        ids = re.findall(r'^\{"id":"(e\d+)"', prompt, flags=re.M)
+        if not ids:
+            return '{"threat_detected": false, "risk_score": 0.2, "reasoning": "single"}'
+        if self.broken:
+            return "Sorry, here is my analysis: ..."
+        verdicts = [
+            {"id": i, "threat_detected": True, "risk_score": 0.6, "reasoning": f"batch {i}", "attack_technique": None}
+            for i in ids
+            if i not in self.drop_ids
+        ]
+        return "```json\n" + json.dumps(verdicts) + "\n```"
+
+
+def _events(n):
+    return [{"eventName": "RunInstances", "eventID": f"id-{i}", "sourceIPAddress": "198.51.100.4"} for i in range(n)]
+
+
+class TestBatchHelpers:
+    def test_plan_batches_respects_budget_and_count(self):
+        lines = ["x" * 400] * 10
+        groups = plan_batches(lines, token_budget=1000, max_events=16)
+        assert [i for g in groups for i in g] == list(range(10))
+        assert all(len(g) <= 3 for g in groups)
+        assert [len(g) for g in plan_batches(lines, token_budget=100_000, max_events=4)] == [4, 4, 2]
+
+    def test_oversized_event_gets_its_own_batch(self):
+        groups = plan_batches(["x" * 40, "x" * 100_000, "x" * 40], token_budget=2000, max_events=16)
+        assert groups == [[0], [1], [2]]
+
+    def test_parse_batch_response_ignores_unknown_ids(self):
+        content = json.dumps({"results": [{"id": "e0", "risk_score": 0.9}, {"id": "zz", "risk_score": 0.1}]})
+        verdicts = parse_batch_response(content, ["e0", "e1"])
+        assert list(verdicts) == ["e0"]
+        assert verdicts["e0"].risk_score == 0.9
+
+
+@pytest.mark.asyncio
+class TestAnalyzeBatch:
+    async def test_one_completion_for_many_events(self):
+        provider = _ScriptedProvider()
+        results = await provider.analyze_batch(_events(5))
+        assert len(provider.prompts) == 1
+        assert [r.reasoning for r in results] == [f"batch e{i}" for i in range(5)]
+
+    async def test_missing_verdicts_fall_back_to_single_calls(self):
+        provider = _ScriptedProvider(drop_ids={"e1"})
+        results = await provider.analyze_batch(_events(3))
+        assert len(provider.prompts) == 2
+        assert [r.reasoning for r in results] == ["batch e0", "single", "batch e2"]
+
+    async def test_unparseable_batch_falls_back_and_shrinks_batches(self):
+        provider = _ScriptedProvider(broken=True)
+        with patch.multiple(settings, LLM_BATCH_MAX_EVENTS=8, LLM_BATCH_TOKEN_BUDGET=100_000):
+            results = await provider.analyze_batch(_events(8))
+            assert [r.reasoning for r in results] == ["single"] * 8
+            assert provider._batch_limit == 4
+
+            provider.broken = False
+            provider.prompts.clear()
+            await provider.analyze_batch(_events(8))
+            assert len(provider.prompts) == 2
+            assert provider._batch_limit == 6
+
+    async def test_default_batch_analyses_each_event(self):
+        results = await MockProvider().analyze_batch(_events(3))
+        assert len(results) == 3
+
+
+def _alert(event):
+    return ASOCMessage(message_type=MessageType.ALERT, source_agent="TelemetryAgent", payload={"event": event})
+
+
+@pytest.mark.asyncio
+class TestDetectionMicroBatching:
+    async def test_only_undecided_events_reach_the_batch(self):
+        provider = _ScriptedProvider()
+        agent = DetectionAgent(provider=provider)
+        events = _events(3) + [{"eventName": "DescribeInstances"}, {"eventName": "StopLogging"}]
+        results = await agent.analyze_threats(events)
+        assert len(provider.prompts) == 1
+        assert [r.payload["triage"]["tier"] for r in results] == ["needs_llm"] * 3 + ["allow", "escalate"]
+        assert results[0].payload["reasoning"] == "batch e0"
+        assert results[4].payload["original_event"]["eventName"] == "StopLogging"
+
+    async def test_batch_failure_falls_back_to_mock(self):
+        provider = AsyncMock()
+        provider.analyze_batch.side_effect = RuntimeError("rate limited")
+        agent = DetectionAgent(provider=provider)
+        results = await agent.analyze_threats(_events(2))
+        assert all(r.payload["risk_score"] > 0.8 for r in results)
+
+    async def test_submit_flushes_after_batch_window(self):
+        provider = _ScriptedProvider()
+        agent = DetectionAgent(provider=provider)
+        agent.send_messages = AsyncMock()
+        agent.log_events = AsyncMock()
+        with patch("src.asoc.agents.detection.settings") as config:
+            config.LLM_BATCH_MAX_EVENTS = 100
+            config.DETECTION_BATCH_MS = 10
+            for event in _events(4):
+                await agent.submit(_alert(event))
+            agent.send_messages.assert_not_called()
+            await asyncio.sleep(0.1)
+        agent.send_messages.assert_awaited_once()
+        assert len(agent.send_messages.await_args.args[0]) == 4
+        assert len(agent.log_events.await_args.args[1]) == 4
+        assert len(provider.prompts) == 1
+
+    async def test_submit_flushes_when_batch_is_full(self):
+        agent = DetectionAgent(provider=_ScriptedProvider())
+        agent.send_messages = AsyncMock()
+        agent.log_events = AsyncMock()
+        with patch("src.asoc.agents.detection.settings") as config:
+            config.LLM_BATCH_MAX_EVENTS = 2
+            config.DETECTION_BATCH_MS = 10_000
+            await agent.submit(_alert(_events(1)[0]))
+            await agent.submit(_alert(_events(1)[0]))
+        agent.send_messages.assert_awaited_once()
+        assert agent._flush_task is None
@@ -0,0 +1,116 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.asoc.core.metrics import get_metrics
+from src.asoc.llm.cache import CachedProvider, VerdictCache, event_fingerprint
+from src.asoc.llm.providers import LLMResult
+
+
+def _event(event_id="e-1", when="2026-03-01T12:00:00Z", port=22):
+    return {
+        "eventName": "AuthorizeSecurityGroupIngress",
+        "eventID": event_id,
+        "eventTime": when,
+        "userIdentity": {"userName": "alice"},
+        "requestParameters": {"groupId": "sg-1", "ipPermissions": {"items": [{"fromPort": port}]}},
+        "raw": {"requestID": event_id, "eventTime": when},
+    }
+
+
+def _provider():
+    provider = AsyncMock()
+    provider.name = "openai:gpt-4"
+    provider.analyze.return_value = LLMResult(threat_detected=True, risk_score=0.7, reasoning="open ssh")
+    provider.analyze_batch.side_effect = lambda events: [
+        LLMResult(threat_detected=True, risk_score=0.7, reasoning=f"port {e['requestParameters']['ipPermissions']['items'][0]['fromPort']}")
+        for e in events
+    ]
+    return provider
+
+
+class TestFingerprint:
+    def test_volatile_fields_are_ignored(self):
+        assert event_fingerprint(_event("a", "t1"), "m") == event_fingerprint(_event("b", "t2"), "m")
+
+    def test_parameters_model_and_prompt_version_matter(self):
+        base = event_fingerprint(_event(), "m")
+        assert event_fingerprint(_event(port=3389), "m") != base
+        assert event_fingerprint(_event(), "other") != base
+        assert event_fingerprint(_event(), "m", prompt_version="0") != base
+
+
+class TestVerdictCache:
+    def test_ttl_expiry(self):
+        cache = VerdictCache(ttl_seconds=0.01)
+        cache.set("k", LLMResult(True, 0.7, "x"))
+        assert cache.get("k").risk_score == 0.7
+        asyncio.run(asyncio.sleep(0.02))
+        assert cache.get("k") is None
+
+    def test_lru_eviction(self):
+        cache = VerdictCache(max_entries=2)
+        for key in ("a", "b"):
+            cache.set(key, LLMResult(True, 0.5, key))
+        cache.get("a")
+        cache.set("c", LLMResult(True, 0.5, "c"))
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+
+    def test_disk_tier_survives_restart(self, tmp_path):
+        path = str(tmp_path / "verdicts.db")
+        VerdictCache(disk_path=path).set("k", LLMResult(False, 0.2, "benign", "T1078"))
+        before = get_metrics().get_counter("llm_cache_hits_total", tier="disk")
+        restored = VerdictCache(disk_path=path).get("k")
+        assert (restored.reasoning, restored.attack_technique) == ("benign", "T1078")
+        assert get_metrics().get_counter("llm_cache_hits_total", tier="disk") - before == 1
+
+
+@pytest.mark.asyncio
+class TestCachedProvider:
+    async def test_repeat_alert_is_served_from_cache(self):
+        provider = _provider()
+        cached = CachedProvider(provider, VerdictCache())
+        misses = get_metrics().get_counter("llm_cache_misses_total")
+        await cached.analyze(_event("a"))
+        result = await cached.analyze(_event("b", "2026-03-01T12:05:00Z"))
+        assert result.reasoning == "open ssh"
+        provider.analyze.assert_awaited_once()
+        assert get_metrics().get_counter("llm_cache_misses_total") - misses == 1
+        assert cached.name == "openai:gpt-4"
+
+    async def test_batch_sends_each_distinct_miss_once(self):
+        provider = _provider()
+        cached = CachedProvider(provider, VerdictCache())
+        await cached.analyze_batch([_event(port=22)])
+        events = [_event("x", port=22), _event("y", port=3389), _event("z", port=3389)]
+        results = await cached.analyze_batch(events)
+        assert [r.reasoning for r in results] == ["port 22", "port 3389", "port 3389"]
+        assert len(provider.analyze_batch.call_args.args[0]) == 1
+
+    async def test_failures_are_not_cached(self):
+        provider = _provider()
+        provider.analyze.side_effect = [RuntimeError("429"), LLMResult(True, 0.9, "ok")]
+        cached = CachedProvider(provider, VerdictCache())
+        with pytest.raises(RuntimeError):
+            await cached.analyze(_event())
+        assert (await cached.analyze(_event())).reasoning == "ok"
+
+    async def test_verdict_callback_on_miss_and_hit(self):
+        provider = _provider()
+        provider.analyze.return_value = LLMResult(True, 0.9, "open ssh")
+        cached = CachedProvider(provider, VerdictCache())
+        seen = []
+        await cached.analyze(_event("a"), on_verdict=seen.append)
+        assert provider.analyze.await_args.kwargs["on_verdict"] == seen.append
+        await cached.analyze(_event("b"), on_verdict=seen.append)
+        assert seen == [{"threat_detected": True, "risk_score": 0.9}]
+
+    async def test_verdicts_without_reasoning_are_not_cached(self):
+        provider = _provider()
+        provider.analyze.return_value = LLMResult(True, 0.9, "")
+        cached = CachedProvider(provider, VerdictCache())
+        await cached.analyze(_event(), need_reasoning=False)
+        await cached.analyze(_event())
+        assert provider.analyze.await_count == 2
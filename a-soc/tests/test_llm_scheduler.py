@@ -0,0 +1,126 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.asoc.agents.detection import DetectionAgent
+from src.asoc.agents.message import ASOCMessage, MessageType, Priority
+from src.asoc.core.metrics import get_metrics
+from src.asoc.llm.scheduler import LLMScheduler, current_llm_priority, get_llm_scheduler, llm_priority, reset_llm_schedulers
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after=None):
+        super().__init__("rate limited")
+        self.response = MagicMock(headers={"retry-after": retry_after} if retry_after is not None else {})
+
+
+@pytest.fixture(autouse=True)
+def _fresh_schedulers():
+    reset_llm_schedulers()
+    yield
+    reset_llm_schedulers()
+
+
+@pytest.mark.asyncio
+class TestLLMScheduler:
+    async def test_caps_requests_in_flight(self):
+        scheduler = LLMScheduler("cap", max_in_flight=2)
+        peak = 0
+
+        async def call():
+            nonlocal peak
+            peak = max(peak, scheduler.in_flight)
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        results = await asyncio.gather(*(scheduler.run(call) for _ in range(6)))
+        assert results == ["ok"] * 6
+        assert peak == 2
+        assert scheduler.in_flight == 0
+
+    async def test_higher_priority_is_admitted_first(self):
+        scheduler = LLMScheduler("prio", max_in_flight=1)
+        gate = asyncio.Event()
+        order = []
+
+        async def blocker():
+            await gate.wait()
+
+        def job(tag):
+            async def call():
+                order.append(tag)
+            return call
+
+        first = asyncio.create_task(scheduler.run(blocker))
+        await asyncio.sleep(0)
+        waiting = [
+            asyncio.create_task(scheduler.run(job("hunt"), priority=Priority.LOW)),
+            asyncio.create_task(scheduler.run(job("triage"), priority=Priority.MEDIUM)),
+        ]
+        with llm_priority(Priority.CRITICAL):
+            waiting.append(asyncio.create_task(scheduler.run(job("incident"))))
+        await asyncio.sleep(0)
+        assert scheduler.queue_depth == 3
+        gate.set()
+        await asyncio.gather(first, *waiting)
+        assert order == ["incident", "triage", "hunt"]
+
+    async def test_token_rate_paces_requests(self):
+        scheduler = LLMScheduler("tpm", tokens_per_minute=6000)
+        call = AsyncMock(return_value="ok")
+        await scheduler.run(call, tokens=6000)
+        started = asyncio.get_running_loop().time()
+        await scheduler.run(call, tokens=50)
+        assert asyncio.get_running_loop().time() - started >= 0.4
+
+    async def test_429_pauses_provider_and_retries(self):
+        scheduler = LLMScheduler("throttled", max_retries=3)
+        call = AsyncMock(side_effect=[RateLimitError(retry_after="0.05"), "ok"])
+        other = AsyncMock(return_value="other")
+        before = get_metrics().get_counter("llm_scheduler_throttles_total", provider="throttled")
+
+        task = asyncio.create_task(scheduler.run(call))
+        await asyncio.sleep(0.01)
+        started = asyncio.get_running_loop().time()
+        assert await scheduler.run(other) == "other"
+        # The unrelated request waited out the shared backoff.
+        assert asyncio.get_running_loop().time() - started >= 0.03
+        assert await task == "ok"
+        assert call.await_count == 2
+        assert get_metrics().get_counter("llm_scheduler_throttles_total", provider="throttled") - before == 1
+
+    async def test_gives_up_after_max_retries_and_passes_other_errors(self):
+        scheduler = LLMScheduler("fail", max_retries=1, base_backoff=0.001)
+        with pytest.raises(RateLimitError):
+            await scheduler.run(AsyncMock(side_effect=RateLimitError()))
+        with pytest.raises(ValueError):
+            await scheduler.run(AsyncMock(side_effect=ValueError("bad request")))
+        assert scheduler.in_flight == 0
+
+    async def test_registry_returns_one_scheduler_per_provider(self):
+        assert get_llm_scheduler("openai:gpt-4") is get_llm_scheduler("openai:gpt-4")
+        assert get_llm_scheduler("openai:gpt-4") is not get_llm_scheduler("ollama:llama3")
+
+
+@pytest.mark.asyncio
+async def test_detection_batch_runs_at_most_urgent_alert_priority():
+    seen = []
+    provider = AsyncMock()
+    provider.analyze.side_effect = lambda event, **kwargs: seen.append(current_llm_priority()) or MagicMock(
+        threat_detected=True, risk_score=0.5, reasoning="x", attack_technique=None
+    )
+    agent = DetectionAgent(provider=provider)
+    agent.send_messages = AsyncMock()
+    agent.log_events = AsyncMock()
+    alert = ASOCMessage(
+        message_type=MessageType.ALERT,
+        source_agent="TelemetryAgent",
+        payload={"event": {"eventName": "RunInstances"}},
+        priority=Priority.CRITICAL,
+    )
+    await agent.process_messages([alert])
+    assert seen == [Priority.CRITICAL]
+    assert current_llm_priority() == Priority.MEDIUM
@@ -0,0 +1,155 @@
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.asoc.core.config import settings
+from src.asoc.core.metrics import get_metrics
+from src.asoc.llm.providers import AnthropicProvider, CompletionProvider, OpenAIProvider
+from src.asoc.llm.streaming import VerdictStreamParser
+
+VERDICT = '```json\n{"threat_detected": true, "risk_score": 0.85, "attack_technique": "T1078", "reasoning": "Login from \\"new\\" ASN"}\n```'
+
+
+def _chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class TestVerdictStreamParser:
+    @pytest.mark.parametrize("size", [1, 3, 7, 1000])
+    def test_fields_parse_at_any_chunking(self, size):
+        parser = VerdictStreamParser()
+        for chunk in _chunks(VERDICT, size):
+            parser.feed(chunk)
+        assert parser.fields == {
+            "threat_detected": True, "risk_score": 0.85, "attack_technique": "T1078", "reasoning": 'Login from "new" ASN',
+        }
+
+    def test_numbers_wait_for_a_terminator(self):
+        parser = VerdictStreamParser()
+        parser.feed('{"threat_detected": false, "risk_score": 0.8')
+        assert parser.fields == {"threat_detected": False}
+        parser.feed('5, "attack')
+        assert parser.fields["risk_score"] == 0.85
+
+    def test_partial_string(self):
+        parser = VerdictStreamParser()
+        parser.feed('{"risk_score": 0.1, "reasoning": "Routine \\"Describe')
+        assert parser.partial("reasoning") == 'Routine "Describe'
+        parser.feed('\\" call"}')
+        assert parser.partial("reasoning") is None
+        assert parser.fields["reasoning"] == 'Routine "Describe" call'
+
+
+class _StreamingProvider(CompletionProvider):
+    def __init__(self, chunks):
+        super().__init__(streaming=True)
+        self.chunks = chunks
+        self.sent = 0
+        self.closed = False
+
+    @property
+    def name(self) -> str:
+        return "streaming-test"
+
+    async def _complete(self, prompt, max_tokens):
+        raise AssertionError("streaming provider should not call _complete")
+
+    async def _stream(self, prompt, max_tokens):
+        try:
+            for chunk in self.chunks:
+                self.sent += 1
+                yield chunk
+        finally:
+            self.closed = True
+
+
+@pytest.mark.asyncio
+class TestStreamingAnalyze:
+    async def test_stops_once_fields_are_complete_and_reports_verdict_early(self):
+        body = '{"threat_detected": true, "risk_score": 0.9, "attack_technique": null, "reasoning": "Key created then used"}'
+        chunks = _chunks(body, 8) + ["\nExtra commentary the model keeps writing..."] * 50
+        provider = _StreamingProvider(chunks)
+        seen = []
+        before = get_metrics().get_counter("llm_stream_early_stops_total", provider="streaming-test")
+        result = await provider.analyze({"eventName": "CreateAccessKey"}, on_verdict=seen.append)
+        assert (result.risk_score, result.reasoning, result.attack_technique) == (0.9, "Key created then used", None)
+        assert seen == [{"threat_detected": True, "risk_score": 0.9}]
+        assert provider.sent == len(_chunks(body, 8))
+        assert provider.closed
+        assert get_metrics().get_counter("llm_stream_early_stops_total", provider="streaming-test") - before == 1
+
+    async def test_long_reasoning_is_cut_off(self, monkeypatch):
+        monkeypatch.setattr(settings, "LLM_STREAM_MAX_REASONING_CHARS", 20)
+        head = '{"threat_detected": false, "risk_score": 0.2, "attack_technique": null, "reasoning": "'
+        provider = _StreamingProvider([head] + ["word "] * 100 + ['"}'])
+        result = await provider.analyze({"eventName": "RunInstances"})
+        assert result.reasoning == "word " * 4 + "..."
+        assert provider.sent < 10
+
+    async def test_unordered_output_is_parsed_at_end(self):
+        provider = _StreamingProvider(['{"reasoning": "fine", ', '"risk_score": 0.3, "threat_detected": false}'])
+        result = await provider.analyze({"eventName": "RunInstances"})
+        assert (result.threat_detected, result.risk_score) == (False, 0.3)
+
+    async def test_without_reasoning_stops_at_the_decision_fields(self):
+        head = '{"threat_detected": true, "risk_score": 0.9, "attack_technique": "T1078", '
+        provider = _StreamingProvider([head] + ['"reasoning": "', "word " * 50, '"}'])
+        seen = []
+        result = await provider.analyze({"eventName": "CreateAccessKey"}, on_verdict=seen.append, need_reasoning=False)
+        assert (result.risk_score, result.attack_technique, result.reasoning) == (0.9, "T1078", "")
+        assert seen == [{"threat_detected": True, "risk_score": 0.9}]
+        assert provider.sent == 1
+
+    async def test_broken_stream_raises(self):
+        with pytest.raises(Exception):
+            await _StreamingProvider(["I cannot help with that"]).analyze({"eventName": "RunInstances"})
+
+
+class _AsyncStream:
+    def __init__(self, items):
+        self._items = iter(items)
+        self.close = AsyncMock()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._items)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+@pytest.mark.asyncio
+class TestSDKStreams:
+    async def test_openai_stream_closes_response_on_early_stop(self):
+        def delta(text):
+            chunk = MagicMock()
+            chunk.choices = [MagicMock()]
+            chunk.choices[0].delta.content = text
+            return chunk
+
+        body = json.dumps({"threat_detected": True, "risk_score": 0.7, "attack_technique": "T1098", "reasoning": "x"})
+        stream = _AsyncStream([delta(c) for c in _chunks(body, 10)] + [delta(" trailing")])
+        provider = OpenAIProvider(api_key="sk-test", streaming=True)
+        provider._client = MagicMock()
+        provider._client.chat.completions.create = AsyncMock(return_value=stream)
+        result = await provider.analyze({"eventName": "AttachUserPolicy"})
+        assert result.attack_technique == "T1098"
+        assert provider._client.chat.completions.create.await_args.kwargs["stream"] is True
+        stream.close.assert_awaited_once()
+
+    async def test_anthropic_text_stream(self):
+        body = json.dumps({"threat_detected": False, "risk_score": 0.1, "attack_technique": None, "reasoning": "benign"})
+        stream = MagicMock()
+        stream.text_stream = _AsyncStream(_chunks(body, 5))
+        manager = MagicMock()
+        manager.__aenter__ = AsyncMock(return_value=stream)
+        manager.__aexit__ = AsyncMock(return_value=False)
+        provider = AnthropicProvider(api_key="sk-ant-test", streaming=True)
+        provider._client = MagicMock()
+        provider._client.messages.stream.return_value = manager
+        result = await provider.analyze({"eventName": "ListBuckets"})
+        assert result.reasoning == "benign"
+        manager.__aexit__.assert_awaited_once()
@@ -0,0 +1,112 @@
+import json
+import re
+
+import pytest
+
+from src.asoc.core.metrics import get_metrics
+from src.asoc.llm.compaction import compact_event, compact_json
+from src.asoc.llm.providers import CompletionProvider
+
+CLOUDTRAIL = {
+    "eventVersion": "1.08",
+    "eventID": "ct-1",
+    "eventTime": "2026-03-01T12:00:00Z",
+    "eventSource": "ec2.amazonaws.com",
+    "eventName": "AuthorizeSecurityGroupIngress",
+    "awsRegion": "us-east-1",
+    "sourceIPAddress": "203.0.113.9",
+    "userAgent": "aws-cli/2.15",
+    "userIdentity": {
+        "type": "AssumedRole",
+        "arn": "arn:aws:sts::123:assumed-role/ops/alice",
+        "accountId": "123",
+        "accessKeyId": "ASIA...",
+        "sessionContext": {
+            "attributes": {"mfaAuthenticated": "false", "creationDate": "2026-03-01T11:00:00Z"},
+            "sessionIssuer": {"arn": "arn:aws:iam::123:role/ops", "type": "Role"},
+        },
+    },
+    "requestParameters": {"groupId": "sg-1", "ipPermissions": {"items": [{"fromPort": 22, "ipRanges": None}]}},
+    "responseElements": {"requestId": "r-1", "_return": True},
+    "tlsDetails": {"tlsVersion": "TLSv1.3", "cipherSuite": "TLS_AES_128_GCM_SHA256"},
+    "errorCode": None,
+}
+
+
+class TestCompactEvent:
+    def test_projects_security_fields_and_drops_noise(self):
+        compact = compact_event(CLOUDTRAIL)
+        assert set(compact) == {
+            "eventName", "eventSource", "eventTime", "awsRegion", "sourceIPAddress", "userAgent", "userIdentity",
+            "requestParameters",
+        }
+        assert compact["userIdentity"] == {
+            "type": "AssumedRole",
+            "arn": "arn:aws:sts::123:assumed-role/ops/alice",
+            "accountId": "123",
+            "mfaAuthenticated": "false",
+            "creationDate": "2026-03-01T11:00:00Z",
+            "sessionIssuer": "arn:aws:iam::123:role/ops",
+        }
+        assert compact["requestParameters"]["ipPermissions"]["items"] == [{"fromPort": 22}]
+
+    def test_event_specific_fields_are_kept(self):
+        login = dict(CLOUDTRAIL, eventName="ConsoleLogin", additionalEventData={"MFAUsed": "No"}, responseElements={"ConsoleLogin": "Success"})
+        compact = compact_event(login)
+        assert compact["additionalEventData"] == {"MFAUsed": "No"}
+        assert compact["responseElements"] == {"ConsoleLogin": "Success"}
+
+    def test_normalised_event_uses_nested_lookup_record(self):
+        event = {
+            "eventID": "ct-1",
+            "eventName": "AuthorizeSecurityGroupIngress",
+            "sourceIPAddress": None,
+            "userIdentity": {},
+            "resources": [],
+            "raw": {"EventName": "AuthorizeSecurityGroupIngress", "CloudTrailEvent": json.dumps(CLOUDTRAIL)},
+        }
+        compact = compact_event(event)
+        assert compact["sourceIPAddress"] == "203.0.113.9"
+        assert compact["requestParameters"]["groupId"] == "sg-1"
+        assert "raw" not in compact
+
+    def test_truncates_long_values_and_lists(self):
+        event = {"eventName": "PutBucketPolicy", "requestParameters": {"policy": "x" * 1000, "ids": list(range(25))}}
+        params = compact_event(event, max_chars=50)["requestParameters"]
+        assert params["policy"] == "x" * 50 + "...[+950 chars]"
+        assert params["ids"][-1] == "...[+15 items]"
+        assert len(params["ids"]) == 11
+
+    def test_unknown_shapes_are_kept_whole(self):
+        assert compact_event({"event": "vpn_login", "user": "bob", "raw": {"x": 1}}) == {"event": "vpn_login", "user": "bob"}
+
+    def test_json_is_minified(self):
+        text = compact_json(CLOUDTRAIL)
+        assert not re.search(r"[:,] ", text)
+        assert len(text) < len(json.dumps(CLOUDTRAIL, indent=2)) / 2
+
+
+class _EchoProvider(CompletionProvider):
+    def __init__(self):
+        super().__init__()
+        self.prompts = []
+
+    @property
+    def name(self) -> str:
+        return "echo"
+
+    async def _complete(self, prompt: str, max_tokens: int) -> str:
+        self.prompts.append(prompt)
+        return '{"threat_detected": true, "risk_score": 0.7, "reasoning": "ok"}'
+
+
+@pytest.mark.asyncio
+async def test_provider_prompts_carry_compact_event_and_report_savings():
+    provider = _EchoProvider()
+    before = get_metrics().get_histogram_stats("llm_prompt_tokens_saved", provider="echo")
+    await provider.analyze(CLOUDTRAIL)
+    assert '"groupId":"sg-1"' in provider.prompts[0]
+    assert "tlsDetails" not in provider.prompts[0]
+    after = get_metrics().get_histogram_stats("llm_prompt_tokens_saved", provider="echo")
+    assert after["count"] == before["count"] + 1
+    assert after["sum"] > before["sum"]
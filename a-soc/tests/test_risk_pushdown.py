@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.asoc.agents import risk_catalogue
+from src.asoc.agents.telemetry import (
+    AWSCloudTrailProvider,
+    AzureCloudProvider,
+    CloudEvent,
+    CompositeCloudProvider,
+    GCPCloudProvider,
+    TelemetryAgent,
+    create_cloud_provider,
+)
+from src.asoc.core.config import Settings
+
+T0 = (datetime.now(timezone.utc) - timedelta(minutes=30)).replace(microsecond=0)
+
+
+class _FakeCloudTrail:
+    """Answers LookupEvents by EventName attribute and records each query."""
+
+    def __init__(self, events_by_name):
+        self.events_by_name = events_by_name
+        self.queries = []
+
+    def get_paginator(self, name):
+        paginator = MagicMock()
+        paginator.paginate.side_effect = self._paginate
+        return paginator
+
+    def _paginate(self, StartTime, PaginationConfig, LookupAttributes=None):
+        name = LookupAttributes[0]["AttributeValue"] if LookupAttributes else None
+        self.queries.append(name)
+        if name is None:
+            yield {"Events": [e for events in self.events_by_name.values() for e in events]}
+        else:
+            yield {"Events": self.events_by_name.get(name, [])}
+
+
+def _raw(event_id: str, name: str) -> dict:
+    return {"EventId": event_id, "EventName": name, "EventTime": T0}
+
+
+class TestRiskCatalogue:
+    def test_event_names_per_provider_and_category(self):
+        assert "StopLogging" in risk_catalogue.event_names("aws")
+        assert risk_catalogue.event_names("aws", ["network_exposure"]) == {
+            "AuthorizeSecurityGroupIngress",
+            "ModifyNetworkInterfaceAttribute",
+        }
+        assert "SetIamPolicy" in risk_catalogue.event_names("gcp", ["all"])
+
+    def test_unknown_category_rejected(self):
+        with pytest.raises(ValueError):
+            risk_catalogue.event_names("aws", ["nope"])
+
+    def test_risk_for_event(self):
+        assert risk_catalogue.risk_for_event("DeleteTrail") == risk_catalogue.HIGH_RISK
+        assert risk_catalogue.risk_for_event("ListObjects") == risk_catalogue.BASELINE_RISK
+
+    @pytest.mark.asyncio
+    async def test_client_side_filter_uses_catalogue(self):
+        agent = TelemetryAgent(provider=MagicMock())
+        kept = await agent._tool_filter_events_by_risk([{"eventName": "StopLogging"}, {"eventName": "ListObjects"}], 0.5)
+        assert [e["eventName"] for e in kept] == ["StopLogging"]
+
+    @pytest.mark.asyncio
+    async def test_client_side_filter_leaves_the_shared_event_dict_alone(self):
+        event = CloudEvent("e1", "StopLogging", "2026-01-01T00:00:00Z", None, {}, [])
+        kept = await TelemetryAgent(provider=MagicMock())._tool_filter_events_by_risk([event.to_dict()], 0.5)
+        assert kept[0]["_risk_heuristic"] == risk_catalogue.HIGH_RISK
+        assert "_risk_heuristic" not in event.to_dict()
+
+
+@pytest.mark.asyncio
+class TestCloudTrailPushdown:
+    async def test_one_lookup_per_event_name(self):
+        provider = AWSCloudTrailProvider(event_names=["DeleteTrail", "StopLogging"], lookup_rate=1000)
+        provider._client = _FakeCloudTrail(
+            {"StopLogging": [_raw("s1", "StopLogging")], "DeleteTrail": [_raw("d1", "DeleteTrail")], "ListBuckets": [_raw("l1", "ListBuckets")]}
+        )
+        events = await provider.fetch_events(max_results=10)
+        assert sorted(provider._client.queries) == ["DeleteTrail", "StopLogging"]
+        assert sorted(e.event_id for e in events) == ["d1", "s1"]
+
+    async def test_filtered_cursor_is_distinct(self):
+        plain = AWSCloudTrailProvider(region="us-east-1", account_id="1")
+        filtered = AWSCloudTrailProvider(region="us-east-1", account_id="1", event_names=["StopLogging"])
+        assert plain.cursor_key != filtered.cursor_key
+        assert filtered.cursor_key.startswith(plain.cursor_key)
+
+
+@pytest.mark.asyncio
+class TestQueryPushdown:
+    async def test_gcp_method_name_clause(self):
+        client = MagicMock()
+        client.list_entries.return_value = SimpleNamespace(pages=[])
+        provider = GCPCloudProvider(project_id="proj", method_names=["SetIamPolicy", "storage.buckets.delete"])
+        provider._client = client
+        [page async for page in provider.stream_events()]
+        log_filter = client.list_entries.call_args.kwargs["filter_"]
+        assert '(protoPayload.methodName="SetIamPolicy" OR protoPayload.methodName="storage.buckets.delete")' in log_filter
+
+    async def test_azure_operation_clause_precedes_projection(self):
+        client = MagicMock()
+        client.query_workspace.return_value = SimpleNamespace(tables=[])
+        provider = AzureCloudProvider(workspace_id="ws", operation_names=["MICROSOFT.INSIGHTS/DIAGNOSTICSETTINGS/DELETE"])
+        provider._client = client
+        [page async for page in provider.stream_events()]
+        query = client.query_workspace.call_args.args[1]
+        assert '| where OperationNameValue in~ ("MICROSOFT.INSIGHTS/DIAGNOSTICSETTINGS/DELETE")' in query
+        assert query.index("OperationNameValue") < query.index("| project")
+
+
+def test_factory_wires_catalogue_into_every_provider(tmp_path):
+    config = Settings(
+        TELEMETRY_WATERMARK_PATH=str(tmp_path / "wm.json"),
+        TELEMETRY_GCP_PROJECTS="proj",
+        TELEMETRY_AZURE_WORKSPACES="ws",
+        TELEMETRY_PUSHDOWN_CATEGORIES="defense_evasion",
+    )
+    provider = create_cloud_provider(config)
+    assert isinstance(provider, CompositeCloudProvider)
+    aws, gcp, azure = provider.providers
+    assert set(aws.event_names) == risk_catalogue.event_names("aws", ["defense_evasion"])
+    assert set(gcp.method_names) == risk_catalogue.event_names("gcp", ["defense_evasion"])
+    assert set(azure.operation_names) == risk_catalogue.event_names("azure", ["defense_evasion"])
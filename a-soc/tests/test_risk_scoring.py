@@ -32,3 +32,10 @@ def test_requires_approval():
     assert RiskScorer.requires_approval(0.6) is True
     assert RiskScorer.requires_approval(0.3) is False
     assert RiskScorer.requires_approval(0.5) is True
+
+
+def test_anomaly_boost():
+    assert RiskScorer.anomaly_boost(2.9) == 0.0
+    assert RiskScorer.anomaly_boost(3.0) == 0.1
+    assert RiskScorer.anomaly_boost(50.0) == 0.25
+    assert RiskScorer.score_action("LOG_QUERY", {"baseline_zscore": 4.0}) == 0.25
@@ -0,0 +1,138 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.asoc.agents.detection import DetectionAgent
+from src.asoc.agents.message import ASOCMessage, MessageType, Priority
+from src.asoc.agents.sequences import DEFAULT_SEQUENCES, SequenceEngine, SequenceRule
+from src.asoc.llm.providers import MockProvider
+
+T0 = 1_700_000_000
+RULE = SequenceRule.of("chain", ["CreateAccessKey", "AttachUserPolicy|PutUserPolicy", "StopLogging"], window_seconds=600)
+
+
+def _event(name, at, user="alice", **extra):
+    return {"eventName": name, "eventTime": T0 + at if isinstance(at, int) else at, "userIdentity": {"userName": user}, **extra}
+
+
+class TestSequenceRule:
+    def test_steps_parse_alternatives(self):
+        assert RULE.steps[1] == frozenset({"AttachUserPolicy", "PutUserPolicy"})
+        assert RULE.describe() == "CreateAccessKey -> AttachUserPolicy|PutUserPolicy -> StopLogging"
+
+    def test_rejects_single_step_and_bad_window(self):
+        with pytest.raises(ValueError, match="two"):
+            SequenceRule.of("x", ["StopLogging"], window_seconds=60)
+        with pytest.raises(ValueError, match="window"):
+            SequenceRule.of("x", ["A", "B"], window_seconds=0)
+
+
+class TestSequenceEngine:
+    def test_chain_within_window_matches_once(self):
+        engine = SequenceEngine([RULE])
+        events = [
+            _event("CreateAccessKey", 0, eventID="a"),
+            _event("GetObject", 10),
+            _event("PutUserPolicy", 100, eventID="b"),
+            _event("StopLogging", 500, eventID="c"),
+            _event("StopLogging", 510),
+        ]
+        matches = engine.observe_many(events)
+        assert len(matches) == 1
+        assert matches[0].to_dict()["steps"] == ["CreateAccessKey", "PutUserPolicy", "StopLogging"]
+        assert matches[0].to_dict()["event_ids"] == ["a", "b", "c"]
+        assert len(engine) == 0
+
+    def test_window_is_measured_from_the_first_step(self):
+        engine = SequenceEngine([RULE])
+        assert not engine.observe_many([
+            _event("CreateAccessKey", 0),
+            _event("AttachUserPolicy", 300),
+            _event("StopLogging", 700),
+        ])
+
+    def test_later_start_rescues_an_expiring_chain(self):
+        engine = SequenceEngine([RULE])
+        matches = engine.observe_many([
+            _event("CreateAccessKey", 0),
+            _event("CreateAccessKey", 400),
+            _event("AttachUserPolicy", 500),
+            _event("StopLogging", 900),
+        ])
+        assert [m.started for m in matches] == [T0 + 400]
+
+    def test_out_of_order_and_other_principals_do_not_match(self):
+        engine = SequenceEngine([RULE])
+        assert not engine.observe_many([
+            _event("AttachUserPolicy", 0),
+            _event("CreateAccessKey", 10),
+            _event("StopLogging", 20),
+            _event("CreateAccessKey", 30, user="bob"),
+            _event("AttachUserPolicy", 40),
+            _event("StopLogging", 50, user="bob"),
+        ])
+
+    def test_failed_calls_are_ignored(self):
+        engine = SequenceEngine([RULE])
+        assert not engine.observe_many([
+            _event("CreateAccessKey", 0),
+            _event("AttachUserPolicy", 10, errorCode="AccessDenied"),
+            _event("StopLogging", 20),
+        ])
+
+    def test_repeated_step_name_does_not_skip_ahead(self):
+        rule = SequenceRule.of("twice", ["AssumeRole", "AssumeRole"], window_seconds=60)
+        engine = SequenceEngine([rule])
+        assert not engine.observe(_event("AssumeRole", 0))
+        assert len(engine.observe(_event("AssumeRole", 30))) == 1
+
+    def test_sweep_expires_and_caps_state(self):
+        engine = SequenceEngine([RULE], max_states=10, sweep_every=1_000_000)
+        for i in range(11):
+            engine.observe(_event("CreateAccessKey", i, user=f"u{i}"))
+        # Trimmed below the cap, oldest first, so the next new entity does not sweep again.
+        assert len(engine) == 9
+        assert (0, "u0") not in engine._states and (0, "u2") in engine._states
+        engine.observe(_event("CreateAccessKey", 11, user="u11"))
+        assert len(engine) == 10
+        engine.observe(_event("CreateAccessKey", 10_000, user="late"))
+        engine.sweep()
+        assert len(engine) == 1
+
+    def test_iso_timestamps(self):
+        engine = SequenceEngine(DEFAULT_SEQUENCES)
+        matches = engine.observe_many([
+            _event("CreateUser", "2026-01-01T00:00:00Z"),
+            _event("CreateLoginProfile", "2026-01-01T00:10:00Z"),
+            _event("AddUserToGroup", "2026-01-01T00:20:00Z"),
+        ])
+        assert [m.rule.name for m in matches] == ["new_user_persistence"]
+
+
+@pytest.mark.asyncio
+class TestDetectionCorrelation:
+    async def test_kill_chain_raises_one_correlated_alert(self):
+        agent = DetectionAgent(provider=MockProvider())
+        agent.send_messages = AsyncMock()
+        agent.log_events = AsyncMock()
+        chain = [
+            _event("CreateAccessKey", "2026-01-01T00:00:00Z", eventID="e-1"),
+            _event("AttachUserPolicy", "2026-01-01T00:05:00Z", eventID="e-2"),
+            _event("StopLogging", "2026-01-01T00:09:00Z", eventID="e-3"),
+        ]
+        unrelated = _event("RunInstances", "2026-01-01T00:06:00Z", user="bob", eventID="e-4")
+        messages = [
+            ASOCMessage(message_type=MessageType.ALERT, source_agent="TelemetryAgent", payload={"event": e})
+            for e in chain[:2] + [unrelated] + chain[2:]
+        ]
+        results = await agent.process_messages(messages)
+        assert len(results) == 2
+        assert results[0].payload["original_event"]["eventID"] == "e-4"
+        correlated = results[1].payload
+        assert correlated["correlation"]["rule"] == "access_key_escalation_then_evasion"
+        assert [child["event_id"] for child in correlated["children"]] == ["e-1", "e-2", "e-3"]
+        assert correlated["risk_score"] >= max(child["risk_score"] for child in correlated["children"])
+        assert results[1].priority == Priority.CRITICAL
+        assert len(agent.send_messages.await_args.args[0]) == 2
+        # Every event's verdict is still recorded for the triage model.
+        assert len(agent.log_events.await_args.args[1]) == 5
@@ -0,0 +1,160 @@
+import asyncio
+import operator
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Annotated, List, TypedDict
+
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.graph import END, StateGraph
+
+from src.asoc.core.checkpoint_compaction import CheckpointCompactor, RetentionPolicy
+from src.asoc.core.sqlite_checkpoint import SQLiteCheckpointSaver, SQLiteCheckpointStore
+
+
+def _checkpoint(ts: datetime):
+    cp = empty_checkpoint()
+    cp["ts"] = ts.isoformat()
+    return cp
+
+
+def _config(thread_id: str, ns: str = "a-soc-incidents", checkpoint_id=None) -> dict:
+    cfg = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns}}
+    if checkpoint_id:
+        cfg["configurable"]["checkpoint_id"] = checkpoint_id
+    return cfg
+
+
+class _State(TypedDict):
+    steps: Annotated[List[str], operator.add]
+
+
+def _build_graph(saver):
+    graph = StateGraph(_State)
+    graph.add_node("a", lambda s: {"steps": ["a"]})
+    graph.add_node("b", lambda s: {"steps": ["b"]})
+    graph.set_entry_point("a")
+    graph.add_edge("a", "b")
+    graph.add_edge("b", END)
+    return graph.compile(checkpointer=saver)
+
+
+class TestSQLiteCheckpointSaver:
+    def test_put_and_get_roundtrip(self, tmp_path):
+        saver = SQLiteCheckpointSaver(str(tmp_path / "cp.db"), flush_interval=0)
+        cp = _checkpoint(datetime.now(timezone.utc))
+        saved = saver.put(_config("t1"), cp, {"source": "input", "step": 0}, {})
+        loaded = saver.get_tuple(_config("t1"))
+        assert loaded.checkpoint["id"] == cp["id"]
+        assert loaded.config == saved
+        assert loaded.metadata["step"] == 0
+        saver.close()
+
+    def test_uses_wal_journal(self, tmp_path):
+        saver = SQLiteCheckpointSaver(str(tmp_path / "cp.db"))
+        saver.setup()
+        mode = saver._conn.execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode.lower() == "wal"
+        saver.close()
+
+    def test_writes_are_batched_until_threshold(self, tmp_path):
+        saver = SQLiteCheckpointSaver(str(tmp_path / "cp.db"), batch_size=10, flush_interval=60)
+        for _ in range(9):
+            saver.put(_config("t1"), _checkpoint(datetime.now(timezone.utc)), {}, {})
+        assert saver.flushes == 0
+        saver.put(_config("t1"), _checkpoint(datetime.now(timezone.utc)), {}, {})
+        assert saver.flushes == 1
+        assert saver.rows_written == 10
+        saver.close()
+
+    def test_reads_see_unflushed_writes(self, tmp_path):
+        saver = SQLiteCheckpointSaver(str(tmp_path / "cp.db"), batch_size=1000, flush_interval=60)
+        cp = _checkpoint(datetime.now(timezone.utc))
+        saver.put(_config("t1"), cp, {}, {})
+        assert saver.get_tuple(_config("t1")).checkpoint["id"] == cp["id"]
+        saver.close()
+
+    def test_pending_writes_attached_to_checkpoint(self, tmp_path):
+        saver = SQLiteCheckpointSaver(str(tmp_path / "cp.db"), flush_interval=0)
+        saved = saver.put(_config("t1"), _checkpoint(datetime.now(timezone.utc)), {}, {})
+        saver.put_writes(saved, [("steps", ["x"])], task_id="task-1")
+        loaded = saver.get_tuple(_config("t1"))
+        assert loaded.pending_writes == [("task-1", "steps", ["x"])]
+        saver.close()
+
+    def test_list_respects_before_and_limit(self, tmp_path):
+        saver = SQLiteCheckpointSaver(str(tmp_path / "cp.db"), flush_interval=0)
+        ids = []
+        for _ in range(4):
+            cp = _checkpoint(datetime.now(timezone.utc))
+            saver.put(_config("t1"), cp, {}, {})
+            ids.append(cp["id"])
+        listed = [t.checkpoint["id"] for t in saver.list(_config("t1"), before=_config("t1", checkpoint_id=ids[-1]), limit=2)]
+        assert listed == [ids[2], ids[1]]
+        saver.close()
+
+    def test_state_survives_restart(self, tmp_path):
+        path = str(tmp_path / "cp.db")
+        saver = SQLiteCheckpointSaver(path, batch_size=1000, flush_interval=60)
+        graph = _build_graph(saver)
+        graph.invoke({"steps": []}, _config("incident-1", ns=""))
+        saver.close()
+
+        reopened = SQLiteCheckpointSaver(path)
+        state = _build_graph(reopened).get_state(_config("incident-1", ns=""))
+        assert state.values["steps"] == ["a", "b"]
+        reopened.close()
+
+    @pytest.mark.asyncio
+    async def test_async_graph_execution(self, tmp_path):
+        saver = SQLiteCheckpointSaver(str(tmp_path / "cp.db"))
+        graph = _build_graph(saver)
+        result = await graph.ainvoke({"steps": []}, _config("incident-2", ns=""))
+        assert result["steps"] == ["a", "b"]
+        history = [t async for t in saver.alist(_config("incident-2", ns=""))]
+        assert len(history) >= 3
+        saver.close()
+
+    @pytest.mark.asyncio
+    async def test_aput_does_not_block_the_loop(self, tmp_path):
+        saver = SQLiteCheckpointSaver(str(tmp_path / "cp.db"), flush_interval=0)
+        saver.setup()
+        release = threading.Event()
+
+        def hold_lock():
+            with saver._lock:
+                release.wait(5)
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        put = asyncio.create_task(saver.aput(_config("t1"), _checkpoint(datetime.now(timezone.utc)), {}, {}))
+        await asyncio.sleep(0.05)
+        # The loop kept running while the put waited on the flusher's lock.
+        assert not put.done()
+        release.set()
+        saved = await put
+        holder.join()
+        assert saver.get_tuple(_config("t1")).config == saved
+        saver.close()
+
+
+@pytest.mark.asyncio
+class TestSQLiteCompaction:
+    async def test_compactor_keeps_final_checkpoint(self, tmp_path):
+        saver = SQLiteCheckpointSaver(str(tmp_path / "cp.db"), flush_interval=0)
+        old = datetime.now(timezone.utc) - timedelta(hours=5)
+        for i in range(8):
+            saver.put(_config("incident-9"), _checkpoint(old + timedelta(seconds=i)), {}, {})
+        final = saver.get_tuple(_config("incident-9")).checkpoint["id"]
+
+        compactor = CheckpointCompactor(
+            SQLiteCheckpointStore(saver),
+            {"a-soc-incidents": RetentionPolicy("a-soc-incidents", keep_last=1, idle_seconds=60)},
+            batch_size=3,
+            pause_seconds=0,
+        )
+        stats = await compactor.run_once()
+        remaining = list(saver.list(_config("incident-9")))
+        assert stats.checkpoints_deleted == 7
+        assert [t.checkpoint["id"] for t in remaining] == [final]
+        saver.close()
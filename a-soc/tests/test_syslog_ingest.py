@@ -0,0 +1,157 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.asoc.agents.syslog_ingest import SyslogIngestServer, _rfc3164_time, parse_line
+from src.asoc.core.metrics import get_metrics
+
+CEF = (
+    "CEF:0|Palo Alto|PAN-OS|10.1|THREAT|Brute\\|force login|8|"
+    "src=203.0.113.9 dst=10.0.0.5 suser=admin rt=1772366400000 msg=too many failures externalId=pan-77"
+)
+
+
+class TestParseLine:
+    def test_rfc5424(self):
+        event = parse_line(
+            '<86>1 2026-03-01T12:00:00Z bastion sshd 4123 AUTHFAIL [meta x="1"] Failed password for root', "10.9.9.9"
+        )
+        assert event.event_name == "AUTHFAIL"
+        assert event.event_time == "2026-03-01T12:00:00Z"
+        assert event.source_ip == "10.9.9.9"
+        assert event.user_identity["hostName"] == "bastion"
+        assert event.resources[0]["severity"] == "info"
+        assert event.resources[0]["facility"] == 10
+        assert event.resources[0]["message"] == "Failed password for root"
+
+    def test_rfc3164(self):
+        event = parse_line("<38>Mar  1 12:00:00 fw01 sshd[99]: Accepted publickey for ops", "10.9.9.9")
+        assert event.event_name == "sshd"
+        assert event.user_identity["hostName"] == "fw01"
+        assert event.resources[0]["message"] == "Accepted publickey for ops"
+
+    def test_rfc3164_year_is_the_one_closest_to_now(self):
+        new_year = datetime(2027, 1, 1, 0, 5, tzinfo=timezone.utc)
+        assert _rfc3164_time("Dec 31 23:59:00", new_year) == "2026-12-31T23:59:00+00:00"
+        new_years_eve = datetime(2026, 12, 31, 23, 59, tzinfo=timezone.utc)
+        assert _rfc3164_time("Jan  1 00:01:00", new_years_eve) == "2027-01-01T00:01:00+00:00"
+        assert _rfc3164_time("Feb 29 10:00:00", datetime(2029, 3, 1, tzinfo=timezone.utc)) == "2028-02-29T10:00:00+00:00"
+
+    def test_rfc3164_impossible_dates_are_unparsed(self):
+        assert parse_line("<13>Feb 30 10:00:00 host app: msg") is None
+        assert _rfc3164_time("Feb 29 10:00:00", datetime(2026, 3, 1, tzinfo=timezone.utc)) is None
+
+    def test_cef_bare_and_inside_syslog(self):
+        event = parse_line(CEF)
+        assert event.event_id == "pan-77"
+        assert event.event_name == "Brute|force login"
+        assert event.source_ip == "203.0.113.9"
+        assert event.user_identity["userName"] == "admin"
+        assert event.event_time.startswith("2026-03-01T12:00:00")
+        assert event.resources[0]["message"] == "too many failures"
+        wrapped = parse_line("<134>1 2026-03-01T12:00:00Z fw PAN - - - " + CEF, "10.0.0.1")
+        assert wrapped.event_id == "pan-77"
+
+    def test_json_cloudtrail_and_generic(self):
+        record = {"eventVersion": "1.08", "eventID": "ct-1", "eventName": "ConsoleLogin", "eventTime": "2026-03-01T12:00:00Z"}
+        assert parse_line(json.dumps(record)).event_name == "ConsoleLogin"
+        generic = parse_line(json.dumps({"event": "vpn_login", "user": "bob"}), "10.0.0.2")
+        assert generic.event_name == "vpn_login"
+        assert generic.source_ip == "10.0.0.2"
+
+    def test_unrecognised_and_blank(self):
+        assert parse_line("hello world") is None
+        assert parse_line("   ") is None
+        assert parse_line("{broken") is None
+
+    def test_retransmission_keeps_event_id(self):
+        line = "<13>1 2026-03-01T12:00:00Z h app - - - same"
+        assert parse_line(line, "1.1.1.1").event_id == parse_line(line, "1.1.1.1").event_id
+
+
+def _agent():
+    agent = MagicMock()
+    agent.emit_events = AsyncMock()
+    return agent
+
+
+@pytest.mark.asyncio
+class TestSyslogIngestServer:
+    async def test_udp_and_tcp_lines_are_micro_batched(self):
+        agent = _agent()
+        server = SyslogIngestServer(agent, host="127.0.0.1", udp_port=0, tcp_port=0, batch_size=3, batch_ms=20)
+        await server.start()
+        try:
+            loop = asyncio.get_running_loop()
+            transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=server.udp_address)
+            transport.sendto(b"<13>1 2026-03-01T12:00:00Z h app - - - one\n<13>1 2026-03-01T12:00:00Z h app - - - two")
+            transport.close()
+            _, writer = await asyncio.open_connection(*server.tcp_address)
+            writer.write((CEF + "\n").encode() + b"not syslog\n")
+            await writer.drain()
+            writer.close()
+            for _ in range(100):
+                if server.published == 3:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await server.stop()
+        assert server.published == 3
+        assert server.unparsed == 1
+        published = [e for call in agent.emit_events.await_args_list for e in call.args[0]]
+        assert {e.event_name for e in published} == {"app", "Brute|force login"}
+        assert all(call.kwargs["provider"] == "syslog" for call in agent.emit_events.await_args_list)
+
+    async def test_parser_errors_are_counted_and_the_rest_of_the_datagram_kept(self, monkeypatch):
+        from src.asoc.agents import syslog_ingest
+
+        parse = syslog_ingest.parse_line
+
+        def fragile(line, peer=None):
+            if "boom" in line:
+                raise ValueError("day is out of range for month")
+            return parse(line, peer)
+
+        monkeypatch.setattr(syslog_ingest, "parse_line", fragile)
+        server = SyslogIngestServer(_agent(), udp_port=None, tcp_port=None)
+        before = get_metrics().get_counter("syslog_lines_unparsed_total", transport="udp")
+        syslog_ingest._UDPProtocol(server).datagram_received(("boom\n" + CEF).encode(), ("10.0.0.1", 514))
+        assert (server.unparsed, server._queue.qsize()) == (1, 1)
+        assert get_metrics().get_counter("syslog_lines_unparsed_total", transport="udp") - before == 1
+
+    async def test_batch_flushes_after_batch_ms(self):
+        agent = _agent()
+        server = SyslogIngestServer(agent, udp_port=None, tcp_port=None, batch_size=100, batch_ms=10)
+        await server.start()
+        server.submit(CEF, None, "udp")
+        await asyncio.sleep(0.1)
+        assert agent.emit_events.await_count == 1
+        await server.stop()
+
+    async def test_full_queue_sheds_and_counts(self):
+        agent = _agent()
+        server = SyslogIngestServer(agent, udp_port=None, tcp_port=None, batch_size=10, queue_size=2)
+        before = get_metrics().get_counter("syslog_events_shed_total", transport="udp")
+        results = [server.submit(CEF, None, "udp") for _ in range(5)]
+        assert results == [True, True, False, False, False]
+        assert server.shed == 3
+        assert get_metrics().get_counter("syslog_events_shed_total", transport="udp") - before == 3
+
+        await server.start()
+        await server.stop()
+        assert server.published == 2
+
+    async def test_failed_publish_is_counted_not_reported_as_published(self):
+        agent = _agent()
+        agent.emit_events = AsyncMock(return_value=False)
+        server = SyslogIngestServer(agent, udp_port=None, tcp_port=None, batch_size=10)
+        before = get_metrics().get_counter("syslog_publish_failures_total")
+        server.submit(CEF, None, "udp")
+        await server.start()
+        await server.stop()
+        assert agent.emit_events.await_count == 1
+        assert server.published == 0
+        assert get_metrics().get_counter("syslog_publish_failures_total") - before == 1
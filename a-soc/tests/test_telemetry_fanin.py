@@ -0,0 +1,146 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.asoc.agents.telemetry import (
+    AWSCloudTrailProvider,
+    AzureCloudProvider,
+    BaseCloudProvider,
+    CloudEvent,
+    CompositeCloudProvider,
+    GCPCloudProvider,
+    create_cloud_provider,
+)
+from src.asoc.core.config import Settings
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _event(event_id: str, minutes: int) -> CloudEvent:
+    return CloudEvent(event_id, "ConsoleLogin", (T0 + timedelta(minutes=minutes)).isoformat(), None, {}, [], {})
+
+
+class _StaticProvider(BaseCloudProvider):
+    def __init__(self, events, delay=0.0, fail=False):
+        self.events = events
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.committed = False
+
+    async def fetch_events(self, max_results=10, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("throttled")
+        return list(self.events)
+
+    async def commit_cursor(self):
+        self.committed = True
+
+    async def health_check(self):
+        return not self.fail
+
+
+@pytest.mark.asyncio
+class TestCompositeCloudProvider:
+    async def test_merges_streams_by_event_time(self):
+        composite = CompositeCloudProvider(
+            [
+                _StaticProvider([_event("a3", 3), _event("a1", 1)]),
+                _StaticProvider([_event("b0", 0), _event("b2", 2)]),
+                _StaticProvider([_event("c4", 4)]),
+            ]
+        )
+        events = await composite.fetch_events()
+        assert [e.event_id for e in events] == ["b0", "a1", "b2", "a3", "c4"]
+
+    async def test_providers_are_polled_concurrently(self):
+        composite = CompositeCloudProvider([_StaticProvider([_event(f"e{i}", i)], delay=0.1) for i in range(20)])
+        start = time.perf_counter()
+        events = await composite.fetch_events()
+        assert len(events) == 20
+        assert time.perf_counter() - start < 0.5
+
+    async def test_failing_or_slow_provider_does_not_block_merge(self):
+        composite = CompositeCloudProvider(
+            [
+                _StaticProvider([_event("ok", 0)]),
+                _StaticProvider([], fail=True),
+                _StaticProvider([_event("late", 1)], delay=1.0),
+            ],
+            timeout=0.1,
+        )
+        events = await composite.fetch_events()
+        assert [e.event_id for e in events] == ["ok"]
+
+    async def test_rate_limiter_paces_each_provider(self):
+        child = _StaticProvider([_event("e", 0)])
+        composite = CompositeCloudProvider([child], rate_limit=10.0, burst=1)
+        start = time.perf_counter()
+        for _ in range(3):
+            await composite.fetch_events()
+        assert child.calls == 3
+        assert time.perf_counter() - start >= 0.15
+
+    async def test_zero_rate_limit_means_unpaced(self):
+        child = _StaticProvider([_event("e", 0)])
+        composite = CompositeCloudProvider([child], rate_limit=0, burst=1)
+        for _ in range(3):
+            await asyncio.wait_for(composite.fetch_events(), 1.0)
+        assert child.calls == 3
+
+    async def test_commit_cursor_fans_out(self):
+        children = [_StaticProvider([]), _StaticProvider([])]
+        composite = CompositeCloudProvider(children)
+        await composite.fetch_events()
+        await composite.commit_cursor()
+        assert all(c.committed for c in children)
+
+    async def test_commit_skips_children_that_failed_this_poll(self):
+        ok, failed, slow = _StaticProvider([_event("a", 0)]), _StaticProvider([], fail=True), _StaticProvider([], delay=1.0)
+        composite = CompositeCloudProvider([ok, failed, slow], timeout=0.1)
+        await composite.fetch_events()
+        await composite.commit_cursor()
+        assert (ok.committed, failed.committed, slow.committed) == (True, False, False)
+
+        ok.committed = False
+        await composite.commit_cursor()
+        assert not ok.committed
+
+    async def test_stream_commits_only_completed_children(self):
+        ok, failed = _StaticProvider([_event("a", 0)]), _StaticProvider([], fail=True)
+        composite = CompositeCloudProvider([ok, failed])
+        assert [e.event_id async for page in composite.stream_events() for e in page] == ["a"]
+        await composite.commit_cursor()
+        assert (ok.committed, failed.committed) == (True, False)
+
+
+class TestCreateCloudProvider:
+    def test_single_region_returns_plain_provider(self, tmp_path):
+        config = Settings(AWS_REGION="eu-west-1", TELEMETRY_WATERMARK_PATH=str(tmp_path / "wm.json"))
+        provider = create_cloud_provider(config)
+        assert isinstance(provider, AWSCloudTrailProvider)
+        assert provider.region == "eu-west-1"
+
+    def test_fan_out_across_roles_regions_and_clouds(self, tmp_path):
+        config = Settings(
+            TELEMETRY_WATERMARK_PATH=str(tmp_path / "wm.json"),
+            TELEMETRY_AWS_REGIONS="us-east-1, eu-west-1",
+            TELEMETRY_AWS_ROLE_ARNS="arn:aws:iam::111111111111:role/asoc,arn:aws:iam::222222222222:role/asoc",
+            TELEMETRY_GCP_PROJECTS="proj-a",
+            TELEMETRY_AZURE_WORKSPACES="ws-1,ws-2",
+        )
+        provider = create_cloud_provider(config)
+        assert isinstance(provider, CompositeCloudProvider)
+        aws = [p for p in provider.providers if isinstance(p, AWSCloudTrailProvider)]
+        assert {p.cursor_key for p in aws} == {
+            "aws:111111111111:us-east-1",
+            "aws:111111111111:eu-west-1",
+            "aws:222222222222:us-east-1",
+            "aws:222222222222:eu-west-1",
+        }
+        assert sum(isinstance(p, GCPCloudProvider) for p in provider.providers) == 1
+        assert [p.workspace_id for p in provider.providers if isinstance(p, AzureCloudProvider)] == ["ws-1", "ws-2"]
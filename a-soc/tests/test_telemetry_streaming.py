@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.asoc.agents.telemetry import (
+    AWSCloudTrailProvider,
+    CompositeCloudProvider,
+    GCPCloudProvider,
+    _stream_pages,
+)
+from src.asoc.core.watermarks import WatermarkStore
+
+T0 = (datetime.now(timezone.utc) - timedelta(minutes=30)).replace(microsecond=0)
+
+
+def _cloudtrail_client(pages):
+    paginator = MagicMock()
+    paginator.paginate.return_value = iter(pages)
+    client = MagicMock()
+    client.get_paginator.return_value = paginator
+    return client
+
+
+def _raw(event_id: str, seconds: int) -> dict:
+    return {"EventId": event_id, "EventName": "ConsoleLogin", "EventTime": T0 + timedelta(seconds=seconds)}
+
+
+@pytest.mark.asyncio
+class TestStreamPages:
+    async def test_yields_pages_in_order(self):
+        pages = [[i] for i in range(5)]
+        assert [p async for p in _stream_pages(lambda: iter(pages))] == pages
+
+    async def test_prefetch_is_bounded(self):
+        produced = []
+
+        def _pages():
+            for i in range(10):
+                produced.append(i)
+                yield [i]
+
+        stream = _stream_pages(_pages, prefetch=2)
+        first = await stream.__anext__()
+        time.sleep(0.05)
+        assert first == [0]
+        # one page consumed, two queued, one blocked waiting for space
+        assert len(produced) <= 4
+        await stream.aclose()
+
+    async def test_iterator_errors_reach_the_consumer(self):
+        def _pages():
+            yield [1]
+            raise RuntimeError("ThrottlingException")
+
+        stream = _stream_pages(_pages)
+        assert await stream.__anext__() == [1]
+        with pytest.raises(RuntimeError, match="Throttling"):
+            await stream.__anext__()
+
+    async def test_early_close_stops_producer(self):
+        finished = threading.Event()
+
+        def _pages():
+            try:
+                for i in range(1000):
+                    yield [i]
+            finally:
+                finished.set()
+
+        stream = _stream_pages(_pages, prefetch=1)
+        await stream.__anext__()
+        await stream.aclose()
+        for _ in range(100):
+            if finished.is_set():
+                break
+            await asyncio.sleep(0.01)
+        assert finished.is_set()
+
+
+@pytest.mark.asyncio
+class TestProviderStreams:
+    async def test_cloudtrail_streams_each_page(self):
+        provider = AWSCloudTrailProvider(lookup_rate=1000)
+        provider._client = _cloudtrail_client([{"Events": [_raw("e2", 2), _raw("e1", 1)]}, {"Events": [_raw("e0", 0)]}])
+        pages = [[e.event_id for e in page] async for page in provider.stream_events()]
+        assert pages == [["e2", "e1"], ["e0"]]
+
+    async def test_incremental_stream_stages_cursor_only_when_exhausted(self, tmp_path):
+        provider = AWSCloudTrailProvider(watermarks=WatermarkStore(str(tmp_path / "wm.json")), lookup_rate=1000)
+        provider._client = _cloudtrail_client([{"Events": [_raw("e1", 1)]}, {"Events": [_raw("e0", 0)]}])
+        async for _ in provider.stream_events(incremental=True):
+            break
+        assert provider._staged is None
+
+        provider._client = _cloudtrail_client([{"Events": [_raw("e1", 1)]}, {"Events": [_raw("e0", 0)]}])
+        async for _ in provider.stream_events(incremental=True):
+            pass
+        assert provider._staged.boundary_ids == ["e1"]
+
+    async def test_gcp_streams_sdk_pages(self):
+        entry = lambda i: SimpleNamespace(  # noqa: E731
+            payload={"insertId": f"g{i}", "protoPayload": {"methodName": "SetIamPolicy"}, "timestamp": T0.isoformat()}
+        )
+        client = MagicMock()
+        client.list_entries.return_value = SimpleNamespace(pages=[[entry(0), entry(1)], [entry(2)]])
+        provider = GCPCloudProvider(project_id="proj")
+        provider._client = client
+        pages = [[e.event_id for e in page] async for page in provider.stream_events()]
+        assert pages == [["g0", "g1"], ["g2"]]
+
+    async def test_composite_interleaves_child_streams(self):
+        children = []
+        for name in ("a", "b"):
+            child = AWSCloudTrailProvider(account_id=name, lookup_rate=1000)
+            child._client = _cloudtrail_client([{"Events": [_raw(f"{name}{i}", i)]} for i in range(3)])
+            children.append(child)
+        pages = [page async for page in CompositeCloudProvider(children, rate_limit=100.0).stream_events()]
+        assert sorted(e.event_id for page in pages for e in page) == ["a0", "a1", "a2", "b0", "b1", "b2"]
@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.asoc.agents.telemetry import AWSCloudTrailProvider, TelemetryAgent
+from src.asoc.core.watermarks import Watermark, WatermarkStore
+
+T0 = (datetime.now(timezone.utc) - timedelta(minutes=30)).replace(microsecond=0)
+
+
+def _raw(event_id: str, seconds: int) -> dict:
+    return {"EventId": event_id, "EventName": "ConsoleLogin", "EventTime": T0 + timedelta(seconds=seconds)}
+
+
+class _FakeCloudTrail:
+    """Serves LookupEvents newest-first in pages, honouring StartTime."""
+
+    def __init__(self, events, page_size=2):
+        self.events = events
+        self.page_size = page_size
+        self.calls = []
+
+    def get_paginator(self, name):
+        paginator = MagicMock()
+        paginator.paginate.side_effect = self._paginate
+        return paginator
+
+    def _paginate(self, StartTime, PaginationConfig):
+        self.calls.append(StartTime)
+        matching = sorted((e for e in self.events if e["EventTime"] >= StartTime), key=lambda e: e["EventTime"], reverse=True)
+        for i in range(0, len(matching), self.page_size):
+            yield {"Events": matching[i : i + self.page_size]}
+
+
+def _provider(tmp_path, events):
+    provider = AWSCloudTrailProvider(
+        region="eu-west-1", account_id="123", watermarks=WatermarkStore(str(tmp_path / "wm.json")), lookup_rate=1000
+    )
+    provider._client = _FakeCloudTrail(events)
+    return provider
+
+
+class TestWatermark:
+    def test_filter_drops_boundary_duplicates(self):
+        wm = Watermark(event_time=T0.isoformat(), boundary_ids=["a"])
+        items = [("a", T0, "a"), ("b", T0, "b"), ("c", T0 + timedelta(seconds=1), "c"), ("old", T0 - timedelta(seconds=1), "old")]
+        assert wm.filter_new(items) == ["b", "c"]
+
+    def test_advance_collects_ids_at_newest_time(self):
+        wm = Watermark.advance(None, [("a", T0), ("b", T0 + timedelta(seconds=5)), ("c", T0 + timedelta(seconds=5))])
+        assert wm.time == T0 + timedelta(seconds=5)
+        assert wm.boundary_ids == ["b", "c"]
+
+    def test_store_persists_across_instances(self, tmp_path):
+        path = str(tmp_path / "wm.json")
+        WatermarkStore(path).set("aws:123:eu-west-1", Watermark(T0.isoformat(), ["x"]))
+        assert WatermarkStore(path).get("aws:123:eu-west-1").boundary_ids == ["x"]
+
+
+@pytest.mark.asyncio
+class TestIncrementalCloudTrail:
+    async def test_pages_through_all_new_events_in_order(self, tmp_path):
+        provider = _provider(tmp_path, [_raw(f"e{i}", i) for i in range(7)])
+        events = await provider.fetch_events(max_results=5, incremental=True, start_time=None)
+        assert [e.event_id for e in events] == [f"e{i}" for i in range(7)]
+
+    async def test_resumes_from_watermark_without_duplicates(self, tmp_path):
+        trail_events = [_raw("e0", 0), _raw("e1", 10), _raw("e2", 10)]
+        provider = _provider(tmp_path, trail_events)
+        await provider.fetch_events(incremental=True)
+        await provider.commit_cursor()
+
+        trail_events.append(_raw("e3", 10))
+        trail_events.append(_raw("e4", 20))
+        events = await provider.fetch_events(incremental=True)
+        assert [e.event_id for e in events] == ["e3", "e4"]
+        assert provider._client.calls[-1] == T0 + timedelta(seconds=10)
+
+    async def test_uncommitted_cursor_redelivers(self, tmp_path):
+        provider = _provider(tmp_path, [_raw("e0", 0)])
+        await provider.fetch_events(incremental=True)
+        events = await provider.fetch_events(incremental=True)
+        assert [e.event_id for e in events] == ["e0"]
+
+    async def test_failed_poll_does_not_commit_an_earlier_stage(self, tmp_path):
+        provider = _provider(tmp_path, [_raw("e0", 0), _raw("e1", 1)])
+        await provider.fetch_events(incremental=True)
+        # That poll's events were never published; the next one is throttled.
+        client, provider._client = provider._client, MagicMock()
+        provider._client.get_paginator.return_value.paginate.side_effect = RuntimeError("ThrottlingException")
+        assert await provider.fetch_events(incremental=True) == []
+        await provider.commit_cursor()
+        assert provider.watermarks.get(provider.cursor_key) is None
+
+        provider._client = client
+        events = await provider.fetch_events(incremental=True)
+        assert [e.event_id for e in events] == ["e0", "e1"]
+
+    async def test_no_new_events_returns_empty_not_mocks(self, tmp_path):
+        provider = _provider(tmp_path, [_raw("e0", 0)])
+        await provider.fetch_events(incremental=True)
+        await provider.commit_cursor()
+        assert await provider.fetch_events(incremental=True) == []
+
+    async def test_poll_cloudtrail_commits_cursor_after_publish(self, tmp_path):
+        provider = _provider(tmp_path, [_raw("e0", 0), _raw("e1", 1)])
+        agent = TelemetryAgent(provider=provider)
+        agent.send_messages = AsyncMock()
+        agent.log_events = AsyncMock()
+
+        result = await agent.poll_cloudtrail()
+        assert len(result.payload["events"]) == 2
+        assert provider.watermarks.get(provider.cursor_key).boundary_ids == ["e1"]
+        assert await agent.poll_cloudtrail() is None
+
+    async def test_failed_publish_leaves_the_watermark(self, tmp_path):
+        provider = _provider(tmp_path, [_raw("e0", 0), _raw("e1", 1)])
+        agent = TelemetryAgent(provider=provider)
+        agent.log_events = AsyncMock(return_value=True)
+        bus = MagicMock()
+        bus.publish_batch = AsyncMock(side_effect=ConnectionError("redis down"))
+        with patch("src.asoc.core.message_bus.get_message_bus", AsyncMock(return_value=bus)):
+            await agent.poll_cloudtrail()
+        bus.publish_batch.assert_awaited_once()
+        assert provider.watermarks.get(provider.cursor_key) is None
+
+        bus.publish_batch = AsyncMock()
+        with patch("src.asoc.core.message_bus.get_message_bus", AsyncMock(return_value=bus)):
+            result = await agent.poll_cloudtrail()
+        assert [e["eventID"] for e in result.payload["events"]] == ["e0", "e1"]
+        assert provider.watermarks.get(provider.cursor_key).boundary_ids == ["e1"]
@@ -0,0 +1,142 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.asoc.agents.detection import DetectionAgent
+from src.asoc.agents.message import Priority
+from src.asoc.agents.tools import PlanStep, Ref, ToolRegistry
+from src.asoc.llm.providers import LLMProvider, LLMResult, MockProvider
+
+
+def _registry(delay=0.05):
+    registry = ToolRegistry()
+    calls = []
+
+    async def slow(value):
+        calls.append(("start", value))
+        await asyncio.sleep(delay)
+        calls.append(("end", value))
+        return value
+
+    async def add(a, b):
+        return a + b
+
+    async def boom():
+        raise RuntimeError("boom")
+
+    registry.register("slow", slow, "sleep then echo")
+    registry.register("add", add, "add two numbers")
+    registry.register("boom", boom, "always fails")
+    return registry, calls
+
+
+@pytest.mark.asyncio
+class TestExecutePlan:
+    async def test_independent_steps_run_concurrently(self):
+        registry, _ = _registry(delay=0.1)
+        started = time.monotonic()
+        results = await registry.execute_plan({name: PlanStep("slow", {"value": name}) for name in "abcd"})
+        assert time.monotonic() - started < 0.3
+        assert results == {"a": "a", "b": "b", "c": "c", "d": "d"}
+
+    async def test_refs_wait_for_and_bind_results(self):
+        registry, _ = _registry()
+        results = await registry.execute_plan({
+            "sum": PlanStep("add", {"a": Ref("x"), "b": Ref("y", lambda v: v * 10)}),
+            "x": PlanStep("slow", {"value": 1}),
+            "y": PlanStep("slow", {"value": 2}),
+        })
+        assert list(results) == ["sum", "x", "y"]
+        assert results["sum"] == 21
+
+    async def test_after_orders_steps_without_passing_results(self):
+        registry, calls = _registry()
+        await registry.execute_plan({
+            "second": PlanStep("slow", {"value": 2}, after=("first",)),
+            "first": PlanStep("slow", {"value": 1}),
+        })
+        assert calls == [("start", 1), ("end", 1), ("start", 2), ("end", 2)]
+
+    async def test_rejects_unknown_dependencies_and_cycles(self):
+        registry, calls = _registry()
+        with pytest.raises(ValueError, match="unknown"):
+            await registry.execute_plan({"a": PlanStep("add", {"a": Ref("missing"), "b": 1})})
+        with pytest.raises(ValueError, match="cycle"):
+            await registry.execute_plan({
+                "a": PlanStep("add", {"a": Ref("b"), "b": 1}),
+                "b": PlanStep("add", {"a": Ref("a"), "b": 1}),
+                "c": PlanStep("slow", {"value": 3}),
+            })
+        assert calls == []
+
+    async def test_failure_cancels_remaining_steps(self):
+        registry, calls = _registry(delay=0.2)
+        with pytest.raises(RuntimeError, match="boom"):
+            await registry.execute_plan({"slow": PlanStep("slow", {"value": 1}), "boom": PlanStep("boom")})
+        await asyncio.sleep(0.25)
+        assert ("end", 1) not in calls
+
+    async def test_step_timeout(self):
+        registry, _ = _registry(delay=1.0)
+        with pytest.raises(asyncio.TimeoutError):
+            await registry.execute_plan({"slow": PlanStep("slow", {"value": 1}, timeout=0.05)})
+
+
+class _SlowProvider(LLMProvider):
+    def __init__(self):
+        self.started = asyncio.Event()
+
+    @property
+    def name(self) -> str:
+        return "slow"
+
+    async def analyze(self, event_data: dict, on_verdict=None, need_reasoning: bool = True) -> LLMResult:
+        self.started.set()
+        await asyncio.sleep(0.05)
+        return LLMResult(threat_detected=True, risk_score=0.7, reasoning="slow", attack_technique="T1078")
+
+
+@pytest.mark.asyncio
+class TestDetectionPlan:
+    async def test_mitre_mapping_overlaps_llm_call(self):
+        provider = _SlowProvider()
+        agent = DetectionAgent(provider=provider)
+        mapped_while_llm_running = []
+
+        async def map_mitre(event_data, llm_technique=None):
+            await asyncio.sleep(0.01)
+            mapped_while_llm_running.append(provider.started.is_set() and llm_technique is None)
+            return None
+
+        agent.tool_registry.get("map_mitre_technique").func = map_mitre
+        alert = await agent.analyze_threat({"eventName": "RunInstances", "sourceIPAddress": "198.51.100.4"})
+        assert alert.payload["reasoning"] == "slow"
+        # First call alongside the LLM; second with the LLM's technique as a fallback.
+        assert mapped_while_llm_running == [True, False]
+
+    async def test_act_binds_llm_and_mitre_into_risk_score(self):
+        agent = DetectionAgent(provider=_SlowProvider())
+        event = {"eventName": "CreateAccessKey", "sourceIPAddress": "198.51.100.4"}
+        results = await agent.act(
+            [
+                {"tool": "calculate_risk_score", "args": {"event_data": event}},
+                {"tool": "analyze_threat_llm", "args": {"event_data": event}},
+                {"tool": "map_mitre_technique", "args": {"event_data": event}},
+            ],
+            state=None,
+        )
+        assert len(results) == 3
+        assert results[1]["risk_score"] == 0.7
+        assert results[0]["final_risk_score"] > 0
+
+    async def test_likely_threat_is_escalated_before_the_analysis_finishes(self):
+        agent = DetectionAgent(provider=MockProvider())
+        agent.send_messages = AsyncMock(return_value=True)
+        event = {"eventID": "e-9", "eventName": "CreateAccessKey", "sourceIPAddress": "198.51.100.4"}
+        await agent._tool_analyze_threat(event)
+        await asyncio.gather(*agent._early_sends)
+        (message,) = agent.send_messages.await_args.args[0]
+        assert (message.target_agent, message.priority, message.correlation_id) == ("SupervisorAgent", Priority.CRITICAL, "e-9")
+        assert message.payload["early_verdict"] == {"threat_detected": True, "risk_score": 0.85}
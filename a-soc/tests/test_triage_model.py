@@ -0,0 +1,165 @@
+import json
+import random
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from src.asoc.agents.detection import DetectionAgent
+from src.asoc.agents.triage_model import (
+    BUCKETS,
+    DENSE_FEATURES,
+    TriageModel,
+    event_tokens,
+    examples_from_records,
+    featurize,
+    load_records,
+    record_label,
+    train,
+)
+from src.asoc.core.config import settings
+from src.asoc.core.event_store import EventStore
+from src.asoc.llm.providers import MockProvider
+
+
+def _event(name, ip, user_type="AssumedRole", event_id=None):
+    event = {"eventName": name, "sourceIPAddress": ip, "userIdentity": {"type": user_type}, "awsRegion": "us-east-1"}
+    if event_id:
+        event["eventID"] = event_id
+    return event
+
+
+def _dataset(n=2000, seed=0):
+    rng = random.Random(seed)
+    events, labels = [], []
+    for _ in range(n):
+        bad = rng.random() < 0.2
+        if bad:
+            events.append(_event("ExportVaultSecrets", f"203.0.113.{rng.randrange(255)}", "IAMUser"))
+        else:
+            events.append(_event("PutDashboard", f"10.0.0.{rng.randrange(255)}"))
+        labels.append(bad)
+    return events, labels
+
+
+class TestFeatures:
+    def test_every_event_has_the_same_token_count(self):
+        assert len(event_tokens({})) == len(event_tokens(_event("PutObject", "10.0.0.1")))
+        assert "ip=private" in event_tokens(_event("PutObject", "10.0.0.1"))
+        assert "ip=service" in event_tokens(_event("PutObject", "ec2.amazonaws.com"))
+
+    def test_featurize_shapes_and_baselines(self):
+        baseline = {"zscore": 4.0, "features": {"region": 4.0, "rate": -2.0}}
+        index, dense = featurize([_event("PutObject", "10.0.0.1"), {}], [baseline, None])
+        assert index.shape == (2, len(event_tokens({})))
+        assert index.max() < BUCKETS
+        assert dense.shape == (2, len(DENSE_FEATURES))
+        assert dense[0, 0] == pytest.approx(np.log1p(4.0))
+        assert dense[0, DENSE_FEATURES.index("rate")] == 0.0
+        assert not dense[1].any()
+
+
+class TestTraining:
+    def test_separates_classes(self):
+        events, labels = _dataset()
+        model = train(events, labels)
+        scores = model.predict([_event("PutDashboard", "10.0.0.7"), _event("ExportVaultSecrets", "203.0.113.9", "IAMUser")])
+        assert scores[0] < 0.05 < 0.95 < scores[1]
+        assert model.metrics["accuracy"] == 1.0
+        assert model.metrics["positives"] == sum(labels)
+
+    def test_needs_both_classes(self):
+        with pytest.raises(ValueError, match="both classes"):
+            train([_event("PutObject", "10.0.0.1")] * 3, [False] * 3)
+
+    def test_versions_on_disk(self, tmp_path):
+        events, labels = _dataset(200)
+        first, second = train(events, labels, epochs=5), train(events, labels, epochs=50)
+        assert first.save(str(tmp_path)).name == "triage-model-0001.npz"
+        assert second.save(str(tmp_path)).name == "triage-model-0002.npz"
+        (tmp_path / "triage-model-0003.npz").write_bytes(b"not a model")
+
+        latest = TriageModel.latest(str(tmp_path))
+        assert latest.version == 2
+        assert latest.metrics == second.metrics
+        np.testing.assert_allclose(latest.predict(events[:10]), second.predict(events[:10]))
+        assert TriageModel.latest(str(tmp_path / "missing")) is None
+
+
+class TestExamples:
+    def test_labels_override_verdicts_and_model_verdicts_are_skipped(self):
+        a, b, c = (_event("PutObject", "10.0.0.1", event_id=i) for i in "abc")
+        records = [
+            {"type": "threat_detected", "payload": {"event": a, "threat_detected": True, "decided_by": "llm"}},
+            {"type": "threat_detected", "payload": {"event": b, "threat_detected": False, "decided_by": "prefilter"}},
+            {"type": "threat_detected", "payload": {"event": c, "threat_detected": True, "decided_by": "model"}},
+            {"type": "threat_detected", "payload": {"event": _event("PutObject", "10.0.0.1", event_id="d"), "threat_detected": True, "decided_by": "fallback"}},
+            {"type": "threat_detected", "payload": {"event": _event("PutObject", "10.0.0.1", event_id="e"), "threat_detected": True, "decided_by": "mock"}},
+            {"type": "threat_detected", "payload": {"risk_score": 0.3, "reasoning": "older record, no event"}},
+            {"type": "alert_labelled", "payload": {"event": a, "malicious": False}},
+        ]
+        events, labels, baselines = examples_from_records(records)
+        assert [e["eventID"] for e in events] == ["a", "b"]
+        assert labels == [False, False]
+        assert baselines == [None, None]
+
+    def test_json_string_payloads(self):
+        a, b = (_event("PutObject", "10.0.0.1", event_id=i) for i in "ab")
+        records = [
+            {"type": "threat_detected", "payload": json.dumps({"event": a, "threat_detected": True, "decided_by": "llm"})},
+            {"type": "alert_labelled", "payload": json.dumps({"event": b, "malicious": True, "baseline": {"zscore": 3.0}})},
+            {"type": "alert_labelled", "payload": "not json"},
+        ]
+        events, labels, baselines = examples_from_records(records)
+        assert [e["eventID"] for e in events] == ["a", "b"]
+        assert labels == [True, True]
+        assert baselines == [None, {"zscore": 3.0}]
+
+    async def test_load_from_event_store(self, tmp_path):
+        store = EventStore(str(tmp_path / "events.jsonl"))
+        event = _event("PutObject", "10.0.0.1", event_id="x")
+        await store.append_event("threat_detected", {"event": event, "threat_detected": True, "decided_by": "llm"}, "DetectionAgent")
+        await store.append_event("log_ingestion", {"event_id": "x"}, "TelemetryAgent")
+        await record_label(store, event, malicious=False)
+
+        records = await load_records(store, page_size=1)
+        assert [r["type"] for r in records] == ["threat_detected", "alert_labelled"]
+        assert examples_from_records(records)[1] == [False]
+
+
+@pytest.mark.asyncio
+class TestDetectionTriageModel:
+    async def test_confident_scores_skip_the_llm(self, tmp_path):
+        events, labels = _dataset()
+        train(events, labels).save(str(tmp_path))
+        with patch.object(settings, "DETECTION_TRIAGE_MODEL_DIR", str(tmp_path)):
+            agent = DetectionAgent(provider=MockProvider())
+        assert agent._triage_model.version == 1
+
+        calls = []
+        original = agent._analyze_batch_llm
+
+        async def spy(batch):
+            calls.append([e["eventName"] for e in batch])
+            return await original(batch)
+
+        agent._analyze_batch_llm = spy
+        benign, hostile, novel = await agent.analyze_threats([
+            _event("PutDashboard", "10.0.0.9"),
+            _event("ExportVaultSecrets", "203.0.113.77", "IAMUser"),
+            _event("RotateWidget", "198.51.100.1", "IAMUser"),
+        ])
+        assert calls == [["RotateWidget"]]
+        assert benign.payload["triage"]["tier"] == "allow"
+        assert benign.payload["triage"]["decided_by"] == "model"
+        assert hostile.payload["triage"]["tier"] == "escalate"
+        assert hostile.payload["threat_detected"] is True
+        assert novel.payload["triage"]["decided_by"] == "mock"
+        assert 0.05 < novel.payload["triage"]["model_score"] < 0.97
+
+    async def test_without_a_model_everything_undecided_goes_to_the_llm(self, tmp_path):
+        with patch.object(settings, "DETECTION_TRIAGE_MODEL_DIR", str(tmp_path)):
+            agent = DetectionAgent(provider=MockProvider())
+        alert = await agent.analyze_threat(_event("PutDashboard", "10.0.0.9"))
+        assert alert.payload["triage"]["decided_by"] == "mock"
+        assert alert.payload["triage"]["model_score"] is None